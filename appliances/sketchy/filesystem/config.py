@@ -29,6 +29,13 @@ def _load():
     _config.update(json.load(open(CONFIG_FILENAME, 'rb')))
 
 
+def _save():
+    """Write the local config object back to the JSON file.
+    """
+    with open(CONFIG_FILENAME, 'w') as fh:
+        json.dump(_config, fh)
+
+
 def get(k):
     """Return a config value. Let it fail if key not set.
     """
@@ -37,5 +44,14 @@ def get(k):
     return _config[k]
 
 
+def set(k, v):
+    """Update an existing config value and persist it to the file.
+    """
+    if k not in _config:
+        raise UnknownConfigKeys([k])
+    _config[k] = v
+    _save()
+
+
 # Load config from file on module import.
 _load()
@@ -0,0 +1,59 @@
+"""Packed glyphs of fonts/default.py
+
+Generated by host/compile_font.py. Do not edit.
+
+"""
+
+# The chars in the order of their glyphs.
+CHARS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+# The '<H' start offset of each glyph in DATA, followed by the end offset of
+# the last one.
+OFFSETS = (
+    b'\x00\x00\x0e\x00"\x000\x00>\x00R\x00b\x00\x88\x00'
+    b'\x9a\x00\xac\x00\xc2\x00\xd6\x00\xe0\x00\xfa\x00\x08\x01\x1a\x01'
+    b'*\x01B\x01X\x01\x86\x01\x92\x01\xa8\x01\xb2\x01\xcc\x01'
+    b'\xda\x01\xe6\x01\xf4\x01'
+)
+
+# The height, in grid units, of each glyph.
+HEIGHTS = (
+    b'\x05\x05\x05\x05\x05\x05\x06\x05\x05\x05\x05\x05\x05\x05\x05\x07'
+    b'\x06\x07\x07\x05\x05\x04\x05\x05\x05\x05'
+)
+
+# The flat [x0, y0, x1, y1, ...] path coordinates of each glyph.
+DATA = (
+    b'\x00\x00\x00\x04\x03\x04\x03\x00\x03\x02\x00\x02\x00\x00\x00\x00'
+    b'\x00\x04\x02\x04\x03\x03\x02\x02\x01\x02\x02\x02\x03\x01\x02\x00'
+    b'\x00\x00\x00\x00\x00\x04\x03\x04\x00\x04\x00\x00\x03\x00\x00\x00'
+    b'\x00\x00\x00\x04\x02\x04\x03\x03\x03\x01\x02\x00\x00\x00\x00\x00'
+    b'\x00\x04\x03\x04\x00\x04\x00\x02\x02\x02\x00\x02\x00\x00\x03\x00'
+    b'\x00\x00\x00\x00\x00\x04\x03\x04\x00\x04\x00\x02\x03\x02\x00\x02'
+    b'\x00\x00\x01\x00\x00\x01\x00\x04\x01\x05\x03\x05\x04\x04\x03\x05'
+    b'\x01\x05\x00\x04\x00\x01\x01\x00\x03\x00\x04\x01\x04\x02\x02\x02'
+    b'\x04\x02\x04\x01\x03\x00\x01\x00\x00\x00\x00\x04\x00\x02\x03\x02'
+    b'\x03\x04\x03\x00\x03\x02\x00\x02\x00\x00\x00\x00\x04\x00\x02\x00'
+    b'\x02\x04\x00\x04\x04\x04\x02\x04\x02\x00\x00\x00\x01\x00\x00\x01'
+    b'\x02\x00\x03\x01\x03\x04\x01\x04\x05\x04\x03\x04\x03\x01\x02\x00'
+    b'\x01\x00\x00\x00\x00\x04\x00\x02\x01\x02\x03\x04\x01\x02\x03\x00'
+    b'\x01\x02\x00\x02\x00\x00\x00\x00\x00\x04\x00\x00\x03\x00\x00\x00'
+    b'\x00\x00\x00\x04\x01\x04\x03\x02\x05\x04\x06\x04\x06\x00\x06\x04'
+    b'\x05\x04\x03\x02\x01\x04\x00\x04\x00\x00\x00\x00\x00\x04\x04\x00'
+    b'\x04\x04\x04\x00\x00\x04\x00\x00\x01\x00\x00\x01\x00\x03\x01\x04'
+    b'\x04\x04\x05\x03\x05\x01\x04\x00\x01\x00\x00\x00\x00\x06\x04\x06'
+    b'\x05\x05\x05\x04\x04\x03\x00\x03\x00\x00\x01\x01\x00\x02\x00\x04'
+    b'\x01\x05\x04\x05\x05\x04\x05\x02\x04\x01\x03\x02\x05\x00\x04\x01'
+    b'\x01\x01\x00\x00\x00\x06\x04\x06\x05\x05\x05\x04\x04\x03\x02\x03'
+    b'\x05\x00\x02\x03\x00\x03\x00\x00\x01\x00\x00\x01\x01\x00\x04\x00'
+    b'\x05\x01\x05\x02\x04\x03\x01\x03\x00\x04\x00\x05\x01\x06\x04\x06'
+    b'\x05\x05\x04\x06\x01\x06\x00\x05\x00\x04\x01\x03\x04\x03\x05\x02'
+    b'\x05\x01\x04\x00\x01\x00\x02\x00\x02\x04\x00\x04\x04\x04\x02\x04'
+    b'\x02\x00\x01\x00\x00\x01\x00\x04\x00\x01\x01\x00\x04\x00\x05\x01'
+    b'\x05\x04\x05\x01\x04\x00\x01\x00\x03\x00\x00\x03\x03\x00\x06\x03'
+    b'\x03\x00\x01\x00\x00\x01\x00\x04\x00\x01\x01\x00\x03\x02\x05\x00'
+    b'\x06\x01\x06\x04\x06\x01\x05\x00\x03\x02\x01\x00\x00\x00\x04\x04'
+    b'\x02\x02\x00\x04\x04\x00\x02\x02\x00\x00\x00\x00\x04\x04\x02\x02'
+    b'\x00\x04\x02\x02\x00\x00\x00\x00\x04\x04\x00\x04\x04\x04\x00\x00'
+    b'\x04\x00\x00\x00'
+)
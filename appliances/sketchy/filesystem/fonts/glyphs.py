@@ -0,0 +1,144 @@
+"""Glyph Store
+
+A GlyphStore holds each glyph of a font as a compiled array('h') of its flat
+[x0, y0, x1, y1, ...] path coordinates, so that the ASCII art character
+definitions are only parsed once, and keeps a bounded LRU cache of the scaled,
+ready-to-draw paths of the most recently used (<char>, <scale>) pairs, so that
+drawing a glyph that's already been drawn at the same size takes no arithmetic.
+
+A PackedGlyphStore reads the glyphs of a font module generated by
+host/compile_font.py, whose coordinates are packed into a single bytes object,
+instead, so that the font data stays in flash when the module is frozen and
+importing it costs next to no heap.
+
+"""
+
+import struct
+from array import array
+from collections import OrderedDict
+
+from fonts import char_def_to_points
+
+
+# The default max number of scaled glyph paths to cache.
+DEFAULT_CACHE_SIZE = 32
+
+
+def compile_char_def(char_def):
+    """Return an array('h') of the flat path coordinates of the character
+    definition.
+    """
+    coords = array('h')
+    for x, y in char_def_to_points(char_def):
+        coords.append(x)
+        coords.append(y)
+    return coords
+
+
+class GlyphStore:
+    def __init__(self, glyphs, cache_size=DEFAULT_CACHE_SIZE):
+        """glyphs is a dict that maps each char to an array('h') of its flat
+        path coordinates.
+        """
+        self.glyphs = glyphs
+        # Precompute the height of each glyph, which determines its scale.
+        self.heights = {
+            char: max(coords[i] for i in range(1, len(coords), 2)) + 1
+            for char, coords in glyphs.items()
+        }
+        self.init_cache(cache_size)
+
+    def init_cache(self, cache_size):
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.num_hits = 0
+        self.num_misses = 0
+
+    @classmethod
+    def from_char_defs(cls, chars, cache_size=DEFAULT_CACHE_SIZE):
+        """Return a GlyphStore for a dict of ASCII art character definitions,
+        like fonts.default.CHARS.
+        """
+        return cls({char: compile_char_def(char_def)
+                    for char, char_def in chars.items()}, cache_size)
+
+    def __contains__(self, char):
+        return char in self.heights
+
+    def get_coords(self, char):
+        """Return an indexable sequence of the glyph's flat path coordinates.
+        """
+        return self.glyphs[char]
+
+    def get_height(self, char):
+        """Return the number of unscaled grid units that the glyph spans
+        vertically.
+        """
+        return self.heights[char]
+
+    def get_path(self, char, scale):
+        """Return an (<coords>, <advance>) tuple, where coords is an
+        array('h') of the flat coordinates of the glyph's path at the
+        specified scale, relative to its origin, and advance is the width of
+        the path.
+
+        The path begins and ends at a sprue that sits directly below the
+        glyph's entry point, so that consecutive glyphs are connected by a
+        line along their baseline instead of through their bodies.
+        """
+        key = (char, scale)
+        cache = self.cache
+        path = cache.pop(key, None)
+        if path is not None:
+            self.num_hits += 1
+            # Re-insert the path to mark it as the most recently used.
+            cache[key] = path
+            return path
+
+        self.num_misses += 1
+        coords = self.get_coords(char)
+        num_coords = len(coords)
+        scaled = array('h', (0 for _ in range(num_coords + 4)))
+        # Add the sprue below the entry point at each end and move the glyph
+        # up one unit to make room for it.
+        sprue_x = coords[0] * scale
+        sprue_y = coords[1] * scale
+        scaled[0] = scaled[-2] = sprue_x
+        scaled[1] = scaled[-1] = sprue_y
+        advance = sprue_x
+        for i in range(0, num_coords, 2):
+            x = coords[i] * scale
+            scaled[i + 2] = x
+            scaled[i + 3] = (coords[i + 1] + 1) * scale
+            if x > advance:
+                advance = x
+        path = (scaled, advance)
+
+        if len(cache) >= self.cache_size:
+            # Evict the least recently used path.
+            del cache[next(iter(cache))]
+        cache[key] = path
+        return path
+
+
+class PackedGlyphStore(GlyphStore):
+    def __init__(self, font, cache_size=DEFAULT_CACHE_SIZE):
+        """font is a module generated by host/compile_font.py.
+        """
+        self.chars = font.CHARS
+        self.offsets = font.OFFSETS
+        self.heights = font.HEIGHTS
+        # Slicing a memoryview doesn't copy the underlying bytes.
+        self.data = memoryview(font.DATA)
+        self.init_cache(cache_size)
+
+    def __contains__(self, char):
+        return len(char) == 1 and char in self.chars
+
+    def get_coords(self, char):
+        start, end = struct.unpack_from('<HH', self.offsets,
+                                        self.chars.index(char) * 2)
+        return self.data[start:end]
+
+    def get_height(self, char):
+        return self.heights[self.chars.index(char)]
@@ -0,0 +1,201 @@
+"""Text Layout
+
+A TextLayout measures text with the glyphs of a GlyphStore, wraps it into lines
+that fit a given width, aligns each line within that width, and returns the
+position of every glyph, so that the extent of the whole block of text is
+known, and can be checked against the drawable area, before anything is drawn.
+
+Lines are stacked downward from the first one, whose baseline is at the
+specified y position. The glyphs of alternate lines are returned in reverse
+order, so that the stylus snakes back and forth through the block instead of
+drawing a line all the way back across it at the start of each line.
+
+"""
+
+import math
+
+
+ALIGN_LEFT = 'left'
+ALIGN_CENTER = 'center'
+ALIGN_RIGHT = 'right'
+
+ALIGNMENTS = (ALIGN_LEFT, ALIGN_CENTER, ALIGN_RIGHT)
+
+
+class TextTooWide(Exception): pass
+
+
+class TextLayout:
+    def __init__(self, glyph_store, char_height, char_spacing=None,
+                 word_spacing=None, line_spacing=None):
+        """If not specified, char_spacing, word_spacing and line_spacing are
+        set relative to char_height.
+        """
+        if char_spacing is None:
+            char_spacing = math.floor(char_height / 8)
+        if word_spacing is None:
+            word_spacing = char_spacing * 4
+        if line_spacing is None:
+            line_spacing = math.floor(char_height / 2)
+        self.glyph_store = glyph_store
+        self.char_height = char_height
+        self.char_spacing = char_spacing
+        self.word_spacing = word_spacing
+        self.line_spacing = line_spacing
+
+    def get_glyph(self, char):
+        """Return a (<coords>, <advance>) tuple for the char, as returned by
+        GlyphStore.get_path(), or None if the font doesn't include it.
+        """
+        glyph_store = self.glyph_store
+        if char not in glyph_store:
+            return None
+        scale = math.ceil(self.char_height / glyph_store.get_height(char))
+        return glyph_store.get_path(char, scale)
+
+    def get_advance(self, glyph):
+        """Return the number of steps by which drawing a glyph, as returned by
+        get_glyph(), advances the x position, which includes the char_spacing
+        that follows it. A char that the font doesn't include is drawn as a
+        space, which advances it by word_spacing.
+        """
+        if glyph is None:
+            return self.word_spacing
+        return glyph[1] + self.char_spacing
+
+    def measure_word(self, word):
+        """Return the number of steps by which drawing the word advances the x
+        position, as for get_advance().
+        """
+        width = 0
+        for char in word:
+            width += self.get_advance(self.get_glyph(char))
+        return width
+
+    def split_word(self, word, width):
+        """Return a list of the parts of the word, broken between chars so
+        that each fits within width, if possible.
+        """
+        parts = []
+        start = 0
+        end = 0
+        for i, char in enumerate(word):
+            char_width = self.measure_word(char)
+            if i > start and end + char_width - self.char_spacing > width:
+                parts.append(word[start:i])
+                start = i
+                end = 0
+            end += char_width
+        parts.append(word[start:])
+        return parts
+
+    def wrap(self, text, width):
+        """Return a list of the lines of the text, each as a (<words>,
+        <width>) tuple, where width is the distance from the start of the
+        line to the end of its last glyph, breaking lines at newlines and
+        between words as needed for each to fit within the specified width.
+        Words that don't fit on a line of their own are broken between chars.
+        Raise TextTooWide if a single glyph doesn't fit.
+        """
+        char_spacing = self.char_spacing
+        lines = []
+        for paragraph in text.split('\n'):
+            words = []
+            # The x position, relative to the start of the line, at which the
+            # next word would be drawn, less word_spacing.
+            end = 0
+            for word in paragraph.split(' '):
+                word_end = self.measure_word(word)
+                if (words and end + self.word_spacing + word_end - char_spacing
+                        <= width):
+                    words.append(word)
+                    end += self.word_spacing + word_end
+                    continue
+                if words:
+                    lines.append((words, max(end - char_spacing, 0)))
+                parts = self.split_word(word, width)
+                for part in parts[:-1]:
+                    lines.append(
+                        ([part], self.measure_word(part) - char_spacing))
+                words = [parts[-1]]
+                end = self.measure_word(parts[-1])
+            lines.append((words, max(end - char_spacing, 0)))
+        for _, line_width in lines:
+            if line_width > width:
+                raise TextTooWide('text is {} steps wide, max is {}'.format(
+                    line_width, width))
+        return lines
+
+    def get_line_height(self, text):
+        """Return the height of the tallest glyph in the text.
+        """
+        height = 0
+        for char in text:
+            glyph = self.get_glyph(char)
+            if glyph is not None:
+                coords = glyph[0]
+                for i in range(1, len(coords), 2):
+                    if coords[i] > height:
+                        height = coords[i]
+        return height
+
+    def layout(self, text, x, y, width, align=ALIGN_LEFT):
+        """Return a list of the (<x>, <y>, <coords>) placements of each glyph
+        of the text, where coords is as returned by GlyphStore.get_path(),
+        laid out as lines that fit within the width, starting at x and with
+        the first line's baseline at y, and aligned within that width.
+        """
+        line_pitch = self.get_line_height(text) + self.line_spacing
+        placements = []
+        for line_num, (words, line_width) in enumerate(self.wrap(text, width)):
+            if align == ALIGN_RIGHT:
+                line_x = x + width - line_width
+            elif align == ALIGN_CENTER:
+                line_x = x + (width - line_width) // 2
+            else:
+                line_x = x
+            line_y = y - line_num * line_pitch
+            line_placements = []
+            for word_num, word in enumerate(words):
+                if word_num > 0:
+                    line_x += self.word_spacing
+                for char in word:
+                    glyph = self.get_glyph(char)
+                    if glyph is not None:
+                        line_placements.append((line_x, line_y, glyph[0]))
+                    line_x += self.get_advance(glyph)
+            if line_num % 2:
+                line_placements.reverse()
+            placements.extend(line_placements)
+        return placements
+
+
+def get_bounds(placements):
+    """Return the (<min x>, <min y>, <max x>, <max y>) bounds of the
+    placements, or None if there are none.
+    """
+    bounds = None
+    for x, y, coords in placements:
+        for i in range(0, len(coords), 2):
+            px = coords[i] + x
+            py = coords[i + 1] + y
+            if bounds is None:
+                bounds = [px, py, px, py]
+                continue
+            if px < bounds[0]:
+                bounds[0] = px
+            elif px > bounds[2]:
+                bounds[2] = px
+            if py < bounds[1]:
+                bounds[1] = py
+            elif py > bounds[3]:
+                bounds[3] = py
+    return None if bounds is None else tuple(bounds)
+
+
+def placements_to_strokes(placements):
+    """Return a generator of the point lists of each placed glyph.
+    """
+    for x, y, coords in placements:
+        yield [(coords[i] + x, coords[i + 1] + y)
+               for i in range(0, len(coords), 2)]
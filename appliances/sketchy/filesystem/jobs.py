@@ -0,0 +1,211 @@
+"""Background Job Queue
+
+A JobQueue runs submitted jobs one at a time, in order, on a single worker
+thread, so that route handlers can return as soon as a job is submitted and the
+server remains free to report progress and accept more work while plotting.
+
+A job is a named source of points. The queue is agnostic to how the points get
+drawn and delegates that to the estimate and run functions that it's created
+with.
+
+"""
+
+import _thread
+from utime import (
+    sleep_ms,
+    ticks_diff,
+    ticks_ms,
+)
+
+
+# Job states.
+QUEUED = 'queued'
+RUNNING = 'running'
+PAUSED = 'paused'
+DONE = 'done'
+CANCELLED = 'cancelled'
+FAILED = 'failed'
+
+FINISHED_STATES = (DONE, CANCELLED, FAILED)
+
+# The max number of finished jobs to remember.
+MAX_FINISHED_JOBS = 8
+
+# The number of milliseconds to wait between checks for new jobs or for a
+# paused job to be resumed.
+POLL_INTERVAL_MS = 50
+
+
+class UnknownJob(Exception): pass
+
+
+class Job:
+    def __init__(self, job_id, name, get_points):
+        """get_points is a function that returns a new iterable of the points
+        to move along each time it's called.
+        """
+        self.id = job_id
+        self.name = name
+        self.get_points = get_points
+        self.state = QUEUED
+        self.error = None
+        self.steps_total = None
+        self.steps_done = 0
+        self.duration_total = None
+        self.duration_done = 0
+        self.start_ticks_ms = None
+        self.elapsed_ms = 0
+        self.pause_requested = False
+        self.cancel_requested = False
+        self.points_exhausted = False
+
+    def add_progress(self, num_steps, duration):
+        """Record that num_steps steps that take duration seconds have been
+        handed off for execution.
+        """
+        self.steps_done += num_steps
+        self.duration_done += duration
+
+    def take_points(self, points):
+        """Return a generator of the points from the points iterator that stops
+        early if the job is paused or cancelled.
+        """
+        while not self.pause_requested and not self.cancel_requested:
+            try:
+                point = next(points)
+            except StopIteration:
+                self.points_exhausted = True
+                return
+            yield point
+
+    def to_dict(self):
+        eta_seconds = None
+        if (self.duration_total is not None
+                and self.state not in FINISHED_STATES):
+            eta_seconds = max(self.duration_total - self.duration_done, 0)
+        elapsed_ms = self.elapsed_ms
+        if self.state == RUNNING and self.start_ticks_ms is not None:
+            elapsed_ms += ticks_diff(ticks_ms(), self.start_ticks_ms)
+        return {
+            'id': self.id,
+            'name': self.name,
+            'state': self.state,
+            'error': self.error,
+            'steps_done': self.steps_done,
+            'steps_total': self.steps_total,
+            'elapsed_seconds': elapsed_ms / 1000,
+            'eta_seconds': eta_seconds,
+        }
+
+
+class JobQueue:
+    def __init__(self, estimate, run):
+        """estimate is a function that accepts an iterable of points and
+        returns a (<total steps>, <total seconds>) tuple for moving along them,
+        and run is a function that accepts an iterable of points and a
+        function to call with the (<num steps>, <seconds>) of each part of the
+        move as it's handed off for execution, and moves along them.
+        """
+        self.estimate = estimate
+        self.run = run
+        self.jobs = []
+        self.next_job_id = 1
+        self.lock = _thread.allocate_lock()
+        self.worker_started = False
+
+    def start(self):
+        if not self.worker_started:
+            self.worker_started = True
+            _thread.start_new_thread(self.work, ())
+
+    def submit(self, name, get_points):
+        """Queue a new job and return it.
+        """
+        with self.lock:
+            job = Job(self.next_job_id, name, get_points)
+            self.next_job_id += 1
+            self.jobs.append(job)
+            self.prune()
+        self.start()
+        return job
+
+    def prune(self):
+        """Forget the oldest finished jobs beyond MAX_FINISHED_JOBS.
+        """
+        finished = [job for job in self.jobs if job.state in FINISHED_STATES]
+        for job in finished[:-MAX_FINISHED_JOBS]:
+            self.jobs.remove(job)
+
+    def get(self, job_id):
+        for job in self.jobs:
+            if job.id == job_id:
+                return job
+        raise UnknownJob(job_id)
+
+    def list(self):
+        return [job.to_dict() for job in self.jobs]
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        with self.lock:
+            if job.state == QUEUED:
+                job.state = CANCELLED
+            elif job.state not in FINISHED_STATES:
+                job.cancel_requested = True
+        return job
+
+    def pause(self, job_id):
+        job = self.get(job_id)
+        if job.state not in FINISHED_STATES:
+            job.pause_requested = True
+        return job
+
+    def resume(self, job_id):
+        job = self.get(job_id)
+        job.pause_requested = False
+        return job
+
+    def get_next_job(self):
+        """Return the oldest queued job that's not paused, or None.
+        """
+        with self.lock:
+            for job in self.jobs:
+                if job.state == QUEUED and not job.pause_requested:
+                    job.state = RUNNING
+                    return job
+        return None
+
+    def work(self):
+        while True:
+            job = self.get_next_job()
+            if job is None:
+                sleep_ms(POLL_INTERVAL_MS)
+                continue
+            try:
+                self.run_job(job)
+            except Exception as e:
+                job.state = FAILED
+                job.error = '{}: {}'.format(e.__class__.__name__, e)
+
+    def run_job(self, job):
+        job.steps_total, job.duration_total = self.estimate(job.get_points())
+        points = iter(job.get_points())
+        while True:
+            job.state = RUNNING
+            job.start_ticks_ms = ticks_ms()
+            try:
+                # The run function returns, bringing the motion to a stop, as
+                # soon as take_points() stops yielding points.
+                self.run(job.take_points(points), job.add_progress)
+            finally:
+                job.elapsed_ms += ticks_diff(ticks_ms(), job.start_ticks_ms)
+            if job.points_exhausted:
+                job.state = DONE
+                return
+            if not job.cancel_requested:
+                job.state = PAUSED
+                while job.pause_requested and not job.cancel_requested:
+                    sleep_ms(POLL_INTERVAL_MS)
+            if job.cancel_requested:
+                job.state = CANCELLED
+                return
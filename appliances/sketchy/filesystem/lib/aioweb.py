@@ -0,0 +1,180 @@
+"""A minimal uasyncio HTTP and WebSocket server.
+
+Each connection is handled by its own coroutine, so a long-lived WebSocket
+doesn't prevent other requests from being served. Handlers are coroutines that
+accept a Request and either return a (<status>, <content type>, <body>) tuple
+or, for WebSocket routes, read messages from the request until the client
+disconnects.
+
+Only what the Sketchy UI needs is supported: GET requests with query params,
+and unfragmented text or binary WebSocket messages from the client.
+
+"""
+
+import binascii
+import hashlib
+import uasyncio as asyncio
+
+
+WEBSOCKET_GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+OPCODE_CONTINUATION = 0x0
+OPCODE_TEXT = 0x1
+OPCODE_BINARY = 0x2
+OPCODE_CLOSE = 0x8
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xa
+
+STATUS_TEXT_MAP = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    500: 'Internal Server Error',
+}
+
+
+class WebSocketClosed(Exception): pass
+
+
+def unquote(s):
+    """Return the URL-decoded string.
+    """
+    s = s.replace('+', ' ')
+    parts = s.split('%')
+    if len(parts) == 1:
+        return s
+    b = bytearray(parts[0].encode())
+    for part in parts[1:]:
+        b.append(int(part[:2], 16))
+        b.extend(part[2:].encode())
+    return b.decode()
+
+
+def parse_query(query):
+    params = {}
+    for pair in query.split('&'):
+        if not pair:
+            continue
+        k, _, v = pair.partition('=')
+        params[unquote(k)] = unquote(v)
+    return params
+
+
+class Request:
+    def __init__(self, reader, writer, method, path, query, headers):
+        self.reader = reader
+        self.writer = writer
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+
+    async def accept_websocket(self):
+        """Complete the WebSocket handshake.
+        Adapted from the webrepl websocket_helper.py:
+        https://github.com/micropython/webrepl/blob/master/websocket_helper.py
+        """
+        webkey = self.headers.get('sec-websocket-key')
+        if not webkey:
+            raise OSError('Not a websocket request')
+        respkey = hashlib.sha1(webkey.encode() + WEBSOCKET_GUID).digest()
+        respkey = binascii.b2a_base64(respkey)[:-1]
+        self.writer.write(
+            b'HTTP/1.1 101 Switching Protocols\r\n'
+            b'Upgrade: websocket\r\n'
+            b'Connection: Upgrade\r\n'
+            b'Sec-WebSocket-Accept: ' + respkey + b'\r\n\r\n'
+        )
+        await self.writer.drain()
+
+    async def read_websocket_message(self):
+        """Return the payload of the next text or binary message, replying to
+        any pings along the way, or raise WebSocketClosed.
+        """
+        reader = self.reader
+        while True:
+            header = await reader.readexactly(2)
+            opcode = header[0] & 0x0f
+            length = header[1] & 0x7f
+            if length == 126:
+                b = await reader.readexactly(2)
+                length = (b[0] << 8) | b[1]
+            elif length == 127:
+                b = await reader.readexactly(8)
+                length = 0
+                for byte in b:
+                    length = (length << 8) | byte
+            # Messages from the client are always masked.
+            mask = await reader.readexactly(4) if header[1] & 0x80 else None
+            payload = bytearray(await reader.readexactly(length))
+            if mask:
+                for i in range(length):
+                    payload[i] ^= mask[i & 3]
+            if opcode == OPCODE_CLOSE:
+                raise WebSocketClosed()
+            if opcode == OPCODE_PING:
+                self.writer.write(bytes((0x80 | OPCODE_PONG, length))
+                                  + payload)
+                await self.writer.drain()
+            elif opcode in (OPCODE_TEXT, OPCODE_BINARY):
+                return bytes(payload)
+
+
+async def send_response(writer, status, content_type, body):
+    if isinstance(body, str):
+        body = body.encode()
+    writer.write('HTTP/1.0 {} {}\r\nContent-Type: {}\r\n'
+                 'Content-Length: {}\r\n\r\n'.format(
+                     status, STATUS_TEXT_MAP.get(status, ''), content_type,
+                     len(body)).encode())
+    writer.write(body)
+    await writer.drain()
+
+
+def get_connection_handler(routes):
+    """Return a start_server() callback that dispatches each request to the
+    handler in the routes dict that matches its path.
+    """
+    async def handle_connection(reader, writer):
+        try:
+            request_line = await reader.readline()
+            if not request_line:
+                return
+            method, target, _ = request_line.decode().split(' ', 2)
+            path, _, query = target.partition('?')
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                k, _, v = line.decode().partition(':')
+                headers[k.strip().lower()] = v.strip()
+            handler = routes.get(path)
+            if handler is None:
+                await send_response(writer, 404, 'text/plain', 'Not Found')
+                return
+            request = Request(reader, writer, method, path,
+                              parse_query(query), headers)
+            try:
+                response = await handler(request)
+            except WebSocketClosed:
+                return
+            except (KeyError, ValueError) as e:
+                await send_response(writer, 400, 'text/plain', repr(e))
+                return
+            if response is not None:
+                await send_response(writer, *response)
+        except (OSError, EOFError):
+            pass
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+    return handle_connection
+
+
+async def serve(routes, host='0.0.0.0', port=80):
+    """Start a server for the routes dict, which maps each path to a handler.
+    """
+    return await asyncio.start_server(get_connection_handler(routes), host,
+                                      port)
@@ -1,19 +1,88 @@
 
+import _thread
 import json
 import machine
 import math
+import os
+from array import array
 from collections import deque
 from machine import (
     Pin,
     Timer,
+    mem32,
 )
+from micropython import const
 from utime import (
-    sleep_ms,
     sleep_us,
+    ticks_add,
+    ticks_diff,
+    ticks_ms,
+    ticks_us,
 )
 
-from fonts import char_def_to_points
-from fonts.default import CHARS
+import config
+from jobs import (
+    JobQueue,
+    UnknownJob,
+)
+from lib._os import (
+    path,
+    statvfs,
+)
+from metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    Registry,
+)
+from fonts import default_packed
+from fonts.glyphs import PackedGlyphStore
+from fonts.layout import (
+    ALIGNMENTS,
+    ALIGN_LEFT,
+    TextLayout,
+    TextTooWide,
+    get_bounds,
+    placements_to_strokes,
+)
+from motion import (
+    X_DIR_POSITIVE,
+    X_STEP,
+    Y_DIR_POSITIVE,
+    Y_STEP,
+    profile_duration,
+    profile_intervals,
+)
+from motion.curves import (
+    get_arc_segments,
+    get_cubic_segments,
+    get_quad_segments,
+)
+from motion.planner import Planner
+from paths import chain_strokes
+from paths.plotfile import (
+    PlotReader,
+    write_plot_file,
+)
+from paths.hatch import fill_shape
+from paths.route import plan_route
+from paths.simplify import Simplifier
+from paths.svg import (
+    Scanner,
+    get_viewport_matrix,
+    iter_path_strokes,
+    iter_paths,
+)
+from paths.transform import (
+    Pipeline,
+    get_max_scale,
+)
+from upload import (
+    IncompleteUpload,
+    format_checksum,
+    parse_checksum,
+    receive_file,
+)
 
 from lib.femtoweb import default_http_endpoints
 from lib.femtoweb.server import (
@@ -46,35 +115,135 @@ class OutOfBounds(Exception): pass
 
 X_AXIS = 'x'
 Y_AXIS = 'y'
-X_AXIS_MAX = 880
-Y_AXIS_MAX = 680
+# The size of the drawable area, in steps.
+X_AXIS_MAX = config.get('X_AXIS_MAX')
+Y_AXIS_MAX = config.get('Y_AXIS_MAX')
 DIR_UP = 'up'
 DIR_DOWN = 'down'
 DIR_LEFT = 'left'
 DIR_RIGHT = 'right'
 
-DIR_BACKLASH_STEPS_MAP = {
-    DIR_UP: 14,
-    DIR_DOWN: 14,
-    DIR_LEFT: 14,
-    DIR_RIGHT: 14,
-}
+# The number of steps that it takes to take up the backlash when reversing into
+# each direction, which varies from unit to unit and can be tuned using the
+# /calibrate_backlash endpoint.
+DIR_BACKLASH_STEPS_MAP = config.get('DIR_BACKLASH_STEPS')
+
+# The largest backlash step value that /calibrate_backlash accepts, which is
+# far more than any unit should need, so as to reject typos before they're
+# saved.
+MAX_BACKLASH_STEPS = 200
+
+# When MOTION_PROFILE_ENABLED is true, moves start and stop at the per-axis
+# MOTION_START_STEPS_PER_SEC rate, which must be low enough for the motors to
+# jump to without stalling, and accelerate at MOTION_ACCEL_STEPS_PER_SEC2 up
+# to MOTION_MAX_STEPS_PER_SEC in between. When false, every step is followed
+# by a fixed FIXED_STEP_INTERVAL_US delay, i.e. about 333 steps/s, which the
+# default start rate exceeds so that even the shortest moves are faster.
+MOTION_PROFILE_ENABLED = config.get('MOTION_PROFILE_ENABLED')
+MOTION_START_RATE_MAP = config.get('MOTION_START_STEPS_PER_SEC')
+MOTION_MAX_RATE_MAP = config.get('MOTION_MAX_STEPS_PER_SEC')
+MOTION_ACCEL_MAP = config.get('MOTION_ACCEL_STEPS_PER_SEC2')
+# Consecutive moves are planned MOTION_PLANNER_LOOKAHEAD moves at a time, with
+# corners taken at a speed that keeps the path within MOTION_JUNCTION_DEVIATION
+# steps of the vertex.
+MOTION_PLANNER_LOOKAHEAD = config.get('MOTION_PLANNER_LOOKAHEAD')
+MOTION_JUNCTION_DEVIATION = config.get('MOTION_JUNCTION_DEVIATION')
+FIXED_STEP_INTERVAL_US = 3000
+# Steps are issued either inline by the thread that plans them or, when set to
+# 'timer', from a hardware timer that drains a buffer of
+# MOTION_STEP_BUFFER_SIZE planned steps in the background, or, when set to
+# 'thread', by a _thread worker that drains a buffer of MOTION_BLOCK_BUFFER_SIZE
+# planned blocks.
+MOTION_STEP_EXECUTOR = config.get('MOTION_STEP_EXECUTOR')
+MOTION_STEP_BUFFER_SIZE = config.get('MOTION_STEP_BUFFER_SIZE')
+MOTION_BLOCK_BUFFER_SIZE = config.get('MOTION_BLOCK_BUFFER_SIZE')
+# The max distance, in steps, by which simplification may move the path.
+PATH_SIMPLIFY_TOLERANCE = config.get('PATH_SIMPLIFY_TOLERANCE_STEPS')
+# The number of bytes of a plot file to read or write at a time, which must be a
+# multiple of the 4-byte record size.
+PLOT_FILE_CHUNK_SIZE = config.get('PLOT_FILE_CHUNK_SIZE')
+# The number of bytes of an SVG file to read at a time.
+SVG_READ_CHUNK_SIZE = config.get('SVG_READ_CHUNK_SIZE')
+# The max distance, in steps, by which the line segments that approximate SVG
+# curves may deviate from them.
+SVG_CURVE_TOLERANCE = config.get('SVG_CURVE_TOLERANCE_STEPS')
+# The default distance, in steps, between the lines that hatch filled SVG
+# shapes, and their angle, in degrees counterclockwise from the x axis.
+SVG_HATCH_SPACING = config.get('SVG_HATCH_SPACING_STEPS')
+SVG_HATCH_ANGLE = config.get('SVG_HATCH_ANGLE_DEGREES')
+# The number of bytes of an uploaded file to read from the connection and write
+# at a time.
+UPLOAD_CHUNK_SIZE = config.get('UPLOAD_CHUNK_SIZE')
+# Either 'sync', to serve the full HTTP API with femtoweb and do all motion
+# within the route handlers, or 'asyncio', to serve the drawing UI from
+# coroutines that feed a motion coroutine through a queue. See run_async().
+RUNTIME_MODE = config.get('RUNTIME_MODE')
+# The max number of scaled glyph paths to keep in the glyph store's cache.
+GLYPH_CACHE_SIZE = config.get('GLYPH_CACHE_SIZE')
+# Whether to measure the lateness of each step, which is the only metric that's
+# updated per step rather than per block or move, and so is off by default to
+# keep it out of the step loop. It's measured where the steps are pulsed by
+# execute_entries_inline(), i.e. by the 'inline' and 'thread' step executors,
+# and not by the 'timer' one, whose steps are pulsed by the timer callback.
+METRICS_STEP_TIMING_ENABLED = config.get('METRICS_STEP_TIMING_ENABLED')
+
+STEPPER_X_STEP_PIN_NUM = const(4)
+STEPPER_X_DIR_PIN_NUM = const(2)
+STEPPER_Y_STEP_PIN_NUM = const(15)
+STEPPER_Y_DIR_PIN_NUM = const(13)
 
 STEPPER_NOT_ENABLE_PIN = Pin(0, Pin.OUT)
 STEPPER_NOT_ENABLE_PIN.value(1)
 
-STEPPER_X_STEP_PIN = Pin(4, Pin.OUT)
+STEPPER_X_STEP_PIN = Pin(STEPPER_X_STEP_PIN_NUM, Pin.OUT)
 STEPPER_X_STEP_PIN.value(0)
 
-STEPPER_X_DIR_PIN = Pin(2, Pin.OUT)
+STEPPER_X_DIR_PIN = Pin(STEPPER_X_DIR_PIN_NUM, Pin.OUT)
 STEPPER_X_DIR_PIN.value(1)
 
-STEPPER_Y_STEP_PIN = Pin(15, Pin.OUT)
+STEPPER_Y_STEP_PIN = Pin(STEPPER_Y_STEP_PIN_NUM, Pin.OUT)
 STEPPER_Y_STEP_PIN.value(0)
 
-STEPPER_Y_DIR_PIN = Pin(13, Pin.OUT)
+STEPPER_Y_DIR_PIN = Pin(STEPPER_Y_DIR_PIN_NUM, Pin.OUT)
 STEPPER_Y_DIR_PIN.value(1)
 
+# ESP32 GPIO output set/clear registers, which set or clear the output of each
+# GPIO 0-31 whose bit is set in the written value and leave the others as is.
+# See: ESP32 Technical Reference Manual, 4.12 Register Summary
+GPIO_OUT_W1TS_REG = const(0x3ff44008)
+GPIO_OUT_W1TC_REG = const(0x3ff4400c)
+
+
+def get_step_flags_masks():
+    """Return (<dir set>, <dir clear>, <step>) arrays of GPIO register masks,
+    indexed by step flags, that perform the steps specified by those flags.
+    """
+    dir_set_masks = array('I')
+    dir_clear_masks = array('I')
+    step_masks = array('I')
+    for flags in range(1 << 4):
+        dir_set_mask = 0
+        dir_clear_mask = 0
+        step_mask = 0
+        for step_flag, dir_flag, step_pin_num, dir_pin_num in (
+                (X_STEP, X_DIR_POSITIVE, STEPPER_X_STEP_PIN_NUM,
+                 STEPPER_X_DIR_PIN_NUM),
+                (Y_STEP, Y_DIR_POSITIVE, STEPPER_Y_STEP_PIN_NUM,
+                 STEPPER_Y_DIR_PIN_NUM)):
+            if not flags & step_flag:
+                continue
+            step_mask |= 1 << step_pin_num
+            if flags & dir_flag:
+                dir_set_mask |= 1 << dir_pin_num
+            else:
+                dir_clear_mask |= 1 << dir_pin_num
+        dir_set_masks.append(dir_set_mask)
+        dir_clear_masks.append(dir_clear_mask)
+        step_masks.append(step_mask)
+    return dir_set_masks, dir_clear_masks, step_masks
+
+DIR_SET_MASKS, DIR_CLEAR_MASKS, STEP_MASKS = get_step_flags_masks()
+
 
 x_pos = 0
 y_pos = 0
@@ -84,318 +253,895 @@ enable_steppers = lambda: STEPPER_NOT_ENABLE_PIN.value(0)
 disable_steppers = lambda: STEPPER_NOT_ENABLE_PIN.value(1)
 
 
-# Keep track of the last step direction for each axis so that we can compensate
-# for the backlash when the direction changes.
-axis_last_step_dir_map = {
-    X_AXIS: DIR_LEFT,
-    Y_AXIS: DIR_DOWN,
-}
-
-
-def pulse_step_pin(step_pin):
-    step_pin.value(1)
+def pulse_step_pins(flags):
+    """Set the direction of and pulse each axis specified in the step flags,
+    doing both axes at once with a single register write per edge.
+    """
+    step_mask = STEP_MASKS[flags]
+    if not step_mask:
+        return
+    mem32[GPIO_OUT_W1TS_REG] = DIR_SET_MASKS[flags]
+    mem32[GPIO_OUT_W1TC_REG] = DIR_CLEAR_MASKS[flags]
+    # The interpreter overhead between these writes exceeds the driver's
+    # direction setup time.
+    mem32[GPIO_OUT_W1TS_REG] = step_mask
     sleep_us(1)
-    step_pin.value(0)
+    mem32[GPIO_OUT_W1TC_REG] = step_mask
     sleep_us(1)
 
 
+def sleep_until(deadline):
+    """Sleep until the specified ticks_us() deadline and return it, or return
+    the current ticks_us() value if the deadline has already passed so that a
+    late step doesn't cause the following steps to bunch up trying to catch up.
+    """
+    remaining = ticks_diff(deadline, ticks_us())
+    if remaining <= 0:
+        return ticks_us()
+    sleep_us(remaining)
+    return deadline
+
+
+def get_backlash_steps():
+    """Return the DIR_BACKLASH_STEPS_MAP values in the form expected by the
+    Planner.
+    """
+    return (
+        (DIR_BACKLASH_STEPS_MAP[DIR_LEFT], DIR_BACKLASH_STEPS_MAP[DIR_RIGHT]),
+        (DIR_BACKLASH_STEPS_MAP[DIR_DOWN], DIR_BACKLASH_STEPS_MAP[DIR_UP]),
+    )
+
+
+def get_planner():
+    """Return a new Planner configured with the per-axis motion limits.
+    """
+    axis_pair = lambda m: (m[X_AXIS], m[Y_AXIS])
+    return Planner(
+        start_rates=axis_pair(MOTION_START_RATE_MAP),
+        max_rates=axis_pair(MOTION_MAX_RATE_MAP),
+        accels=axis_pair(MOTION_ACCEL_MAP),
+        junction_deviation=MOTION_JUNCTION_DEVIATION,
+        lookahead=MOTION_PLANNER_LOOKAHEAD,
+        backlash_steps=get_backlash_steps(),
+        # Assume that the axes last moved towards the origin.
+        axis_dirs=(-1, -1)
+    )
+
+
+def get_block_intervals(block):
+    """Return a generator of the microsecond intervals that precede each tick of
+    a planned block.
+    """
+    if not MOTION_PROFILE_ENABLED:
+        return (FIXED_STEP_INTERVAL_US for _ in range(block.num_steps))
+    entry_rate, cruise_rate, exit_rate, accel = block.get_tick_rates()
+    return profile_intervals(block.num_steps, entry_rate, cruise_rate,
+                             exit_rate, accel)
+
+
 def step(axis, direction):
+    """Update the current position to reflect a step of axis in direction and
+    return the step flags that perform it, or 0 if the step would exceed the
+    axis bounds.
+    """
     global x_pos
     global y_pos
     if axis == X_AXIS:
         if direction == DIR_LEFT:
             if x_pos == 0:
-                return False
+                return 0
             x_pos -= 1
+            return X_STEP
         elif direction == DIR_RIGHT:
             if x_pos == X_AXIS_MAX:
-                return False
+                return 0
             x_pos += 1
-        step_pin = STEPPER_X_STEP_PIN
-        dir_pin = STEPPER_X_DIR_PIN
+            return X_STEP | X_DIR_POSITIVE
     else:
         if direction == DIR_DOWN:
             if y_pos == 0:
-                return False
+                return 0
             y_pos -= 1
+            return Y_STEP
         elif direction == DIR_UP:
             if y_pos == Y_AXIS_MAX:
-                return False
+                return 0
             y_pos += 1
-        step_pin = STEPPER_Y_STEP_PIN
-        dir_pin = STEPPER_Y_DIR_PIN
+            return Y_STEP | Y_DIR_POSITIVE
+    return 0
 
-    dir_pin(0 if direction in (DIR_DOWN, DIR_LEFT) else 1)
 
-    # If the current direction is the opposite of the last axis step, step
-    # through the backlash.
-    if direction != axis_last_step_dir_map[axis]:
-        num_backlash_steps = DIR_BACKLASH_STEPS_MAP[direction]
-        while num_backlash_steps:
-            pulse_step_pin(step_pin)
-            sleep_ms(3)
-            num_backlash_steps -= 1
-        axis_last_step_dir_map[axis] = direction
+def multi_step(axis, direction, num_steps):
+    if num_steps <= 0:
+        return
+    if direction in (DIR_DOWN, DIR_LEFT):
+        num_steps = -num_steps
+    if axis == X_AXIS:
+        move_by(num_steps, 0)
+    else:
+        move_by(0, num_steps)
 
-    pulse_step_pin(step_pin)
-    return True
 
+def get_block_duration(block):
+    """Return the approximate number of seconds that a planned block takes to
+    execute.
+    """
+    if not MOTION_PROFILE_ENABLED:
+        return block.num_steps * FIXED_STEP_INTERVAL_US / 1000000
+    entry_rate, cruise_rate, exit_rate, accel = block.get_tick_rates()
+    return profile_duration(block.num_steps, entry_rate, cruise_rate,
+                            exit_rate, accel)
 
-def multi_step(axis, direction, num_steps):
-    enable_steppers()
-    while num_steps:
-        step(axis, direction)
-        sleep_ms(3)
-        num_steps -= 1
-    disable_steppers()
 
+def get_block_entries(block):
+    """Return a generator of the (<flags>, <interval>) step entries that
+    perform a planned block, where interval is the number of microseconds to
+    wait before issuing the step.
+    """
+    x_dir = DIR_LEFT if block.x_delta < 0 else DIR_RIGHT
+    y_dir = DIR_DOWN if block.y_delta < 0 else DIR_UP
+    x_backlash = block.x_backlash
+    y_backlash = block.y_backlash
+    tick_flags = block.get_step_flags()
+
+    for interval in get_block_intervals(block):
+        line_flags = next(tick_flags)
+        flags = 0
+
+        # Backlash take-up steps are issued without changing the position.
+        if line_flags & X_STEP:
+            if x_backlash:
+                x_backlash -= 1
+                flags |= line_flags & (X_STEP | X_DIR_POSITIVE)
+            else:
+                flags |= step(X_AXIS, x_dir)
+
+        if line_flags & Y_STEP:
+            if y_backlash:
+                y_backlash -= 1
+                flags |= line_flags & (Y_STEP | Y_DIR_POSITIVE)
+            else:
+                flags |= step(Y_AXIS, y_dir)
+
+        yield flags, interval
+
+
+def execute_block(block, deadline):
+    """Issue the steps of a planned block, either by pushing the block or its
+    steps to the step engine or by pulsing them inline, in which case the
+    first step is issued one interval after the specified ticks_us() deadline.
+    Return the deadline of the last step.
+    """
+    record_block_metrics(block)
+    if MOTION_STEP_EXECUTOR == 'thread':
+        step_engine.push(block)
+        return deadline
+    return execute_entries(get_block_entries(block), deadline)
 
-is_moving_to_point = False
 
-def move_to_point(x, y):
-    global x_pos
-    global y_pos
-    global is_moving_to_point
+def execute_entries(entries, deadline):
+    """Issue the (<flags>, <interval>) step entries, either by pushing them to
+    the step engine or by pulsing them inline, and return the deadline of the
+    last step.
+    """
+    if step_engine is not None:
+        for flags, interval in entries:
+            step_engine.push(flags, interval)
+        return deadline
+    return execute_entries_inline(entries, deadline)
+
+
+def iter_chunks(iterable, size):
+    """Return a generator of lists of up to size consecutive items of the
+    iterable.
+    """
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_execute_block(block, deadline, yield_steps=None):
+    """Issue the steps of a planned block like execute_block() does, and return
+    a generator that yields the deadline of the last step issued after every
+    yield_steps steps, or, if yield_steps is None or the steps are issued by
+    the step thread, once the block has been handed off.
+    """
+    if yield_steps is None or MOTION_STEP_EXECUTOR == 'thread':
+        yield execute_block(block, deadline)
+        return
+    record_block_metrics(block)
+    for entries in iter_chunks(get_block_entries(block), yield_steps):
+        deadline = execute_entries(entries, deadline)
+        yield deadline
+
+
+def iter_execute_blocks(blocks, deadline, on_block=None, yield_steps=None):
+    """Issue the steps of each of the planned blocks, calling on_block, if
+    specified, with each one once it's been handed off, and return a generator
+    that yields whenever iter_execute_block() does.
+    """
+    for block in blocks:
+        for deadline in iter_execute_block(block, deadline, yield_steps):
+            yield deadline
+        if on_block is not None:
+            on_block(block)
+
+
+def execute_block_inline(block, deadline):
+    return execute_entries_inline(get_block_entries(block), deadline)
 
-    if x > X_AXIS_MAX or y > Y_AXIS_MAX:
+
+def execute_entries_inline(entries, deadline):
+    for flags, interval in entries:
+        step_deadline = ticks_add(deadline, interval)
+        deadline = sleep_until(step_deadline)
+        if METRICS_STEP_TIMING_ENABLED:
+            STEP_LATENESS.observe(ticks_diff(ticks_us(), step_deadline))
+        pulse_step_pins(flags)
+    return deadline
+
+
+def check_point(x, y):
+    """Return the specified point with any fractional component discarded, or
+    raise OutOfBounds if it's outside of the drawable area.
+    """
+    if x < 0 or y < 0 or x > X_AXIS_MAX or y > Y_AXIS_MAX:
         raise OutOfBounds('x,y max is {},{}, got {},{}'.format(
             X_AXIS_MAX, Y_AXIS_MAX, x, y))
+    return math.floor(x), math.floor(y)
 
-    # Discard any specified fractional component and calculate deltas.
-    x = math.floor(x)
-    y = math.floor(y)
-    x_delta = x - x_pos
-    y_delta = y - y_pos
 
-    # Plan a linear path.
-    max_delta = max(abs(x_delta), abs(y_delta))
-    if max_delta == 0:
-        return
-    x_acc_step_size = x_delta / max_delta
-    y_acc_step_size = y_delta / max_delta
-    x_acc = 0
-    y_acc = 0
+is_moving_to_point = False
+
+def get_start_position():
+    """Return the position from which to plan a new path.
+    """
+    if MOTION_STEP_EXECUTOR == 'thread':
+        # The worker updates the position as it executes each block, so let
+        # it finish the previously pushed ones.
+        step_engine.wait()
+    return x_pos, y_pos
+
+
+def move_to_point(x, y):
+    move_to_points(((x, y),))
+
+
+def move_by(x_delta, y_delta):
+    """Move by the specified relative number of steps, stopping at the axis
+    bounds.
+    """
+    def get_blocks(x, y):
+        # Resolve the target from the start position that execute_planned()
+        # waits for, rather than x_pos/y_pos, which trail the pushed blocks
+        # while the step thread is running.
+        next_x = min(max(x + x_delta, 0), X_AXIS_MAX)
+        next_y = min(max(y + y_delta, 0), Y_AXIS_MAX)
+        yield from planner.add(next_x - x, next_y - y)
+
+    execute_planned(get_blocks)
+
+
+# Serialize the moves of the job worker thread and the route handlers.
+motion_lock = _thread.allocate_lock()
+
+def execute_planned(get_blocks, on_block=None):
+    """Execute the planned blocks, as returned by get_blocks(<start x>,
+    <start y>), and then the ones that remain in the planner.
+    """
+    for _ in iter_execute_planned(get_blocks, on_block):
+        pass
 
+
+def iter_execute_planned(get_blocks, on_block=None, yield_steps=None):
+    """Execute the planned blocks like execute_planned() does, and return a
+    generator that yields whenever iter_execute_block() does, so that the
+    caller can do other work in between, e.g. let other coroutines run.
+    """
+    global is_moving_to_point
+    motion_lock.acquire()
+    start_ticks = ticks_us()
+    x, y = get_start_position()
+
+    is_moving_to_point = True
     enable_steppers()
-    while x_pos != x or y_pos != y:
-        is_moving_to_point = True
+    if step_engine is not None:
+        step_engine.begin()
+    deadline = ticks_us()
+    try:
+        error = None
+        try:
+            for deadline in iter_execute_blocks(get_blocks(x, y), deadline,
+                                                on_block, yield_steps):
+                yield
+        except Exception as e:
+            # Visit the points that preceded the error, e.g. an invalid point,
+            # before raising it.
+            error = e
+        for deadline in iter_execute_blocks(planner.flush(), deadline,
+                                            on_block, yield_steps):
+            yield
+        if error is not None:
+            raise error
+    finally:
+        # Don't yield in here, since the generator may be being closed, e.g.
+        # when the motion coroutine is cancelled, in which case the blocks
+        # that remain in the planner are discarded.
+        planner.discard()
+        if step_engine is not None:
+            # Let the engine disable the steppers once it finishes.
+            step_engine.end()
+        else:
+            disable_steppers()
+        is_moving_to_point = False
+        MOVE_DURATION.observe(ticks_diff(ticks_us(), start_ticks) / 1000000)
+        motion_lock.release()
+
+
+def move_to_points(points, on_block=None):
+    """Move along a sequence of points, looking ahead over the upcoming points
+    in order to pass through the intermediate ones without stopping.
+    Any points that precede an invalid point are still visited before the
+    exception is raised.
+    If specified, on_block is called with each planned block as it's handed
+    off for execution.
+    """
+    def get_blocks(x, y):
+        # Track the planned position, which leads x_pos/y_pos by the buffered
+        # blocks.
+        for point in points:
+            next_x, next_y = check_point(*point)
+            yield from planner.add(next_x - x, next_y - y)
+            x, y = next_x, next_y
+
+    execute_planned(get_blocks, on_block)
+
+
+def move_along_curve(get_segments):
+    """Move along the segments, as returned by get_segments(<start x>,
+    <start y>), e.g. a motion.curves get_*_segments() function, of a curve
+    that starts at the current position, or raise OutOfBounds before moving
+    if any part of it is outside of the drawable area.
+    """
+    def get_blocks(x, y):
+        segments = get_segments(x, y)
+        # Neither axis changes direction within a segment, so its end points
+        # bound it.
+        for segment in segments:
+            check_point(segment.x1, segment.y1)
+        for segment in segments:
+            yield from planner.add_curve(segment)
+
+    execute_planned(get_blocks)
+
+
+def arc_to(x, y, cx, cy, clockwise=False):
+    """Move along the circular arc around cx,cy from the current position to
+    x,y, which must be the same distance from it, or around the full circle
+    if x,y is the current position.
+    """
+    move_along_curve(lambda x0, y0: get_arc_segments(x0, y0, x, y, cx, cy,
+                                                     clockwise))
 
-        if x_acc_step_size != 0 and x_pos != x:
-            last_x_acc = x_acc
-            x_acc += x_acc_step_size
-            if math.floor(x_acc) != math.floor(last_x_acc):
-                if x_acc_step_size < 0:
-                    step(X_AXIS, DIR_LEFT)
-                elif x_acc_step_size > 0:
-                    step(X_AXIS, DIR_RIGHT)
 
-        if y_acc_step_size != 0 and y_pos != y:
-            last_y_acc = y_acc
-            y_acc += y_acc_step_size
-            if math.floor(y_acc) != math.floor(last_y_acc):
-                if y_acc_step_size < 0:
-                    step(Y_AXIS, DIR_DOWN)
-                elif y_acc_step_size > 0:
-                    step(Y_AXIS, DIR_UP)
+def quad_to(x1, y1, x, y):
+    """Move along the quadratic Bezier curve from the current position to x,y
+    with control point x1,y1.
+    """
+    move_along_curve(lambda x0, y0: get_quad_segments(x0, y0, x1, y1, x, y))
+
 
-        sleep_ms(3)
-    is_moving_to_point = False
-    disable_steppers()
+def cubic_to(x1, y1, x2, y2, x, y):
+    """Move along the cubic Bezier curve from the current position to x,y
+    with control points x1,y1 and x2,y2.
+    """
+    move_along_curve(lambda x0, y0: get_cubic_segments(x0, y0, x1, y1, x2,
+                                                       y2, x, y))
+
+
+# The max distance, in steps, by which the preview polyline of an estimate may
+# deviate from the path, which only needs to be about as accurate as the
+# pixels that it's drawn with.
+ESTIMATE_POLYLINE_TOLERANCE = 2
+
+def estimate_points(points, include_polyline=False):
+    """Plan the moves along a sequence of points, starting from the current
+    position, without moving and return a dict that describes the job,
+    including whether all of the points are within bounds and, if
+    include_polyline is True, a flat [x0, y0, x1, y1, ...] list of the
+    points for previewing the path, starting from the current position and
+    simplified to within ESTIMATE_POLYLINE_TOLERANCE steps.
+    The bounding box is that of the points, or None if there are none, and
+    the per-axis step counts exclude backlash steps, which are counted
+    separately.
+    """
+    # Plan with a separate planner that starts with the current axis
+    # directions so as to not disturb the state of the real one.
+    estimate_planner = get_planner()
+    estimate_planner.axis_dirs = list(planner.axis_dirs)
+
+    start_point = get_start_position()
+    totals = {
+        'points': 0,
+        'out_of_bounds': 0,
+        'bounds': None,
+        'x_steps': 0,
+        'y_steps': 0,
+        'reversals': 0,
+        'backlash_steps': 0,
+        'duration': 0,
+    }
 
+    def add_blocks(blocks):
+        for block in blocks:
+            totals['x_steps'] += abs(block.x_delta) - block.x_backlash
+            totals['y_steps'] += abs(block.y_delta) - block.y_backlash
+            totals['reversals'] += ((1 if block.x_reversal else 0)
+                                    + (1 if block.y_reversal else 0))
+            totals['backlash_steps'] += block.x_backlash + block.y_backlash
+            totals['duration'] += get_block_duration(block)
+
+    def plan_points():
+        # Plan each point and then yield it, starting with the current
+        # position, so that the caller can preview the path as it's planned.
+        x, y = start_point
+        yield x, y
+        for next_x, next_y in points:
+            next_x = math.floor(next_x)
+            next_y = math.floor(next_y)
+            totals['points'] += 1
+            if (next_x < 0 or next_y < 0 or next_x > X_AXIS_MAX
+                    or next_y > Y_AXIS_MAX):
+                totals['out_of_bounds'] += 1
+            bounds = totals['bounds']
+            if bounds is None:
+                totals['bounds'] = [next_x, next_y, next_x, next_y]
+            else:
+                bounds[0] = min(bounds[0], next_x)
+                bounds[1] = min(bounds[1], next_y)
+                bounds[2] = max(bounds[2], next_x)
+                bounds[3] = max(bounds[3], next_y)
+            add_blocks(estimate_planner.add(next_x - x, next_y - y))
+            x, y = next_x, next_y
+            yield x, y
+        add_blocks(estimate_planner.flush())
+
+    polyline = None
+    if include_polyline:
+        polyline = []
+        simplifier = Simplifier(ESTIMATE_POLYLINE_TOLERANCE)
+        for x, y in simplifier.simplify(plan_points()):
+            polyline.append(x)
+            polyline.append(y)
+    else:
+        for _ in plan_points():
+            pass
 
-def move_to_points(points):
-    """Move along a sequence of points.
+    bounds = totals['bounds']
+    data = {
+        'num_points': totals['points'],
+        'num_out_of_bounds_points': totals['out_of_bounds'],
+        'fits': totals['out_of_bounds'] == 0,
+        'bounding_box': None if bounds is None else {
+            'min': {'x': bounds[0], 'y': bounds[1]},
+            'max': {'x': bounds[2], 'y': bounds[3]},
+        },
+        'steps': {'x': totals['x_steps'], 'y': totals['y_steps']},
+        'reversals': totals['reversals'],
+        'backlash_steps': totals['backlash_steps'],
+        'duration_seconds': totals['duration'],
+    }
+    if include_polyline:
+        data['polyline'] = polyline
+    return data
+
+
+def get_backlash_calibration_points(axis, length, spacing, num_strokes):
+    """Return the points of a backlash calibration pattern that starts at the
+    current position: a reference stroke of length steps in the positive axis
+    direction, followed by num_strokes strokes that alternate direction and
+    are each offset spacing steps from the previous.
+
+    If the backlash is correctly compensated, the ends of the alternating
+    strokes line up with the ends of the reference stroke. If the negative
+    direction ends fall short of the reference stroke, increase the backlash
+    for that direction, and if they overshoot, decrease it. The positive
+    direction ends are then offset by the difference between the positive and
+    negative direction errors.
+
+    Raise OutOfBounds if any part of the pattern would be outside of the
+    drawable area.
+    """
+    # Lead in with a move in the positive direction to take up any slack
+    # before drawing the reference stroke.
+    x, y = get_start_position()
+    start = x if axis == X_AXIS else y
+    offset = y if axis == X_AXIS else x
+    strokes = [start + length // 2, start + length // 2 + length]
+    points = [(strokes[0], offset), (strokes[1], offset)]
+    for i in range(num_strokes):
+        offset += spacing
+        points.append((strokes[(i + 1) % 2], offset))
+        points.append((strokes[i % 2], offset))
+    if axis == Y_AXIS:
+        points = [(x, y) for y, x in points]
+    for point in points:
+        check_point(*point)
+    return points
+
+
+planner = get_planner()
+
+step_engine = None
+if MOTION_STEP_EXECUTOR == 'timer':
+    from motion.stepgen import StepEngine
+    step_engine = StepEngine(pulse_step_pins, MOTION_STEP_BUFFER_SIZE,
+                             on_idle=disable_steppers)
+elif MOTION_STEP_EXECUTOR == 'thread':
+    from motion.stepthread import StepThread
+    step_engine = StepThread(execute_block_inline, MOTION_BLOCK_BUFFER_SIZE,
+                             on_idle=disable_steppers)
+
+
+def get_simplifier(tolerance=None):
+    """Return a Simplifier with the specified tolerance, or the configured one
+    if tolerance is None.
     """
-    for x, y in points:
-        move_to_point(x, y)
+    if tolerance is None:
+        tolerance = PATH_SIMPLIFY_TOLERANCE
+    return Simplifier(tolerance)
+
+
+def strokes_to_points(strokes, optimize_route=False):
+    """Return an iterable of the points that draw the strokes, either in order
+    or, if optimize_route is True, along the route that minimizes the number
+    of extra lines and re-traced segments needed to connect them.
+    """
+    if optimize_route:
+        return plan_route(strokes, get_start_position())
+    return chain_strokes(strokes)
 
 
 ###############################################################################
-# Text Drawing Functions
+# Metrics
 ###############################################################################
 
-def draw_text(text, char_height, char_spacing=None, word_spacing=None,
-              x_offset=None, y_offset=None):
+metrics = Registry()
+
+STEPS = metrics.add(Counter(
+    'sketchy_steps_total',
+    'Steps that changed the position, per axis.',
+    label='axis'
+))
+BACKLASH_STEPS = metrics.add(Counter(
+    'sketchy_backlash_steps_total',
+    'Steps taken to take up backlash, per axis.',
+    label='axis'
+))
+REVERSALS = metrics.add(Counter(
+    'sketchy_reversals_total',
+    'Changes of direction, per axis.',
+    label='axis'
+))
+BACKLASH_SECONDS = metrics.add(Counter(
+    'sketchy_backlash_seconds_total',
+    'Estimated time spent taking up backlash.'
+))
+STEP_BUFFER_UNDERRUNS = metrics.add(Counter(
+    'sketchy_step_buffer_underruns_total',
+    'Times that the background step executor ran dry mid-path because the '
+    'planner did not keep up.'
+))
+MOVE_DURATION = metrics.add(Histogram(
+    'sketchy_move_duration_seconds',
+    'Time spent in each call to move_to_points().',
+    (0.1, 0.5, 1, 5, 10, 30, 60, 300)
+))
+STEP_LATENESS = metrics.add(Histogram(
+    'sketchy_step_lateness_microseconds',
+    'How late each step was issued relative to its planned time by the inline '
+    'or thread step executor, when METRICS_STEP_TIMING_ENABLED is true.',
+    (10, 50, 100, 250, 500, 1000, 5000)
+))
+DRAW_QUEUE_DEPTH = metrics.add(Gauge(
+    'sketchy_draw_queue_depth',
+    'The number of /draw points waiting to be drawn.'
+))
+DRAW_QUEUE_MAX_DEPTH = metrics.add(Gauge(
+    'sketchy_draw_queue_max_depth',
+    'The max number of /draw points that have waited to be drawn at once.'
+))
+GLYPH_CACHE_LOOKUPS = metrics.add(Counter(
+    'sketchy_glyph_cache_lookups_total',
+    'Scaled glyph path lookups, by result.',
+    label='result'
+))
+DRAW_QUEUE_DROPS = metrics.add(Counter(
+    'sketchy_draw_queue_drops_total',
+    '/draw points dropped because the queue was full.'
+))
+
+
+def record_block_metrics(block):
+    x_backlash = block.x_backlash
+    y_backlash = block.y_backlash
+    STEPS.inc(abs(block.x_delta) - x_backlash, X_AXIS)
+    STEPS.inc(abs(block.y_delta) - y_backlash, Y_AXIS)
+    if block.x_reversal:
+        REVERSALS.inc(1, X_AXIS)
+    if block.y_reversal:
+        REVERSALS.inc(1, Y_AXIS)
+    if x_backlash or y_backlash:
+        BACKLASH_STEPS.inc(x_backlash, X_AXIS)
+        BACKLASH_STEPS.inc(y_backlash, Y_AXIS)
+        # The backlash is taken up by the first ticks of the block, which are
+        # taken at about the entry rate.
+        entry_rate = block.get_tick_rates()[0]
+        BACKLASH_SECONDS.inc(max(x_backlash, y_backlash) / entry_rate)
+
+
+def record_draw_queue_append(dq, point):
+    """Append a /draw point to the queue, recording whether the oldest point
+    was dropped to make room.
     """
+    if len(dq) == DRAW_QUEUE_SIZE:
+        DRAW_QUEUE_DROPS.inc()
+    dq.append(point)
+    depth = len(dq)
+    if depth > DRAW_QUEUE_MAX_DEPTH.values.get(None, 0):
+        DRAW_QUEUE_MAX_DEPTH.set(depth)
+
+
+def render_metrics():
+    DRAW_QUEUE_DEPTH.set(len(_draw_dq) + len(motion_points))
+    if step_engine is not None:
+        STEP_BUFFER_UNDERRUNS.values[None] = step_engine.num_underruns
+    GLYPH_CACHE_LOOKUPS.values['hit'] = glyph_store.num_hits
+    GLYPH_CACHE_LOOKUPS.values['miss'] = glyph_store.num_misses
+    return metrics.render()
+
+
+def reset_metrics():
+    metrics.reset()
+    if step_engine is not None:
+        step_engine.num_underruns = 0
+    glyph_store.num_hits = 0
+    glyph_store.num_misses = 0
+
+
+###############################################################################
+# Job Functions
+###############################################################################
+
+get_block_num_steps = lambda block: abs(block.x_delta) + abs(block.y_delta)
+
+
+def estimate_job(points):
+    """Return a (<total steps>, <total seconds>) tuple for a job.
     """
-    # TODO: check whether plotting text will exceed width before starting
-    # TODO: add line wrapping
+    estimate = estimate_points(points)
+    steps = estimate['steps']
+    # Count the backlash steps too, like get_block_num_steps() does.
+    return (steps['x'] + steps['y'] + estimate['backlash_steps'],
+            estimate['duration_seconds'])
+
+
+def run_job(points, add_progress):
+    move_to_points(
+        points,
+        on_block=lambda block: add_progress(get_block_num_steps(block),
+                                            get_block_duration(block))
+    )
 
-    # If not specified, set char_spacing and word_spacing relative to
-    # char_height.
-    if char_spacing is None:
-        char_spacing = math.floor(char_height / 8)
-    if word_spacing is None:
-        word_spacing = char_spacing * 4
 
-    # Use the current x/y position if unspecified.
-    if x_offset is None:
-        x_offset = x_pos
-    if y_offset is None:
-        y_offset = y_pos
-
-    # Iterate through the characters in text, drawing each and incrementing the
-    # x_offset.
-    for char in text:
-        # Handle SPACE and unsupported chars by advancing the x position by
-        # word_spacing number of steps.
-        if char == ' ' or char not in CHARS:
-            multi_step(X_AXIS, DIR_RIGHT, word_spacing)
-            x_offset += word_spacing
-            continue
+job_queue = JobQueue(estimate_job, run_job)
 
-        points = list(char_def_to_points(CHARS[char]))
 
-        # Calculate the scale.
-        max_y = max(y for _, y in points)
-        scale = math.ceil(char_height / (max_y + 1))
+###############################################################################
+# Plot File Functions
+###############################################################################
 
-        # Add a sprue directly below the character entry point.
-        sprue_coord = points[0]
-        # Move all the points up one to make room for the sprue.
-        points = [(x, y + 1) for x, y in points]
-        points = [sprue_coord] + points + [sprue_coord]
+# Preallocate the plot file buffers so that replaying a file doesn't allocate
+# per chunk. The route handlers share plot_file_buf, since they run one at a
+# time, and the job worker thread, which runs alongside them, has its own.
+plot_file_buf = bytearray(PLOT_FILE_CHUNK_SIZE)
+job_plot_file_buf = bytearray(PLOT_FILE_CHUNK_SIZE)
 
-        # Apply the scaling.
-        points = [(x * scale, y * scale) for x, y in points]
+# Preallocate the upload buffer.
+upload_buf = bytearray(UPLOAD_CHUNK_SIZE)
 
-        # Calc the next x_offset.
-        next_x_offset = max(x for x, _ in points) + char_spacing
 
-        # Apply offset.
-        points = [(x + x_offset, y + y_offset) for x, y in points]
+def read_svg_points(filename, optimize_route=False, fill=False,
+                    hatch_spacing=None, hatch_angle=None):
+    """Return a generator of the points that draw the paths in the SVG file.
+    """
+    with open(filename, 'rb') as fh:
+        yield from svg_to_points(fh, optimize_route, fill, hatch_spacing,
+                                 hatch_angle)
 
-        move_to_points(points)
 
-        x_offset += next_x_offset
+def read_plot_file(filename, buf=plot_file_buf):
+    """Return a generator of the points in the plot file, which is read into
+    buf.
+    """
+    with open(filename, 'rb') as fh:
+        yield from PlotReader(fh, buf).read_points()
+
 
+def save_plot_file(filename, points):
+    """Write the points to a plot file and return the number of points written.
+    """
+    with open(filename, 'wb') as fh:
+        return write_plot_file(fh, points, plot_file_buf)
 
 
 ###############################################################################
-# SVG Parser
+# Text Drawing Functions
 ###############################################################################
 
-def render_svg(fh):
-    # TODO - move import to top of module.
-    # Install xmltok if necessary.
+# Read the glyphs from the font as precompiled by host/compile_font.py, and cache
+# the paths of the most recently drawn (<char>, <scale>) pairs.
+glyph_store = PackedGlyphStore(default_packed, GLYPH_CACHE_SIZE)
+
+
+def draw_text(text, char_height, char_spacing=None, word_spacing=None,
+              x_offset=None, y_offset=None, optimize_route=False, width=None,
+              align=ALIGN_LEFT, line_spacing=None):
+    """Draw the text as a single continuous path.
+    """
+    move_to_points(get_simplifier().simplify(text_to_points(
+        text, char_height, char_spacing, word_spacing, x_offset, y_offset,
+        optimize_route, width, align, line_spacing)))
+
+
+def text_to_points(text, char_height, char_spacing=None, word_spacing=None,
+                   x_offset=None, y_offset=None, optimize_route=False,
+                   width=None, align=ALIGN_LEFT, line_spacing=None):
+    """Return an iterable of the points that draw the text.
+    Raise OutOfBounds before returning if any part of the text would be
+    outside of the drawable area.
+    """
+    return strokes_to_points(text_to_strokes(
+        text, char_height, char_spacing, word_spacing, x_offset, y_offset,
+        width, align, line_spacing), optimize_route)
+
+
+def text_to_strokes(text, char_height, char_spacing=None, word_spacing=None,
+                    x_offset=None, y_offset=None, width=None,
+                    align=ALIGN_LEFT, line_spacing=None):
+    """Return a generator of the point lists of each glyph of the text, laid
+    out as lines that wrap to fit within width steps of x_offset, or within
+    the drawable area if width is unspecified, aligned within that width, and
+    with the first line's baseline at y_offset.
+    Raise OutOfBounds before returning if any part of the text would be
+    outside of the drawable area.
+    """
+    # Use the current x/y position if unspecified.
+    x, y = get_start_position()
+    if x_offset is None:
+        x_offset = x
+    if y_offset is None:
+        y_offset = y
+
+    if width is None:
+        width = X_AXIS_MAX - x_offset
+    elif x_offset + width > X_AXIS_MAX:
+        raise OutOfBounds('x max is {}, got box right edge {}'.format(
+            X_AXIS_MAX, x_offset + width))
+
+    layout = TextLayout(glyph_store, char_height, char_spacing, word_spacing,
+                        line_spacing)
     try:
-        import xmltok
-    except ImportError:
-        import upip
-        upip.install('xmltok')
-    import re
-
-    width = None
-    width_unit = None
-    height = None
-    height_unit = None
-    scale = None
-
-    NUMBER_UNIT_REGEX = re.compile('^(\d+)(.*)$')
-    parse_number_unit = lambda s: NUMBER_UNIT_REGEX.match(s)
-
-    FLOAT_RE_PATTERN = '\-?\d+(?:\.\d+)?'
-    PATH_COORD_REGEX = re.compile('({0}),({0})'.format(FLOAT_RE_PATTERN))
-
-    TRANSLATE_REGEX = re.compile(
-        'translate\(({0}),({0})\)'.format(FLOAT_RE_PATTERN)
-    )
+        placements = layout.layout(text, x_offset, y_offset, width, align)
+    except TextTooWide as e:
+        raise OutOfBounds(str(e))
+
+    # Check the whole block of text before anything moves.
+    bounds = get_bounds(placements)
+    if bounds is not None:
+        min_x, min_y, max_x, max_y = bounds
+        if min_x < 0 or min_y < 0 or max_x > X_AXIS_MAX or max_y > Y_AXIS_MAX:
+            raise OutOfBounds(
+                'x,y max is {},{}, got text bounds {},{} to {},{}'.format(
+                    X_AXIS_MAX, Y_AXIS_MAX, min_x, min_y, max_x, max_y))
 
-    g_translates = []
-    translate = (0, 0)
-    open_tags = []
-    first_path_point = None
-    relative_reference = (0, 0)
-
-    for token in xmltok.tokenize(fh):
-        if token[0] == 'START_TAG':
-            tag = token[1][1]
-            open_tags.append(tag)
-            if tag == 'g':
-                g_translates.append((0, 0))
-            elif tag == 'path':
-                first_path_point = None
-
-        elif token[0] == 'END_TAG':
-            tag = token[1][1]
-            open_tags.pop()
-            if tag == 'g':
-                x, y = g_translates.pop()
-                translate = translate[0] - x, translate[1] - y
-
-        if token[0] != 'ATTR':
+    return placements_to_strokes(placements)
+
+
+###############################################################################
+# SVG Parser
+###############################################################################
+
+def render_svg(fh, optimize_route=False, fill=False, hatch_spacing=None,
+               hatch_angle=None):
+    move_to_points(get_simplifier().simplify(
+        svg_to_points(fh, optimize_route, fill, hatch_spacing, hatch_angle)))
+
+
+def svg_to_points(fh, optimize_route=False, fill=False, hatch_spacing=None,
+                  hatch_angle=None):
+    """Return an iterable of the points that draw the paths in the SVG file.
+    """
+    return strokes_to_points(
+        svg_to_strokes(fh, fill, hatch_spacing, hatch_angle), optimize_route)
+
+
+def svg_to_strokes(fh, fill=False, hatch_spacing=None, hatch_angle=None):
+    """Return a generator of the point iterables of each subpath in the SVG
+    file, which must be opened in binary mode, fit to and clipped to the
+    drawable area.
+    If fill is True, each filled path is followed by a stroke that hatches it,
+    with lines hatch_spacing steps apart at hatch_angle degrees, which default
+    to SVG_HATCH_SPACING and SVG_HATCH_ANGLE, linked along its outline.
+    Each point iterable must be consumed before the next one is requested.
+    """
+    if hatch_spacing is None:
+        hatch_spacing = SVG_HATCH_SPACING
+    if hatch_angle is None:
+        hatch_angle = SVG_HATCH_ANGLE
+    scanner = Scanner(fh, bytearray(SVG_READ_CHUNK_SIZE))
+    get_root_matrix = lambda attrs: get_viewport_matrix(attrs, X_AXIS_MAX,
+                                                        Y_AXIS_MAX)
+    for matrix, fill_rule, parser in iter_paths(scanner, get_root_matrix):
+        # Flatten curves to within SVG_CURVE_TOLERANCE steps once scaled.
+        tolerance = SVG_CURVE_TOLERANCE / (get_max_scale(matrix) or 1)
+        strokes = iter_path_strokes(parser, tolerance)
+        if not fill or fill_rule is None:
+            # Apply the path's cumulative transform, invert the y axis, and
+            # clip to the drawable area, in a single pass over each stroke.
+            pipeline = (
+                Pipeline()
+                .transform(matrix)
+                .flip_y(Y_AXIS_MAX)
+                .clip(0, 0, X_AXIS_MAX, Y_AXIS_MAX)
+                .floor()
+            )
+            for stroke in strokes:
+                yield pipeline.apply(stroke)
             continue
-        (_, k), v = token[1:]
-
-        if k == 'height':
-            match = parse_number_unit(v)
-            height = float(match.group(1))
-            height_unit = match.group(2)
-
-        elif k == 'width':
-            match = parse_number_unit(v)
-            width = float(match.group(1))
-            width_unit = match.group(2)
-
-        elif k == 'transform' and open_tags[-1] == 'g':
-            match = TRANSLATE_REGEX.match(v)
-            if match:
-                x = float(match.group(1))
-                y = float(match.group(2))
-                g_translates[-1] = x, y
-                translate = translate[0] + x, translate[1] + y
-
-        elif k == 'd':
-            if not width or not height:
-                raise AssertionError(
-                    'about to parse path but height and/or width not '
-                    'set: {}/{}'.format(width, height))
-            elif width_unit != height_unit:
-                raise AssertionError('Different width/height units: {}/{}'
-                                     .format(width_unit, height_unit))
-            elif scale is None:
-                scale = math.floor(max(X_AXIS_MAX, Y_AXIS_MAX) / max(width, height))
-
-            is_relative = False
-            for s in v.split():
-                match = PATH_COORD_REGEX.match(s)
-                if not match:
-                    if s != 'z':
-                        is_relative = s.islower()
-                        continue
-                    else:
-                        # Close the path.
-                        is_relative = False
-                        relative_reference = (0, 0)
-                        x, y = first_path_point
-                else:
-                    x = math.floor(float(match.group(1)))
-                    y = math.floor(float(match.group(2)))
-
-                if first_path_point is None:
-                    first_path_point = (x, y)
-
-                if is_relative:
-                    rel_x, rel_y = relative_reference
-                    x += rel_x
-                    y += rel_y
-
-                # Set the current point as the relative reference if not
-                # closing the path.
-                if s != 'z':
-                    relative_reference = x, y
-
-                # Apply the current cumulative translations.
-                x += math.floor(translate[0])
-                y += math.floor(translate[1])
-                # Invert the y axis.
-                move_to_point(x, Y_AXIS_MAX - y)
+        # Hatching needs every subpath of the shape at once, so hold on to
+        # their transformed, but not yet clipped or floored, points.
+        to_device = Pipeline().transform(matrix).flip_y(Y_AXIS_MAX)
+        to_steps = Pipeline().clip(0, 0, X_AXIS_MAX, Y_AXIS_MAX).floor()
+        polygons = [list(to_device.apply(stroke)) for stroke in strokes]
+        for stroke in fill_shape(polygons, hatch_spacing, hatch_angle,
+                                 fill_rule):
+            yield to_steps.apply(stroke)
 
 
 ###############################################################################
 # Route Handlers
 ###############################################################################
 
+# Specify estimate=true to return an estimate of a job instead of moving, or
+# estimate=polyline to also include the path.
+ESTIMATE_CHOICES = ('false', 'true', 'polyline')
+
+
+def simplify_and_run(points, estimate, simplify_tolerance, save_as=None):
+    """Simplify the points and either move along them, estimate the job if
+    estimate is specified, or save them to a plot file if save_as is
+    specified, and return a 200 response with a body that includes the number
+    of points that simplification removed.
+    """
+    simplifier = get_simplifier(simplify_tolerance)
+    points = simplifier.simplify(points)
+    if save_as is not None:
+        body = {'num_points': save_plot_file(save_as, points)}
+    elif estimate != 'false':
+        body = estimate_points(points, include_polyline=estimate == 'polyline')
+    else:
+        move_to_points(points)
+        body = {}
+    body.update(simplifier.get_summary())
+    return _200(body=body)
+
+
 @route('/_reset', methods=(GET, POST))
 def _reset(request):
     """Reset the device.
@@ -405,10 +1151,10 @@ def _reset(request):
     machine.reset()
 
 
-@route('/status', methods=(GET,))
-@as_json
-def _status(request):
-    data = {
+def get_status():
+    # With the timer step executor, the position is that of the last step
+    # pushed to the buffer, which may not have been issued yet.
+    return {
         'max_position': {
             'x': X_AXIS_MAX,
             'y': Y_AXIS_MAX
@@ -418,7 +1164,12 @@ def _status(request):
             'y': y_pos
         },
     }
-    return _200(body=data)
+
+
+@route('/status', methods=(GET,))
+@as_json
+def _status(request):
+    return _200(body=get_status())
 
 
 @route('/', methods=(GET,))
@@ -439,12 +1190,72 @@ def _demo(request):
     'word_spacing': as_with_default(as_type(int), 40),
     'x_offset': as_maybe(as_type(int)),
     'y_offset': as_maybe(as_type(int)),
+    'width': as_maybe(as_type(int)),
+    'align': as_with_default(as_choice(*ALIGNMENTS), ALIGN_LEFT),
+    'line_spacing': as_maybe(as_type(int)),
+    'estimate': as_with_default(as_choice(*ESTIMATE_CHOICES), 'false'),
+    'optimize_route': as_with_default(as_choice('true', 'false'), 'false'),
+    'simplify_tolerance': as_maybe(as_type(float)),
+    'save_as': as_maybe(as_type(str)),
 })
+@as_json
 def _write(request, text, char_height, char_spacing, word_spacing, x_offset,
-           y_offset):
-    draw_text(text, char_height, char_spacing, word_spacing, x_offset,
-              y_offset)
-    return _200()
+           y_offset, width, align, line_spacing, estimate, optimize_route,
+           simplify_tolerance, save_as):
+    """Draw the text, wrapped to fit within width steps of x_offset and
+    aligned within that width, or, if estimate is specified, return an
+    estimate of the job without moving, or, if save_as is specified, save it
+    as a plot file for replay by /plot_file.
+    Text that doesn't fit within the drawable area is rejected before
+    anything moves.
+    """
+    try:
+        points = text_to_points(text, char_height, char_spacing,
+                                word_spacing, x_offset, y_offset,
+                                optimize_route == 'true', width, align,
+                                line_spacing)
+    except OutOfBounds as e:
+        return _400(body={'error': str(e)})
+    return simplify_and_run(points, estimate, simplify_tolerance, save_as)
+
+
+def parse_points(s):
+    """Return the list of points in a JSON-encoded list of [x, y] pairs of
+    finite numbers, or raise ValueError if it's not one.
+    """
+    try:
+        points = json.loads(s)
+    except ValueError:
+        raise ValueError('points must be JSON, got {}'.format(s))
+    if not isinstance(points, list):
+        raise ValueError('points must be a list, got {}'.format(s))
+    for point in points:
+        if (not isinstance(point, list) or len(point) != 2
+                or not all(isinstance(c, (int, float))
+                           and not isinstance(c, bool) and math.isfinite(c)
+                           for c in point)):
+            raise ValueError(
+                'Each point must be an [x, y] pair of numbers, got {}'.format(
+                    json.dumps(point)))
+    return points
+
+
+@route('/estimate', methods=(GET,), query_param_parser_map={
+    'points': as_type(str),
+    'polyline': as_with_default(as_choice('true', 'false'), 'false'),
+    'simplify_tolerance': as_maybe(as_type(float)),
+})
+@as_json
+def _estimate(request, points, polyline, simplify_tolerance):
+    """Return an estimate of the job of moving along a JSON-encoded list of
+    [x, y] points.
+    """
+    try:
+        points = parse_points(points)
+    except ValueError as e:
+        return _400(body={'error': str(e)})
+    return simplify_and_run(points, 'polyline' if polyline == 'true' else 'true',
+                            simplify_tolerance)
 
 
 @route('/move_to_point', methods=(GET,), query_param_parser_map={
@@ -456,6 +1267,63 @@ def _move_to_point(request, x, y):
     return _200()
 
 
+@route('/arc_to', methods=(GET,), query_param_parser_map={
+    'x': as_type(int),
+    'y': as_type(int),
+    'cx': as_type(int),
+    'cy': as_type(int),
+    'clockwise': as_with_default(as_choice('true', 'false'), 'false'),
+})
+@as_json
+def _arc_to(request, x, y, cx, cy, clockwise):
+    """Move along the circular arc around cx,cy from the current position to
+    x,y, or around the full circle if x,y is the current position.
+    """
+    try:
+        arc_to(x, y, cx, cy, clockwise == 'true')
+    except (OutOfBounds, ValueError) as e:
+        return _400(body={'error': str(e)})
+    return _200()
+
+
+@route('/quad_to', methods=(GET,), query_param_parser_map={
+    'x1': as_type(int),
+    'y1': as_type(int),
+    'x': as_type(int),
+    'y': as_type(int),
+})
+@as_json
+def _quad_to(request, x1, y1, x, y):
+    """Move along the quadratic Bezier curve from the current position to
+    x,y with control point x1,y1.
+    """
+    try:
+        quad_to(x1, y1, x, y)
+    except OutOfBounds as e:
+        return _400(body={'error': str(e)})
+    return _200()
+
+
+@route('/cubic_to', methods=(GET,), query_param_parser_map={
+    'x1': as_type(int),
+    'y1': as_type(int),
+    'x2': as_type(int),
+    'y2': as_type(int),
+    'x': as_type(int),
+    'y': as_type(int),
+})
+@as_json
+def _cubic_to(request, x1, y1, x2, y2, x, y):
+    """Move along the cubic Bezier curve from the current position to x,y
+    with control points x1,y1 and x2,y2.
+    """
+    try:
+        cubic_to(x1, y1, x2, y2, x, y)
+    except OutOfBounds as e:
+        return _400(body={'error': str(e)})
+    return _200()
+
+
 @route('/multi_step', methods=(GET,), query_param_parser_map={
     'axis': as_choice(X_AXIS, Y_AXIS),
     'direction': as_choice(DIR_UP, DIR_DOWN, DIR_LEFT, DIR_RIGHT),
@@ -466,16 +1334,89 @@ def _multi_step(request, axis, direction, num_steps):
     return _200()
 
 
-_draw_dq = deque((), 512)
+@route('/calibrate_backlash', methods=(GET,), query_param_parser_map={
+    'axis': as_choice(X_AXIS, Y_AXIS),
+    'up': as_maybe(as_type(int)),
+    'down': as_maybe(as_type(int)),
+    'left': as_maybe(as_type(int)),
+    'right': as_maybe(as_type(int)),
+    'length': as_with_default(as_type(int), 100),
+    'spacing': as_with_default(as_type(int), 10),
+    'num_strokes': as_with_default(as_type(int), 8),
+    'save': as_with_default(as_choice('true', 'false'), 'false'),
+})
+@as_json
+def _calibrate_backlash(request, axis, up, down, left, right, length, spacing,
+                        num_strokes, save):
+    """Update any of the specified per-direction backlash step values, draw the
+    calibration pattern for the axis, and return the current values.
+    Specify save=true to persist the values to the config file.
+    """
+    direction_steps = ((DIR_UP, up), (DIR_DOWN, down), (DIR_LEFT, left),
+                       (DIR_RIGHT, right))
+    for direction, num_steps in direction_steps:
+        if num_steps is not None and not 0 <= num_steps <= MAX_BACKLASH_STEPS:
+            return _400(body={'error': '{} must be 0 to {}, got {}'.format(
+                direction, MAX_BACKLASH_STEPS, num_steps)})
+    # Check the whole pattern before changing or saving anything.
+    try:
+        points = get_backlash_calibration_points(axis, length, spacing,
+                                                 num_strokes)
+    except OutOfBounds as e:
+        return _400(body={'error': str(e)})
+    for direction, num_steps in direction_steps:
+        if num_steps is not None:
+            DIR_BACKLASH_STEPS_MAP[direction] = num_steps
+    planner.backlash_steps = get_backlash_steps()
+    if save == 'true':
+        config.set('DIR_BACKLASH_STEPS', DIR_BACKLASH_STEPS_MAP)
+    move_to_points(points)
+    return _200(body=DIR_BACKLASH_STEPS_MAP)
+
+
+def get_draw_point_filter():
+    """Return a function that accepts a /draw point and returns whether to
+    keep it. Since the points arrive one at a time, any that are within the
+    simplification tolerance of the last kept point are dropped rather than
+    waiting to see the rest of the path.
+    """
+    tolerance_sq = PATH_SIMPLIFY_TOLERANCE * PATH_SIMPLIFY_TOLERANCE
+    last_point = [None]
+
+    def keep(x, y):
+        if last_point[0] is not None and (
+                (x - last_point[0][0]) ** 2 + (y - last_point[0][1]) ** 2
+                <= tolerance_sq):
+            return False
+        last_point[0] = (x, y)
+        return True
+
+    return keep
+
+
+def get_draw_pipeline():
+    """Return a Pipeline that clips /draw points, which arrive one at a time,
+    to the drawable area.
+    """
+    return Pipeline().clip(0, 0, X_AXIS_MAX, Y_AXIS_MAX).floor()
+
+
+DRAW_QUEUE_SIZE = 512
+_draw_dq = deque((), DRAW_QUEUE_SIZE)
 @route('/draw', methods=(GET,))
 @as_websocket
 def _draw(request, ws):
+    keep = get_draw_point_filter()
+    pipeline = get_draw_pipeline()
+
     def callback(timer):
         global _draw_dq
         payload_len = ws.read(1)
         if payload_len is not None:
             x, y = map(int, json.loads(ws.read(int(payload_len))))
-            _draw_dq.append((x, y))
+            if keep(x, y):
+                for point in pipeline.apply(((x, y),), resume=True):
+                    record_draw_queue_append(_draw_dq, point)
 
         if not is_moving_to_point and _draw_dq:
             x, y = _draw_dq.popleft()
@@ -493,23 +1434,388 @@ def _home(request):
     """
     global x_pos
     global y_pos
+    # Let the step thread, if any, finish the previous moves, which update
+    # the position as they execute, before overwriting it, both here and once
+    # the homing moves complete.
+    get_start_position()
     x_pos = X_AXIS_MAX
     y_pos = Y_AXIS_MAX
     move_to_point(0, 0)
     move_to_point(20, 20)
+    get_start_position()
     x_pos = 0
     y_pos = 0
     return _200()
 
 
 @route('/demo_svg', methods=(GET,), query_param_parser_map={
-    'filename': as_type(str)
+    'filename': as_type(str),
+    'estimate': as_with_default(as_choice(*ESTIMATE_CHOICES), 'false'),
+    'optimize_route': as_with_default(as_choice('true', 'false'), 'false'),
+    'fill': as_with_default(as_choice('true', 'false'), 'false'),
+    'hatch_spacing': as_maybe(as_type(float)),
+    'hatch_angle': as_maybe(as_type(float)),
+    'simplify_tolerance': as_maybe(as_type(float)),
+    'save_as': as_maybe(as_type(str)),
+})
+@as_json
+def _demo_svg(request, filename, estimate, optimize_route, fill, hatch_spacing,
+              hatch_angle, simplify_tolerance, save_as):
+    """Draw the paths in the SVG file, hatching its filled shapes if
+    fill=true, or estimate or save the job as for /write.
+    """
+    fh = open(filename, 'rb')
+    points = svg_to_points(fh, optimize_route == 'true', fill == 'true',
+                           hatch_spacing, hatch_angle)
+    return simplify_and_run(points, estimate, simplify_tolerance, save_as)
+
+
+@route('/plot_file', methods=(GET,), query_param_parser_map={
+    'filename': as_type(str),
+    'estimate': as_with_default(as_choice(*ESTIMATE_CHOICES), 'false'),
 })
-def _demo_svg(request, filename):
-    fh = open(filename, 'r')
-    render_svg(fh)
+@as_json
+def _plot_file(request, filename, estimate):
+    """Move along the points of a plot file, e.g. one saved to the SD card by
+    /write or /demo_svg, or, if estimate is specified, return an estimate of
+    the job without moving.
+    """
+    points = read_plot_file(filename)
+    if estimate != 'false':
+        return _200(body=estimate_points(
+            points, include_polyline=estimate == 'polyline'))
+    move_to_points(points)
     return _200()
 
 
+@route('/plot', methods=(POST,), query_param_parser_map={
+    'estimate': as_with_default(as_choice(*ESTIMATE_CHOICES), 'false'),
+})
+@as_json
+def _plot(request, estimate):
+    """Move along the points of a plot file that's sent as the request body,
+    e.g. one compiled on the host by host/compile_plot.py, reading it from the
+    connection in chunks as the moves are executed, or, if estimate is
+    specified, return an estimate of the job without moving.
+    """
+    content_length = request.headers.get('Content-Length')
+    if content_length is None:
+        return _400()
+    points = PlotReader(request.connection, plot_file_buf,
+                        int(content_length)).read_points()
+    if estimate != 'false':
+        return _200(body=estimate_points(
+            points, include_polyline=estimate == 'polyline'))
+    move_to_points(points)
+    return _200()
+
+
+def get_free_bytes(filename):
+    """Return the number of bytes that are free on the filesystem that
+    contains the file.
+    """
+    i = filename.rfind('/')
+    if i == -1:
+        # A relative filename is in the current directory.
+        dirname = os.getcwd()
+    else:
+        dirname = filename[:i] or '/'
+    stats = statvfs(dirname)
+    return stats.f_bavail * stats.f_frsize
+
+
+@route('/upload', methods=(POST,), query_param_parser_map={
+    'filename': as_type(str),
+    'crc32': as_maybe(as_type(parse_checksum)),
+})
+@as_json
+def _upload(request, filename, crc32):
+    """Save the request body as the file, e.g. an SVG file on the SD card for
+    /demo_svg, reading it from the connection in UPLOAD_CHUNK_SIZE chunks so
+    that it's never held in memory, and return its size, CRC-32 and transfer
+    rate. If crc32, a hex-encoded CRC-32, is specified, the file is only saved
+    if the received data matches it.
+    """
+    content_length = request.headers.get('Content-Length')
+    if content_length is None:
+        return _400(body={'error': 'Content-Length is required'})
+    size = int(content_length)
+    try:
+        free_bytes = get_free_bytes(filename)
+    except OSError:
+        return _400(body={'error': 'Invalid filename: {}'.format(filename)})
+    if size > free_bytes:
+        return _400(body={'error': 'File is {} bytes, {} are free'.format(
+            size, free_bytes)})
+
+    # Write to a temporary file so that an existing file is left intact if
+    # the upload fails, and remove it unless it's renamed into place.
+    temp_filename = '{}.part'.format(filename)
+    start_ticks = ticks_ms()
+    saved = False
+    try:
+        with open(temp_filename, 'wb') as fh:
+            checksum = receive_file(request.connection, fh, size, upload_buf)
+        seconds = ticks_diff(ticks_ms(), start_ticks) / 1000
+        if crc32 is not None and checksum != crc32:
+            return _400(body={'error': 'Checksum mismatch: expected {}, got {}'
+                                       .format(format_checksum(crc32),
+                                               format_checksum(checksum))})
+        if path.exists(filename):
+            os.remove(filename)
+        os.rename(temp_filename, filename)
+        saved = True
+    except (IncompleteUpload, OSError) as e:
+        return _400(body={'error': str(e)})
+    finally:
+        if not saved and path.exists(temp_filename):
+            os.remove(temp_filename)
+    return _200(body={
+        'filename': filename,
+        'num_bytes': size,
+        'crc32': format_checksum(checksum),
+        'seconds': seconds,
+        'bytes_per_sec': round(size / seconds) if seconds else None,
+    })
+
+
+@route('/metrics', methods=(GET,), query_param_parser_map={
+    'reset': as_with_default(as_choice('true', 'false'), 'false'),
+})
+def _metrics(request, reset):
+    """Return the metrics in the Prometheus text format, and then reset them if
+    reset=true.
+    """
+    body = render_metrics()
+    if reset == 'true':
+        reset_metrics()
+    return _200(body=body)
+
+
+@route('/jobs', methods=(GET,))
+@as_json
+def _jobs(request):
+    """Return a list of the queued, running and recently finished jobs.
+    """
+    return _200(body=job_queue.list())
+
+
+@route('/jobs/write', methods=(GET, POST), query_param_parser_map={
+    'text': as_type(str),
+    'char_height': as_with_default(as_type(float), 10),
+    'char_spacing': as_with_default(as_type(int), 10),
+    'word_spacing': as_with_default(as_type(int), 40),
+    'x_offset': as_maybe(as_type(int)),
+    'y_offset': as_maybe(as_type(int)),
+    'width': as_maybe(as_type(int)),
+    'align': as_with_default(as_choice(*ALIGNMENTS), ALIGN_LEFT),
+    'line_spacing': as_maybe(as_type(int)),
+    'optimize_route': as_with_default(as_choice('true', 'false'), 'false'),
+    'simplify_tolerance': as_maybe(as_type(float)),
+})
+@as_json
+def _jobs_write(request, text, char_height, char_spacing, word_spacing,
+                x_offset, y_offset, width, align, line_spacing, optimize_route,
+                simplify_tolerance):
+    """Queue a job to draw the text and return it without waiting.
+    """
+    # Resolve the offsets now, rather than when the job runs, and lay out the
+    # text once to reject it up front if it doesn't fit.
+    x, y = get_start_position()
+    if x_offset is None:
+        x_offset = x
+    if y_offset is None:
+        y_offset = y
+    try:
+        text_to_strokes(text, char_height, char_spacing, word_spacing,
+                        x_offset, y_offset, width, align, line_spacing)
+    except OutOfBounds as e:
+        return _400(body={'error': str(e)})
+    get_points = lambda: get_simplifier(simplify_tolerance).simplify(
+        text_to_points(text, char_height, char_spacing, word_spacing,
+                       x_offset, y_offset, optimize_route == 'true', width,
+                       align, line_spacing))
+    job = job_queue.submit('write: {}'.format(text), get_points)
+    return _200(body=job.to_dict())
+
+
+@route('/jobs/svg', methods=(GET, POST), query_param_parser_map={
+    'filename': as_type(str),
+    'optimize_route': as_with_default(as_choice('true', 'false'), 'false'),
+    'fill': as_with_default(as_choice('true', 'false'), 'false'),
+    'hatch_spacing': as_maybe(as_type(float)),
+    'hatch_angle': as_maybe(as_type(float)),
+    'simplify_tolerance': as_maybe(as_type(float)),
+})
+@as_json
+def _jobs_svg(request, filename, optimize_route, fill, hatch_spacing,
+              hatch_angle, simplify_tolerance):
+    """Queue a job to render the SVG file and return it without waiting.
+    """
+    get_points = lambda: get_simplifier(simplify_tolerance).simplify(
+        read_svg_points(filename, optimize_route == 'true', fill == 'true',
+                        hatch_spacing, hatch_angle))
+    job = job_queue.submit('svg: {}'.format(filename), get_points)
+    return _200(body=job.to_dict())
+
+
+@route('/jobs/plot_file', methods=(GET, POST), query_param_parser_map={
+    'filename': as_type(str),
+})
+@as_json
+def _jobs_plot_file(request, filename):
+    """Queue a job to replay the plot file and return it without waiting.
+    """
+    job = job_queue.submit(
+        'plot_file: {}'.format(filename),
+        lambda: read_plot_file(filename, job_plot_file_buf)
+    )
+    return _200(body=job.to_dict())
+
+
+def _update_job(update, job_id):
+    """Apply a JobQueue update method to a job and return a response.
+    """
+    try:
+        job = update(job_id)
+    except UnknownJob:
+        return _400(body={'error': 'Unknown job: {}'.format(job_id)})
+    return _200(body=job.to_dict())
+
+
+@route('/jobs/cancel', methods=(GET, POST), query_param_parser_map={
+    'id': as_type(int),
+})
+@as_json
+def _jobs_cancel(request, id):
+    """Cancel a queued job, or stop a running or paused one.
+    """
+    return _update_job(job_queue.cancel, id)
+
+
+@route('/jobs/pause', methods=(GET, POST), query_param_parser_map={
+    'id': as_type(int),
+})
+@as_json
+def _jobs_pause(request, id):
+    """Bring a running job to a stop until it's resumed, or prevent a queued
+    job from starting.
+    """
+    return _update_job(job_queue.pause, id)
+
+
+@route('/jobs/resume', methods=(GET, POST), query_param_parser_map={
+    'id': as_type(int),
+})
+@as_json
+def _jobs_resume(request, id):
+    return _update_job(job_queue.resume, id)
+
+
+###############################################################################
+# Asyncio Runtime
+###############################################################################
+
+# Points for the motion coroutine, which drops the oldest when full.
+motion_points = deque((), DRAW_QUEUE_SIZE)
+
+# The max number of steps that the motion coroutine issues between yields to
+# the other coroutines.
+MOTION_TASK_YIELD_STEPS = 32
+
+
+async def motion_task(points_event):
+    """Move along the points in motion_points as they arrive, yielding to the
+    other coroutines every MOTION_TASK_YIELD_STEPS steps and coming to a stop
+    whenever the queue runs dry.
+    """
+    import uasyncio as asyncio
+
+    def get_blocks(x, y):
+        # Keep taking points that arrive while the earlier ones are executed.
+        while motion_points:
+            try:
+                next_x, next_y = check_point(*motion_points.popleft())
+            except OutOfBounds:
+                continue
+            yield from planner.add(next_x - x, next_y - y)
+            x, y = next_x, next_y
+
+    while True:
+        await points_event.wait()
+        points_event.clear()
+        if not motion_points:
+            continue
+        for _ in iter_execute_planned(get_blocks,
+                                      yield_steps=MOTION_TASK_YIELD_STEPS):
+            await asyncio.sleep_ms(0)
+
+
+def get_async_routes(points_event):
+    """Return a dict that maps each path to its aioweb handler.
+    """
+    def queue_point(x, y):
+        record_draw_queue_append(motion_points, (x, y))
+        points_event.set()
+
+    async def index(request):
+        with open('/public/index.html', 'r') as fh:
+            return 200, 'text/html', fh.read()
+
+    async def status(request):
+        return 200, 'application/json', json.dumps(get_status())
+
+    async def move_to_point(request):
+        queue_point(int(request.query['x']), int(request.query['y']))
+        return 200, 'application/json', '{}'
+
+    async def get_metrics(request):
+        body = render_metrics()
+        if request.query.get('reset') == 'true':
+            reset_metrics()
+        return 200, 'text/plain; version=0.0.4', body
+
+    async def draw(request):
+        await request.accept_websocket()
+        keep = get_draw_point_filter()
+        pipeline = get_draw_pipeline()
+        while True:
+            message = (await request.read_websocket_message()).decode()
+            # Messages are a JSON-encoded [x, y] payload that's prefixed by
+            # its length.
+            x, y = map(int, json.loads(message[message.index('['):]))
+            if keep(x, y):
+                for point in pipeline.apply(((x, y),), resume=True):
+                    queue_point(*point)
+
+    return {
+        '/': index,
+        '/status': status,
+        '/move_to_point': move_to_point,
+        '/draw': draw,
+        '/metrics': get_metrics,
+    }
+
+
+def run_async():
+    """Serve the drawing UI routes from coroutines that queue the points for a
+    single motion coroutine, so that any number of connections are served
+    while drawing, with no polling. The rest of the HTTP API is only available
+    in the 'sync' runtime mode.
+    """
+    import uasyncio as asyncio
+    from lib.aioweb import serve as serve_async
+
+    async def main():
+        points_event = asyncio.Event()
+        await serve_async(get_async_routes(points_event))
+        await motion_task(points_event)
+
+    asyncio.run(main())
+
+
 if __name__ == '__main__':
-    serve()
+    if RUNTIME_MODE == 'asyncio':
+        run_async()
+    else:
+        serve()
@@ -0,0 +1,117 @@
+"""Metrics
+
+Counters, gauges and histograms that are cheap enough to update from the motion
+loop and that render in the Prometheus text exposition format:
+https://prometheus.io/docs/instrumenting/exposition_formats/
+
+Each metric may have a single label, e.g. 'axis', whose values are created on
+first use.
+
+"""
+
+from array import array
+
+
+class Counter:
+    TYPE = 'counter'
+
+    def __init__(self, name, help_text, label=None):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.values = {}
+
+    def inc(self, n=1, label_value=None):
+        self.values[label_value] = self.values.get(label_value, 0) + n
+
+    def reset(self):
+        self.values = {}
+
+    def get_name(self, suffix='', label_value=None, extra_label=''):
+        labels = []
+        if label_value is not None:
+            labels.append('{}="{}"'.format(self.label, label_value))
+        if extra_label:
+            labels.append(extra_label)
+        if not labels:
+            return self.name + suffix
+        return '{}{}{{{}}}'.format(self.name, suffix, ','.join(labels))
+
+    def render_samples(self):
+        for label_value, value in sorted(self.values.items(),
+                                         key=lambda x: str(x[0])):
+            yield '{} {}'.format(self.get_name('', label_value), value)
+
+    def render(self):
+        yield '# HELP {} {}'.format(self.name, self.help_text)
+        yield '# TYPE {} {}'.format(self.name, self.TYPE)
+        yield from self.render_samples()
+
+
+class Gauge(Counter):
+    TYPE = 'gauge'
+
+    def set(self, value, label_value=None):
+        self.values[label_value] = value
+
+
+class Histogram(Counter):
+    TYPE = 'histogram'
+
+    def __init__(self, name, help_text, buckets):
+        """buckets is an ascending tuple of the upper bounds of each bucket,
+        not including the implicit +Inf bucket.
+        """
+        super().__init__(name, help_text)
+        self.buckets = buckets
+        self.reset()
+
+    def reset(self):
+        # Hold the count of each bucket, plus one for +Inf, non-cumulatively
+        # so that observe() only has to increment one of them.
+        self.counts = array('L', (0 for _ in range(len(self.buckets) + 1)))
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        i = 0
+        buckets = self.buckets
+        num_buckets = len(buckets)
+        while i < num_buckets and value > buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def render_samples(self):
+        cumulative_count = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative_count += count
+            yield '{} {}'.format(
+                self.get_name('_bucket', extra_label='le="{}"'.format(bound)),
+                cumulative_count
+            )
+        yield '{} {}'.format(self.get_name('_sum'), self.sum)
+        yield '{} {}'.format(self.get_name('_count'), self.count)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Return the metrics in the Prometheus text format.
+        """
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        lines.append('')
+        return '\n'.join(lines)
+
+    def reset(self):
+        for metric in self.metrics:
+            metric.reset()
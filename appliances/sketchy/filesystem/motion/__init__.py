@@ -0,0 +1,117 @@
+"""Motion Planning Functions
+
+These functions only do arithmetic and never touch any pins so that the motion
+profile that main.py executes can be computed anywhere.
+
+All rates are expressed in steps per second and all accelerations in steps per
+second per second.
+
+"""
+
+from math import sqrt
+
+
+# Step entry flag bits, which specify which axes to step on a given tick and in
+# which direction.
+X_STEP = 0x01
+Y_STEP = 0x02
+X_DIR_POSITIVE = 0x04
+Y_DIR_POSITIVE = 0x08
+
+
+def major_axis_limit(x_limit, y_limit, x_steps, y_steps):
+    """Return the largest major-axis rate or acceleration value at which neither
+    axis exceeds its specified limit when moving x_steps and y_steps absolute
+    steps along a straight line.
+
+    The major axis steps on every tick of a linear move while the minor axis
+    steps on only (minor / major) of them, so a limit on the minor axis
+    translates to a proportionally larger limit on the tick rate.
+    """
+    num_steps = max(x_steps, y_steps)
+    limit = None
+    if x_steps:
+        limit = x_limit * num_steps / x_steps
+    if y_steps:
+        y_major_limit = y_limit * num_steps / y_steps
+        if limit is None or y_major_limit < limit:
+            limit = y_major_limit
+    return limit
+
+
+def line_step_flags(x_delta, y_delta):
+    """Return a generator of the step flags for each of the
+    max(abs(x_delta), abs(y_delta)) ticks of a straight line from the current
+    position to the one at the specified relative offset.
+
+    This is an integer-only DDA in which each axis accumulates its number of
+    steps on every tick and steps whenever the accumulator reaches the number
+    of ticks, so the major axis steps on every tick and each axis steps exactly
+    abs(<delta>) times.
+    """
+    x_steps = abs(x_delta)
+    y_steps = abs(y_delta)
+    num_ticks = max(x_steps, y_steps)
+    x_flags = X_STEP | (X_DIR_POSITIVE if x_delta > 0 else 0)
+    y_flags = Y_STEP | (Y_DIR_POSITIVE if y_delta > 0 else 0)
+    # Start the accumulators halfway so that the minor axis steps land in the
+    # middle of their runs rather than at the start.
+    x_acc = y_acc = num_ticks >> 1
+    ticks_remaining = num_ticks
+    while ticks_remaining:
+        flags = 0
+        x_acc += x_steps
+        if x_acc >= num_ticks:
+            x_acc -= num_ticks
+            flags |= x_flags
+        y_acc += y_steps
+        if y_acc >= num_ticks:
+            y_acc -= num_ticks
+            flags |= y_flags
+        yield flags
+        ticks_remaining -= 1
+
+
+def profile_intervals(num_steps, entry_rate, cruise_rate, exit_rate, accel):
+    """Return a generator of the number of microseconds to wait before each of
+    num_steps steps in order to accelerate from entry_rate up to at most
+    cruise_rate and then decelerate back down to exit_rate.
+
+    For a short move that doesn't have room to reach cruise_rate, the result is
+    a triangular profile that peaks where the acceleration and deceleration
+    ramps meet.
+    """
+    entry_rate_sq = entry_rate * entry_rate
+    exit_rate_sq = exit_rate * exit_rate
+    cruise_rate_sq = cruise_rate * cruise_rate
+    cruise_interval = int(1000000 / cruise_rate)
+    two_accel = 2 * accel
+    last_step_num = num_steps - 1
+    for step_num in range(num_steps):
+        # v^2 = v0^2 + 2as, applied from whichever end of the move is nearer.
+        rate_sq = min(entry_rate_sq + two_accel * step_num,
+                      exit_rate_sq + two_accel * (last_step_num - step_num))
+        if rate_sq >= cruise_rate_sq:
+            yield cruise_interval
+        else:
+            yield int(1000000 / sqrt(rate_sq))
+
+
+def profile_duration(num_steps, entry_rate, cruise_rate, exit_rate, accel):
+    """Return the approximate number of seconds that it takes to execute the
+    steps of the profile_intervals() profile with the same arguments.
+    """
+    entry_rate_sq = entry_rate * entry_rate
+    exit_rate_sq = exit_rate * exit_rate
+    accel_steps = (cruise_rate * cruise_rate - entry_rate_sq) / (2 * accel)
+    decel_steps = (cruise_rate * cruise_rate - exit_rate_sq) / (2 * accel)
+    cruise_steps = num_steps - accel_steps - decel_steps
+    if cruise_steps < 0:
+        # The profile is triangular, so calculate the rate at which the ramps
+        # meet.
+        cruise_rate = sqrt(
+            (2 * accel * num_steps + entry_rate_sq + exit_rate_sq) / 2)
+        cruise_steps = 0
+    return ((cruise_rate - entry_rate) / accel
+            + (cruise_rate - exit_rate) / accel
+            + cruise_steps / cruise_rate)
@@ -0,0 +1,425 @@
+"""Curve Motion Primitives
+
+A curve is moved along as a few planned blocks, one per segment of it within
+which neither axis changes direction and the same axis, the major one, always
+moves at least as fast as the other, rather than as many short lines. Like a
+line, each segment steps its major axis on every tick, and its minor axis on
+some of them, so it takes max(abs(<x delta>), abs(<y delta>)) ticks, which the
+motion profile needs to know before any of them are taken:
+
+  - Circular arcs use integer-only midpoint-circle stepping, which steps the
+    minor axis on each tick if that keeps the position closer to the circle,
+    as measured by the circle's equation, which is updated incrementally.
+
+  - Quadratic and cubic Bezier curves use integer forward differencing, in
+    fixed point, at an interval short enough that neither axis moves more than
+    one step per iteration, and tick whenever the rounded curve point moves
+    away from the position along the major axis.
+
+Since neither axis changes direction within a segment, its backlash is taken
+up before it starts, and its end points bound it.
+
+"""
+
+from math import (
+    atan2,
+    ceil,
+    cos,
+    floor,
+    pi,
+    sin,
+    sqrt,
+)
+
+from motion import (
+    X_DIR_POSITIVE,
+    X_STEP,
+    Y_DIR_POSITIVE,
+    Y_STEP,
+)
+
+
+# The max difference, in steps, between the distances of the start and end
+# points of an arc from its center.
+MAX_ARC_RADIUS_ERROR = 1
+# The number of fractional bits of the fixed-point forward differences, which
+# keeps the scaled coordinates within MicroPython's small int range.
+FRACTION_BITS = 16
+FRACTION_SCALE = 1 << FRACTION_BITS
+FRACTION_HALF = 1 << (FRACTION_BITS - 1)
+# The number of forward differencing iterations after which to recompute the
+# differences exactly, which bounds their accumulated rounding error.
+RESYNC_INTERVAL = 32
+# The number of intervals at which to sample a Bezier segment to measure its
+# length and tightest radius of curvature.
+NUM_SAMPLES = 8
+# Parameter values closer than this are treated as the same point.
+T_EPSILON = 1e-6
+
+
+def normalize(x, y):
+    """Return the vector scaled to unit length, or None if it has none.
+    """
+    length = sqrt(x * x + y * y)
+    if length == 0:
+        return None
+    return x / length, y / length
+
+
+class Segment:
+    def __init__(self, x0, y0, x1, y1, length, entry_dir, exit_dir,
+                 min_radius):
+        """A part of a curve from lattice point x0,y0 to x1,y1. entry_dir and
+        exit_dir are the unit tangents at its ends, and min_radius is its
+        tightest radius of curvature, or None if it's straight. Subclasses
+        define get_step_flags(), which returns a generator of the step flags
+        for each tick of the segment.
+        """
+        self.x0 = x0
+        self.y0 = y0
+        self.x1 = x1
+        self.y1 = y1
+        self.x_delta = x1 - x0
+        self.y_delta = y1 - y0
+        chord_dir = normalize(self.x_delta, self.y_delta)
+        # The chord is never longer than the curve.
+        self.length = max(length, sqrt(self.x_delta * self.x_delta
+                                       + self.y_delta * self.y_delta))
+        self.entry_dir = entry_dir or chord_dir
+        self.exit_dir = exit_dir or chord_dir
+        self.min_radius = min_radius
+
+    def get_axes(self):
+        """Return a (<x is major>, <major dir>, <minor dir>, <major flags>,
+        <minor flags>, <num ticks>, <num minor steps>) tuple.
+        """
+        x_delta = self.x_delta
+        y_delta = self.y_delta
+        x_dir = 1 if x_delta > 0 else -1
+        y_dir = 1 if y_delta > 0 else -1
+        x_flags = X_STEP | (X_DIR_POSITIVE if x_delta > 0 else 0)
+        y_flags = Y_STEP | (Y_DIR_POSITIVE if y_delta > 0 else 0)
+        x_steps = abs(x_delta)
+        y_steps = abs(y_delta)
+        if x_steps >= y_steps:
+            return True, x_dir, y_dir, x_flags, y_flags, x_steps, y_steps
+        return False, y_dir, x_dir, y_flags, x_flags, y_steps, x_steps
+
+
+###############################################################################
+# Arcs
+###############################################################################
+
+class ArcSegment(Segment):
+    def __init__(self, x0, y0, x1, y1, cx, cy, r_sq, start, end, clockwise):
+        """A segment of the circle around cx,cy with squared radius r_sq from
+        angle start to end, in radians.
+        """
+        self.cx = cx
+        self.cy = cy
+        self.r_sq = r_sq
+        r = sqrt(r_sq)
+        sign = -1 if clockwise else 1
+        get_tangent = lambda a: (-sin(a) * sign, cos(a) * sign)
+        super().__init__(x0, y0, x1, y1, r * abs(end - start),
+                         get_tangent(start), get_tangent(end), r)
+
+    def get_step_flags(self):
+        (x_is_major, u_dir, v_dir, u_flags, v_flags, num_ticks,
+         num_minor) = self.get_axes()
+        # Work relative to the center, where u is the major axis coordinate
+        # and v the minor one.
+        u = self.x0 - self.cx
+        v = self.y0 - self.cy
+        if not x_is_major:
+            u, v = v, u
+        # The value of the circle's equation, u^2 + v^2 - r^2, at the
+        # position, which is zero on the circle. A step of d along an axis at
+        # coordinate c changes it by 2 * c * d + 1.
+        f = u * u + v * v - self.r_sq
+        for ticks_remaining in range(num_ticks, 0, -1):
+            f += 2 * u * u_dir + 1
+            u += u_dir
+            # Also step the minor axis if that's closer to the circle, or if
+            # it must on every remaining tick to reach the end.
+            fv = f + 2 * v * v_dir + 1
+            if num_minor and (num_minor >= ticks_remaining
+                              or abs(fv) < abs(f)):
+                f = fv
+                v += v_dir
+                num_minor -= 1
+                yield u_flags | v_flags
+            else:
+                yield u_flags
+
+
+def get_arc_segments(x0, y0, x1, y1, cx, cy, clockwise=False):
+    """Return a list of the ArcSegments of the circular arc around cx,cy from
+    x0,y0 to x1,y1, which must be about the same distance from it, or of the
+    full circle if they're the same point, split at each eighth of a turn.
+    Raise ValueError if the end point isn't on the circle.
+    """
+    r_sq = (x0 - cx) * (x0 - cx) + (y0 - cy) * (y0 - cy)
+    if r_sq == 0:
+        return []
+    r = sqrt(r_sq)
+    end_r = sqrt((x1 - cx) * (x1 - cx) + (y1 - cy) * (y1 - cy))
+    if abs(end_r - r) > MAX_ARC_RADIUS_ERROR:
+        raise ValueError('Arc end is {} steps from the center, start is {}'
+                         .format(end_r, r))
+    sign = -1 if clockwise else 1
+    start = atan2(y0 - cy, x0 - cx)
+    # The angle through which to turn, in the direction of the arc.
+    sweep = ((atan2(y1 - cy, x1 - cx) - start) * sign) % (2 * pi)
+    if sweep < T_EPSILON:
+        sweep = 2 * pi
+    # Split at the multiples of an eighth of a turn, where either an axis
+    # changes direction or the major axis changes.
+    eighth = pi / 4
+    if clockwise:
+        turn = start - (ceil(start / eighth) - 1) * eighth
+    else:
+        turn = (floor(start / eighth) + 1) * eighth - start
+    segments = []
+    x = x0
+    y = y0
+    angle = start
+    while True:
+        is_last = turn >= sweep - T_EPSILON
+        if is_last:
+            next_x = x1
+            next_y = y1
+            next_angle = start + sweep * sign
+        else:
+            next_angle = start + turn * sign
+            next_x = cx + round(r * cos(next_angle))
+            next_y = cy + round(r * sin(next_angle))
+        if next_x != x or next_y != y:
+            segments.append(ArcSegment(x, y, next_x, next_y, cx, cy, r_sq,
+                                       angle, next_angle, clockwise))
+        if is_last:
+            return segments
+        x = next_x
+        y = next_y
+        angle = next_angle
+        turn += eighth
+
+
+###############################################################################
+# Bezier Curves
+###############################################################################
+
+def eval_poly(coefs, t):
+    a, b, c, d = coefs
+    return ((a * t + b) * t + c) * t + d
+
+
+def eval_derivative(coefs, t):
+    a, b, c, _ = coefs
+    return (3 * a * t + 2 * b) * t + c
+
+
+def eval_second_derivative(coefs, t):
+    a, b, _, _ = coefs
+    return 6 * a * t + 2 * b
+
+
+def get_differences(coefs, t, h):
+    """Return the fixed-point (<value>, <1st>, <2nd>, <3rd>) forward
+    differences of the cubic polynomial at t with step h.
+    """
+    a, b, c, _ = coefs
+    h2 = h * h
+    h3 = h2 * h
+    return (
+        round(eval_poly(coefs, t) * FRACTION_SCALE),
+        round((a * (3 * t * t * h + 3 * t * h2 + h3) + b * (2 * t * h + h2)
+               + c * h) * FRACTION_SCALE),
+        round((a * (6 * t * h2 + 6 * h3) + 2 * b * h2) * FRACTION_SCALE),
+        round(6 * a * h3 * FRACTION_SCALE),
+    )
+
+
+def get_turning_points(coefs):
+    """Return a list of the parameter values at which the cubic polynomial
+    changes direction.
+    """
+    # Solve 3at^2 + 2bt + c = 0.
+    a, b, c, _ = coefs
+    a *= 3
+    b *= 2
+    if abs(a) < T_EPSILON:
+        return [-c / b] if b else []
+    disc = b * b - 4 * a * c
+    if disc < 0:
+        return []
+    disc = sqrt(disc)
+    return [(-b - disc) / (2 * a), (-b + disc) / (2 * a)]
+
+
+class BezierSegment(Segment):
+    def __init__(self, x0, y0, x1, y1, x_coefs, y_coefs, t0, t1,
+                 max_speed):
+        """A segment of the curve with (<a>, <b>, <c>, <d>) cubic polynomial
+        coefficients x_coefs and y_coefs from parameter t0 to t1, along which
+        neither coordinate changes by more than max_speed per unit of t.
+        """
+        self.x_coefs = x_coefs
+        self.y_coefs = y_coefs
+        self.t0 = t0
+        self.t1 = t1
+        self.num_iterations = ceil(max_speed * (t1 - t0)) + 1
+
+        # Sample the curve to measure its length and tightest radius of
+        # curvature, which is |v|^3 / |v x a|.
+        length = 0
+        min_radius = None
+        last_x = x0
+        last_y = y0
+        for i in range(NUM_SAMPLES + 1):
+            t = t0 + (t1 - t0) * i / NUM_SAMPLES
+            x = eval_poly(x_coefs, t)
+            y = eval_poly(y_coefs, t)
+            length += sqrt((x - last_x) * (x - last_x)
+                           + (y - last_y) * (y - last_y))
+            last_x = x
+            last_y = y
+            vx = eval_derivative(x_coefs, t)
+            vy = eval_derivative(y_coefs, t)
+            cross = abs(vx * eval_second_derivative(y_coefs, t)
+                        - vy * eval_second_derivative(x_coefs, t))
+            if cross:
+                radius = sqrt(vx * vx + vy * vy) ** 3 / cross
+                if min_radius is None or radius < min_radius:
+                    min_radius = radius
+        get_tangent = lambda t: normalize(eval_derivative(x_coefs, t),
+                                          eval_derivative(y_coefs, t))
+        super().__init__(x0, y0, x1, y1, length, get_tangent(t0),
+                         get_tangent(t1), min_radius)
+
+    def get_step_flags(self):
+        (x_is_major, u_dir, v_dir, u_flags, v_flags, ticks_remaining,
+         num_minor) = self.get_axes()
+        # u is the major axis coordinate and v the minor one.
+        if x_is_major:
+            u_coefs, v_coefs = self.x_coefs, self.y_coefs
+            u, v = self.x0, self.y0
+        else:
+            u_coefs, v_coefs = self.y_coefs, self.x_coefs
+            u, v = self.y0, self.x0
+        t0 = self.t0
+        num_iterations = self.num_iterations
+        h = (self.t1 - t0) / num_iterations
+        for i in range(num_iterations):
+            if not ticks_remaining:
+                return
+            if i % RESYNC_INTERVAL == 0:
+                pu, du, ddu, dddu = get_differences(u_coefs, t0 + i * h, h)
+                pv, dv, ddv, dddv = get_differences(v_coefs, t0 + i * h, h)
+            pu += du
+            du += ddu
+            ddu += dddu
+            pv += dv
+            dv += ddv
+            ddv += dddv
+            # Tick when the rounded curve point moves on along the major
+            # axis, which, since the segment doesn't change direction, it
+            # only ever moves back along due to rounding error.
+            if (((pu + FRACTION_HALF) >> FRACTION_BITS) - u) * u_dir <= 0:
+                continue
+            u += u_dir
+            ticks_remaining -= 1
+            # Also step the minor axis if the rounded curve point has moved
+            # on along it, or if it must on every remaining tick to reach the
+            # end.
+            next_v = (pv + FRACTION_HALF) >> FRACTION_BITS
+            if num_minor and (num_minor > ticks_remaining
+                              or (next_v - v) * v_dir > 0):
+                v += v_dir
+                num_minor -= 1
+                yield u_flags | v_flags
+            else:
+                yield u_flags
+        # Take any ticks that rounding left.
+        while ticks_remaining:
+            ticks_remaining -= 1
+            if num_minor > ticks_remaining:
+                num_minor -= 1
+                yield u_flags | v_flags
+            else:
+                yield u_flags
+
+
+def get_bezier_segments(x_points, y_points):
+    """Return a list of the BezierSegments of the quadratic or cubic Bezier
+    curve with the control point coordinates x_points and y_points, the first
+    of which must be a lattice point, split wherever an axis changes direction
+    or the major axis changes.
+    """
+    if len(x_points) == 3:
+        (x0, x1, x2), (y0, y1, y2) = x_points, y_points
+        coefs = lambda p0, p1, p2: (0, p0 - 2 * p1 + p2, 2 * (p1 - p0), p0)
+        x_coefs = coefs(x0, x1, x2)
+        y_coefs = coefs(y0, y1, y2)
+    else:
+        (x0, x1, x2, x3), (y0, y1, y2, y3) = x_points, y_points
+        coefs = lambda p0, p1, p2, p3: (p3 - p0 + 3 * (p1 - p2),
+                                        3 * (p0 - 2 * p1 + p2),
+                                        3 * (p1 - p0), p0)
+        x_coefs = coefs(x0, x1, x2, x3)
+        y_coefs = coefs(y0, y1, y2, y3)
+    # The derivative of a Bezier curve is a Bezier curve of one less degree
+    # whose control points are degree times the differences of the original
+    # ones, which bound it.
+    degree = len(x_points) - 1
+    max_speed = degree * max(
+        max(abs(x_points[i + 1] - x_points[i]),
+            abs(y_points[i + 1] - y_points[i]))
+        for i in range(degree)
+    )
+
+    # The major axis changes where the curve is diagonal, i.e. where x + y or
+    # x - y changes direction.
+    turning_points = (
+        get_turning_points(x_coefs)
+        + get_turning_points(y_coefs)
+        + get_turning_points([x + y for x, y in zip(x_coefs, y_coefs)])
+        + get_turning_points([x - y for x, y in zip(x_coefs, y_coefs)])
+    )
+    ts = [0]
+    for t in sorted(turning_points):
+        if T_EPSILON < t < 1 - T_EPSILON and t - ts[-1] > T_EPSILON:
+            ts.append(t)
+    ts.append(1)
+
+    segments = []
+    x = x_points[0]
+    y = y_points[0]
+    for i in range(1, len(ts)):
+        if i == len(ts) - 1:
+            next_x = x_points[-1]
+            next_y = y_points[-1]
+        else:
+            next_x = round(eval_poly(x_coefs, ts[i]))
+            next_y = round(eval_poly(y_coefs, ts[i]))
+        if next_x != x or next_y != y:
+            segments.append(BezierSegment(x, y, next_x, next_y, x_coefs,
+                                          y_coefs, ts[i - 1], ts[i],
+                                          max_speed))
+        x = next_x
+        y = next_y
+    return segments
+
+
+def get_quad_segments(x0, y0, x1, y1, x2, y2):
+    """Return a list of the segments of the quadratic Bezier curve from
+    x0,y0 to x2,y2 with control point x1,y1.
+    """
+    return get_bezier_segments((x0, x1, x2), (y0, y1, y2))
+
+
+def get_cubic_segments(x0, y0, x1, y1, x2, y2, x3, y3):
+    """Return a list of the segments of the cubic Bezier curve from x0,y0 to
+    x3,y3 with control points x1,y1 and x2,y2.
+    """
+    return get_bezier_segments((x0, x1, x2, x3), (y0, y1, y2, y3))
@@ -0,0 +1,318 @@
+"""Look-Ahead Motion Planner
+
+The planner buffers up to <lookahead> linear moves and chooses the speed at
+each junction between consecutive moves so that the path can flow through
+near-collinear vertices without stopping, while always leaving enough buffered
+distance to decelerate to a stop at the end of the buffer.
+
+Curve segments from motion.curves are planned as single blocks that generate
+their own steps, with junctions at their end tangents, so that a curve flows
+through at a speed limited by its tightest radius rather than as many short
+lines.
+
+Planning is done in terms of the speed along the path, in steps per second,
+and each Block converts its planned speeds back into major-axis tick rates for
+motion.profile_intervals() when it's executed.
+
+Whenever a move reverses the direction of an axis, the steps needed to take up
+that axis's backlash are added to the start of the move so that they're taken
+at the planned speed and overlap with the motion of the other axis, as is done
+by Marlin:
+https://github.com/MarlinFirmware/Marlin/blob/2.0.x/Marlin/src/feature/backlash.cpp
+
+Adapted from the grbl planner:
+https://github.com/grbl/grbl/blob/master/grbl/planner.c
+
+"""
+
+from math import sqrt
+
+from motion import (
+    X_DIR_POSITIVE,
+    X_STEP,
+    Y_DIR_POSITIVE,
+    Y_STEP,
+    line_step_flags,
+    major_axis_limit,
+)
+
+
+# Junctions with a cosine closer than this to -1 are treated as straight.
+STRAIGHT_JUNCTION_COS_THETA = -0.999999
+
+
+class Block:
+    """A planned linear move of x_delta and y_delta steps, the first x_backlash
+    and y_backlash of which take up backlash and don't change the position.
+    """
+    def __init__(self, x_delta, y_delta, x_backlash, y_backlash, start_rates,
+                 max_rates, accels):
+        self.x_delta = x_delta
+        self.y_delta = y_delta
+        self.x_backlash = x_backlash
+        self.y_backlash = y_backlash
+        self.num_steps = max(abs(x_delta), abs(y_delta))
+        self.length = sqrt(x_delta * x_delta + y_delta * y_delta)
+        # The unit vectors of the directions in which the move leaves its start
+        # and arrives at its end, which determine the junction speeds.
+        self.entry_dir = self.exit_dir = (x_delta / self.length,
+                                          y_delta / self.length)
+        self.init_speeds(start_rates, max_rates, accels)
+
+    def get_path_limit(self, limits):
+        """Convert (<x>, <y>) per-axis rate or acceleration limits into a
+        limit on the speed or acceleration along the path.
+        """
+        return major_axis_limit(
+            limits[0], limits[1], abs(self.x_delta), abs(self.y_delta)
+        ) * self.length / self.num_steps
+
+    def init_speeds(self, start_rates, max_rates, accels):
+        self.start_speed = self.get_path_limit(start_rates)
+        self.max_speed = max(self.start_speed, self.get_path_limit(max_rates))
+        self.accel = self.get_path_limit(accels)
+
+        # The planner fills these in.
+        self.max_entry_speed = self.start_speed
+        self.entry_speed = self.start_speed
+        self.exit_speed = self.start_speed
+        self.x_reversal = False
+        self.y_reversal = False
+
+    def get_tick_rates(self):
+        """Return an (<entry>, <cruise>, <exit>, <accel>) tuple of the planned
+        values in major-axis ticks, as expected by profile_intervals().
+        """
+        path_to_ticks = self.num_steps / self.length
+        return (
+            self.entry_speed * path_to_ticks,
+            self.max_speed * path_to_ticks,
+            self.exit_speed * path_to_ticks,
+            self.accel * path_to_ticks,
+        )
+
+    def get_step_flags(self):
+        """Return a generator of the step flags for each tick of the move.
+        """
+        return line_step_flags(self.x_delta, self.y_delta)
+
+
+class CurveBlock(Block):
+    """A planned move along a motion.curves segment, before which the
+    x_backlash and y_backlash steps are taken.
+    """
+    def __init__(self, curve, x_backlash, y_backlash, start_rates, max_rates,
+                 accels):
+        self.curve = curve
+        self.x_delta = curve.x_delta + get_axis_dir(curve.x_delta) * x_backlash
+        self.y_delta = curve.y_delta + get_axis_dir(curve.y_delta) * y_backlash
+        self.x_backlash = x_backlash
+        self.y_backlash = y_backlash
+        # The backlash of both axes is taken up together, before the curve's
+        # ticks.
+        num_backlash_ticks = max(x_backlash, y_backlash)
+        self.num_steps = (max(abs(curve.x_delta), abs(curve.y_delta))
+                          + num_backlash_ticks)
+        self.length = curve.length + num_backlash_ticks
+        self.entry_dir = curve.entry_dir
+        self.exit_dir = curve.exit_dir
+        self.init_speeds(start_rates, max_rates, accels)
+        if curve.min_radius is not None:
+            # Limit the centripetal acceleration at the tightest point of the
+            # curve, as for a junction.
+            self.max_speed = max(self.start_speed, min(
+                self.max_speed, sqrt(self.accel * curve.min_radius)))
+
+    def get_path_limit(self, limits):
+        # Each tick steps each axis at most once, so the tick rate is limited
+        # by the slowest of the axes that move.
+        limit = None
+        for axis_limit, delta in zip(limits, (self.x_delta, self.y_delta)):
+            if delta and (limit is None or axis_limit < limit):
+                limit = axis_limit
+        return limit * self.length / self.num_steps
+
+    def get_step_flags(self):
+        x_flags = X_STEP | (X_DIR_POSITIVE if self.x_delta > 0 else 0)
+        y_flags = Y_STEP | (Y_DIR_POSITIVE if self.y_delta > 0 else 0)
+        for i in range(max(self.x_backlash, self.y_backlash)):
+            yield ((x_flags if i < self.x_backlash else 0)
+                   | (y_flags if i < self.y_backlash else 0))
+        yield from self.curve.get_step_flags()
+
+
+def get_axis_dir(delta):
+    return -1 if delta < 0 else 1 if delta > 0 else 0
+
+
+class Planner:
+    def __init__(self, start_rates, max_rates, accels, junction_deviation,
+                 lookahead, backlash_steps, axis_dirs):
+        """Each of start_rates, max_rates and accels is an (<x>, <y>) tuple of
+        per-axis limits. junction_deviation, in steps, controls how fast
+        corners are taken, as described here:
+        https://onehossshay.wordpress.com/2011/09/24/improving_grbl_cornering_algorithm/
+        backlash_steps is a ((<left>, <right>), (<down>, <up>)) tuple of the
+        number of steps to take up when reversing into each direction, and
+        axis_dirs is an (<x>, <y>) tuple of the last direction, -1 or 1, in
+        which each axis moved.
+        """
+        self.start_rates = start_rates
+        self.max_rates = max_rates
+        self.accels = accels
+        self.junction_deviation = junction_deviation
+        self.lookahead = lookahead
+        # Plan for the buffer to end at the lowest speed at which any future
+        # block could be entered so that the buffered speeds remain feasible
+        # no matter what gets added next.
+        self.stop_speed = min(start_rates)
+        self.backlash_steps = backlash_steps
+        self.blocks = []
+        self.last_block = None
+        # Keep track of the last direction of each axis across paths so that
+        # we know when the backlash needs to be taken up.
+        self.axis_dirs = list(axis_dirs)
+
+    def get_junction_speed(self, prev, block):
+        """Return the max speed at which to pass from block prev into block.
+        """
+        # Since we can start from a standstill at the start speed, we can
+        # always pass through a junction at least that fast.
+        floor_speed = min(prev.start_speed, block.start_speed)
+        max_speed = min(prev.max_speed, block.max_speed)
+
+        cos_theta = -(prev.exit_dir[0] * block.entry_dir[0]
+                      + prev.exit_dir[1] * block.entry_dir[1])
+        if cos_theta < STRAIGHT_JUNCTION_COS_THETA:
+            return max_speed
+
+        # Use the speed at which the centripetal acceleration around a circle
+        # that deviates junction_deviation steps from the corner is within
+        # the acceleration limit.
+        # Clamp cos_theta, which floating-point error can push just past 1 at
+        # a full reversal.
+        sin_half_theta = sqrt(0.5 * max(1 - cos_theta, 0))
+        accel = min(prev.accel, block.accel)
+        speed = sqrt(accel * self.junction_deviation * sin_half_theta
+                     / (1 - sin_half_theta))
+        return min(max(floor_speed, speed), max_speed)
+
+    def is_reversal(self, axis_num, delta):
+        """Return whether moving delta steps along the axis reverses its
+        direction.
+        """
+        axis_dir = get_axis_dir(delta)
+        return axis_dir != 0 and axis_dir != self.axis_dirs[axis_num]
+
+    def get_backlash(self, axis_num, delta):
+        """Return the number of backlash steps to take up before moving delta
+        steps along the axis, and record the new direction.
+        """
+        if not self.is_reversal(axis_num, delta):
+            return 0
+        axis_dir = get_axis_dir(delta)
+        self.axis_dirs[axis_num] = axis_dir
+        return self.backlash_steps[axis_num][1 if axis_dir > 0 else 0]
+
+    def recalculate(self):
+        """Set the entry and exit speeds of the buffered blocks to the highest
+        values that still allow the last block to exit at stop_speed.
+        The entry speed of the first block is fixed since the block before it
+        has already been handed off for execution.
+        """
+        blocks = self.blocks
+        num_blocks = len(blocks)
+
+        # Backward pass: limit each entry speed to what the block can
+        # decelerate from to reach the entry speed of the following block.
+        next_entry_speed = self.stop_speed
+        i = num_blocks - 1
+        while i > 0:
+            block = blocks[i]
+            block.entry_speed = min(
+                block.max_entry_speed,
+                sqrt(next_entry_speed * next_entry_speed
+                     + 2 * block.accel * block.length)
+            )
+            next_entry_speed = block.entry_speed
+            i -= 1
+
+        # Forward pass: limit each exit speed to what the block can accelerate
+        # to from its entry speed.
+        for i in range(num_blocks):
+            block = blocks[i]
+            max_exit_speed = sqrt(block.entry_speed * block.entry_speed
+                                  + 2 * block.accel * block.length)
+            if i + 1 < num_blocks:
+                next_block = blocks[i + 1]
+                if next_block.entry_speed > max_exit_speed:
+                    next_block.entry_speed = max_exit_speed
+                block.exit_speed = next_block.entry_speed
+            else:
+                block.exit_speed = min(self.stop_speed, max_exit_speed)
+
+    def add(self, x_delta, y_delta, curve=None):
+        """Queue a linear move, or, if curve is specified, a move along that
+        motion.curves segment, the deltas of which must be x_delta and
+        y_delta, and return a list of the blocks that are ready for
+        execution, in order.
+        """
+        if not x_delta and not y_delta:
+            return ()
+        x_reversal = self.is_reversal(0, x_delta)
+        y_reversal = self.is_reversal(1, y_delta)
+        x_backlash = self.get_backlash(0, x_delta)
+        y_backlash = self.get_backlash(1, y_delta)
+        if curve is not None:
+            block = CurveBlock(curve, x_backlash, y_backlash,
+                               self.start_rates, self.max_rates, self.accels)
+        else:
+            block = Block(
+                x_delta + get_axis_dir(x_delta) * x_backlash,
+                y_delta + get_axis_dir(y_delta) * y_backlash,
+                x_backlash,
+                y_backlash,
+                self.start_rates,
+                self.max_rates,
+                self.accels
+            )
+        block.x_reversal = x_reversal
+        block.y_reversal = y_reversal
+        if self.last_block is not None:
+            block.max_entry_speed = self.get_junction_speed(
+                self.last_block, block)
+        self.last_block = block
+        self.blocks.append(block)
+        self.recalculate()
+
+        ready_blocks = []
+        while len(self.blocks) > self.lookahead:
+            ready_blocks.append(self.blocks.pop(0))
+        return ready_blocks
+
+    def add_curve(self, curve):
+        """Queue a move along a motion.curves segment, as for add().
+        """
+        return self.add(curve.x_delta, curve.y_delta, curve)
+
+    def flush(self):
+        """Return a list of all the remaining buffered blocks, the last of which
+        will come to a stop, and reset the planner for a new path.
+        """
+        blocks = self.blocks
+        self.blocks = []
+        self.last_block = None
+        return blocks
+
+    def discard(self):
+        """Drop the buffered blocks without executing them, e.g. when a path is
+        abandoned part way through, and reset the planner for a new path.
+        """
+        # Restore the directions in which the axes last moved, which each
+        # reversal recorded when its block was added.
+        for block in reversed(self.blocks):
+            if block.x_reversal:
+                self.axis_dirs[0] = -self.axis_dirs[0]
+            if block.y_reversal:
+                self.axis_dirs[1] = -self.axis_dirs[1]
+        self.flush()
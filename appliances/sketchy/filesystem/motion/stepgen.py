@@ -0,0 +1,106 @@
+"""Background Step Generator
+
+A StepEngine drains a ring buffer of precomputed (<flags>, <interval>) step
+entries from a one-shot hardware timer that re-arms itself with the interval of
+each next entry, so that steps are issued at the planned times while the main
+thread is free to plan the next moves and handle HTTP requests.
+
+Note that on the ESP32 port, Timer callbacks are scheduled like soft
+interrupts, so they run between Python bytecodes rather than preempting them.
+The callback is nevertheless written to not allocate, e.g. it re-arms the
+timer with the integer period of the next entry, in microseconds, rather than
+with a float frequency.
+
+Entries are computed, and so the position that they lead to is recorded, by
+the time that they're pushed, so the recorded position leads the one that the
+steppers have reached by up to size - 1 steps until the buffer drains, which
+wait() waits for.
+
+"""
+
+from array import array
+from machine import Timer
+from utime import sleep_ms
+
+
+class StepEngine:
+    def __init__(self, pulse, size, timer_id=0, on_idle=None):
+        """pulse is a function that accepts the flags of an entry and issues
+        the corresponding steps, and on_idle, if specified, is called once the
+        buffer has drained and no more entries are expected.
+        """
+        self.pulse = pulse
+        self.on_idle = on_idle
+        self.size = size
+        self.flags = bytearray(size)
+        self.intervals = array('I', (0 for _ in range(size)))
+        # head is the index of the next entry to write and tail the index of
+        # the next entry to read. The buffer is empty when they're equal, so
+        # it holds at most size - 1 entries.
+        self.head = 0
+        self.tail = 0
+        self.running = False
+        self.holding = False
+        self.steps_done = 0
+        # The number of times that the buffer ran dry while more entries were
+        # expected, i.e. that the planner didn't keep up.
+        self.num_underruns = 0
+        self.timer = Timer(timer_id)
+        # Prevent the allocation of a new bound method on each re-arm.
+        self._callback = self.callback
+
+    def arm(self, interval):
+        self.timer.init(mode=Timer.ONE_SHOT, period=interval,
+                        tick_hz=1000000, callback=self._callback)
+
+    def callback(self, timer):
+        tail = self.tail
+        self.pulse(self.flags[tail])
+        self.steps_done += 1
+        tail = (tail + 1) % self.size
+        self.tail = tail
+        if tail != self.head:
+            self.arm(self.intervals[tail])
+            return
+        self.running = False
+        if self.holding:
+            self.num_underruns += 1
+        elif self.on_idle is not None:
+            self.on_idle()
+
+    def is_full(self):
+        return (self.head + 1) % self.size == self.tail
+
+    def push(self, flags, interval):
+        """Append an entry to the buffer, waiting for space if necessary, and
+        start the timer if it's not already running.
+        """
+        while self.is_full():
+            sleep_ms(1)
+        head = self.head
+        self.flags[head] = flags
+        self.intervals[head] = interval
+        self.head = (head + 1) % self.size
+        if not self.running:
+            self.running = True
+            self.arm(interval)
+
+    def begin(self):
+        """Signal that entries are about to be pushed so that on_idle isn't
+        called if the buffer momentarily runs dry.
+        """
+        self.holding = True
+
+    def end(self):
+        """Signal that no more entries are expected so that on_idle is called
+        once the buffer drains.
+        """
+        self.holding = False
+        if not self.running and self.on_idle is not None:
+            self.on_idle()
+
+    def wait(self):
+        """Wait for the buffer to drain.
+        """
+        while self.running:
+            sleep_ms(1)
@@ -0,0 +1,113 @@
+"""Threaded Step Executor
+
+A StepThread executes planned blocks on a dedicated _thread worker, which
+takes them from a lock-protected ring buffer that the planning thread fills, so
+that the route handlers are free to parse requests and plan the next moves
+while the current ones are stepped.
+
+Note that on the ESP32 port, MicroPython threads share the GIL and run on the
+same core, so the worker competes with the other threads for the interpreter
+rather than running in parallel with them. Blocks are nevertheless handed off
+whole so that the worker holds the GIL for as few switches as possible.
+
+"""
+
+import _thread
+from utime import (
+    sleep_ms,
+    ticks_us,
+)
+
+
+class StepThread:
+    def __init__(self, execute, size, on_idle=None):
+        """execute is a function that accepts a planned block and a ticks_us()
+        deadline, issues the steps of the block, the first one interval after
+        the deadline, and returns the deadline of the last step. on_idle, if
+        specified, is called once the buffer has drained and no more blocks
+        are expected.
+        """
+        self.execute = execute
+        self.on_idle = on_idle
+        self.size = size
+        self.blocks = [None] * size
+        # head is the index of the next block to write and tail the index of
+        # the next block to read. The buffer is empty when they're equal, so
+        # it holds at most size - 1 blocks.
+        self.head = 0
+        self.tail = 0
+        self.lock = _thread.allocate_lock()
+        # running is True from when a block is pushed until the buffer
+        # drains.
+        self.running = False
+        self.holding = False
+        # The number of times that the buffer ran dry while more blocks were
+        # expected, i.e. that the planner didn't keep up.
+        self.num_underruns = 0
+        _thread.start_new_thread(self.work, ())
+
+    def is_full(self):
+        return (self.head + 1) % self.size == self.tail
+
+    def push(self, block):
+        """Append a block to the buffer, waiting for space if necessary.
+        """
+        while self.is_full():
+            sleep_ms(1)
+        with self.lock:
+            self.blocks[self.head] = block
+            self.head = (self.head + 1) % self.size
+            self.running = True
+
+    def pop(self):
+        """Remove and return the next block from the buffer, or return None if
+        it's empty.
+        """
+        with self.lock:
+            if self.tail == self.head:
+                return None
+            block = self.blocks[self.tail]
+            self.blocks[self.tail] = None
+            self.tail = (self.tail + 1) % self.size
+            return block
+
+    def work(self):
+        deadline = None
+        while True:
+            block = self.pop()
+            if block is not None:
+                if deadline is None:
+                    deadline = ticks_us()
+                deadline = self.execute(block, deadline)
+                continue
+            deadline = None
+            with self.lock:
+                if self.running and self.tail == self.head:
+                    # Call on_idle before clearing running so that wait()
+                    # doesn't return until it's done.
+                    if self.holding:
+                        self.num_underruns += 1
+                    elif self.on_idle is not None:
+                        self.on_idle()
+                    self.running = False
+            sleep_ms(1)
+
+    def begin(self):
+        """Signal that blocks are about to be pushed so that on_idle isn't
+        called if the buffer momentarily runs dry.
+        """
+        self.holding = True
+
+    def end(self):
+        """Signal that no more blocks are expected so that on_idle is called
+        once the buffer drains.
+        """
+        self.holding = False
+        if not self.running and self.on_idle is not None:
+            self.on_idle()
+
+    def wait(self):
+        """Wait for the buffer to drain.
+        """
+        while self.running:
+            sleep_ms(1)
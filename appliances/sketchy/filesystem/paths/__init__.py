@@ -0,0 +1,15 @@
+"""Path Processing Functions
+
+A path is a sequence of (<x>, <y>) points that are visited in order, and a
+stroke is a path that doesn't need to be connected to the one before it, e.g. an
+SVG subpath or a single glyph.
+
+"""
+
+
+def chain_strokes(strokes):
+    """Return a generator of the points of each stroke in turn, which connects
+    each stroke to the next with a straight line.
+    """
+    for stroke in strokes:
+        yield from stroke
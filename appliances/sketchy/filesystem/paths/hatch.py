@@ -0,0 +1,302 @@
+"""Scanline Hatch Fill
+
+hatch() fills a shape, given as the points of its closed subpaths, with
+parallel lines that are a fixed distance apart and at a given angle, which is
+all an Etch A Sketch can do to shade an area.
+
+The shape is rotated so that the hatch lines are horizontal and intersected
+with one scanline per hatch line using an active edge table, so the cost
+scales with the number of edges times the number of scanlines, regardless of
+the shape's area:
+
+  1. Build a table of the shape's non-horizontal edges sorted by their lowest
+     y coordinate.
+
+  2. For each scanline, move the edges that begin below it from the table to
+     the active list, drop the active ones that end below it, and sort the x
+     coordinates at which the active edges cross it. The spans between them
+     that are inside the shape, by its fill rule, are the hatch lines.
+
+Each span is linked to the span of the previous scanline that it overlaps, in
+alternating directions, so that the hatch lines of each part of the shape are
+drawn as one zig-zag stroke whose connecting moves follow its outline rather
+than cutting back across it.
+
+Since the stylus can't be lifted, fill_shape() draws the outline first and
+then links each of these strokes to the next along the outline too, whenever
+they end on the same subpath, so that the whole shape is drawn as a single
+route that, other than to cross between subpaths, only retraces lines that
+have already been drawn.
+
+"""
+
+from math import (
+    cos,
+    floor,
+    radians,
+    sin,
+    sqrt,
+)
+
+
+NONZERO = 'nonzero'
+EVENODD = 'evenodd'
+
+
+def get_distance(p0, p1):
+    return sqrt((p1[0] - p0[0]) ** 2 + (p1[1] - p0[1]) ** 2)
+
+
+class Outline:
+    """The closed outline of one of a shape's subpaths, along which the stylus
+    can move between two points on it without drawing anything new.
+    Positions on the outline are (<edge num>, <t>) tuples, where edge n runs
+    from the nth point to the next, or from the last point back to the first,
+    and t is the fraction of the way along it.
+    """
+    def __init__(self, points):
+        self.points = points
+        num_points = len(points)
+        # The distance along the outline to the start of each edge.
+        self.offsets = []
+        self.edge_lengths = []
+        length = 0
+        for i in range(num_points):
+            edge_length = get_distance(points[i],
+                                       points[(i + 1) % num_points])
+            self.offsets.append(length)
+            self.edge_lengths.append(edge_length)
+            length += edge_length
+        self.length = length
+
+    def get_offset(self, position):
+        edge_num, t = position
+        return self.offsets[edge_num] + t * self.edge_lengths[edge_num]
+
+    def get_path(self, start, end):
+        """Return a list of the points at which the shorter way along the
+        outline from position start to position end turns.
+        """
+        if not self.length:
+            return []
+        forward = (self.get_offset(end) - self.get_offset(start)) % self.length
+        points = []
+        num_points = len(self.points)
+        i = start[0]
+        if forward <= self.length - forward:
+            while i != end[0]:
+                i = (i + 1) % num_points
+                points.append(self.points[i])
+        else:
+            while i != end[0]:
+                points.append(self.points[i])
+                i = (i - 1) % num_points
+        return points
+
+
+class Chain:
+    """A zig-zag stroke that hatches part of a shape, which starts and ends on
+    its outline at the (<polygon num>, <outline position>) tuples start and
+    end.
+    """
+    def __init__(self, start):
+        self.points = []
+        self.start = start
+        self.end = start
+        # The x coordinates of the last span, for linking the next one.
+        self.x_start = None
+        self.x_end = None
+        # Whether the next span goes left to right.
+        self.left_to_right = True
+
+    def reverse(self):
+        self.points.reverse()
+        self.start, self.end = self.end, self.start
+
+
+def get_outline_path(outlines, start, end):
+    """Return a list of the points along which to move between the
+    (<polygon num>, <outline position>) tuples start and end, which is along
+    the outline if they're on the same one, or straight across otherwise.
+    """
+    if start[0] != end[0]:
+        return []
+    return outlines[start[0]].get_path(start[1], end[1])
+
+
+def get_edge_table(polygons, cos_a, sin_a):
+    """Return a list of the (<y min>, <y max>, <x at y min>, <dx/dy>,
+    <winding>, <polygon num>, <edge num>) tuples of the non-horizontal edges
+    of the polygons, rotated by -angle, sorted by y min, where winding is 1
+    for an edge that goes up and -1 for one that goes down, and edge num is
+    as for Outline.
+    """
+    edges = []
+    for polygon_num, polygon in enumerate(polygons):
+        points = [(x * cos_a + y * sin_a, y * cos_a - x * sin_a)
+                  for x, y in polygon]
+        num_points = len(points)
+        # Implicitly close each polygon.
+        for i in range(num_points):
+            add_edge(edges, points[i], points[(i + 1) % num_points],
+                     polygon_num, i)
+    edges.sort(key=lambda edge: edge[0])
+    return edges
+
+
+def add_edge(edges, p0, p1, polygon_num, edge_num):
+    (x0, y0), (x1, y1) = p0, p1
+    if y0 == y1:
+        return
+    if y0 < y1:
+        edges.append((y0, y1, x0, (x1 - x0) / (y1 - y0), 1, polygon_num,
+                      edge_num))
+    else:
+        edges.append((y1, y0, x1, (x0 - x1) / (y0 - y1), -1, polygon_num,
+                      edge_num))
+
+
+def get_crossing(edge, y):
+    """Return an (<x>, <winding>, <position>) tuple of where the edge crosses
+    the scanline at y, where position is as for Chain.
+    """
+    e_y_min, e_y_max, x0, dx_dy, winding, polygon_num, edge_num = edge
+    t = (y - e_y_min) / (e_y_max - e_y_min)
+    if winding < 0:
+        # The edge goes down from its first point.
+        t = 1 - t
+    return x0 + (y - e_y_min) * dx_dy, winding, (polygon_num, (edge_num, t))
+
+
+def get_spans(crossings, fill_rule):
+    """Return a generator of the (<start crossing>, <end crossing>) spans
+    between the crossings of a scanline, sorted by x, that are inside the
+    shape.
+    """
+    winding = 0
+    start = None
+    for crossing in crossings:
+        if fill_rule == EVENODD:
+            winding ^= 1
+        else:
+            winding += crossing[1]
+        if winding and start is None:
+            start = crossing
+        elif not winding and start is not None:
+            if crossing[0] > start[0]:
+                yield start, crossing
+            start = None
+
+
+def iter_chains(polygons, outlines, spacing, angle, fill_rule):
+    """Return a generator of the Chains that hatch the shape whose subpaths
+    are the polygons, the Outlines of which are outlines, as for hatch().
+    """
+    a = radians(angle)
+    cos_a = cos(a)
+    sin_a = sin(a)
+    edges = get_edge_table(polygons, cos_a, sin_a)
+    if not edges:
+        return
+    y_min = edges[0][0]
+    y_max = max(edge[1] for edge in edges)
+
+    # Rotate each point back by angle.
+    unrotate = lambda x, y: (x * cos_a - y * sin_a, x * sin_a + y * cos_a)
+
+    next_edge = 0
+    active = []
+    chains = []
+    # Place the scanlines half a spacing in from the extremes.
+    scanline = floor(y_min / spacing)
+    y = (scanline + 0.5) * spacing
+    if y <= y_min:
+        y += spacing
+    while y < y_max:
+        while next_edge < len(edges) and edges[next_edge][0] <= y:
+            active.append(edges[next_edge])
+            next_edge += 1
+        active = [edge for edge in active if edge[1] > y]
+        crossings = [get_crossing(edge, y) for edge in active]
+        crossings.sort(key=lambda crossing: crossing[0])
+        next_chains = []
+        for start, end in get_spans(crossings, fill_rule):
+            x_start = start[0]
+            x_end = end[0]
+            # Continue the first open chain whose last span overlaps this one.
+            for i, chain in enumerate(chains):
+                if chain.x_start <= x_end and x_start <= chain.x_end:
+                    del chains[i]
+                    break
+            else:
+                chain = Chain(start[2])
+            if not chain.left_to_right:
+                start, end = end, start
+            if chain.points:
+                # Move along the outline to the start of the span.
+                chain.points.extend(
+                    get_outline_path(outlines, chain.end, start[2]))
+            chain.points.append(unrotate(start[0], y))
+            chain.points.append(unrotate(end[0], y))
+            chain.end = end[2]
+            chain.x_start = x_start
+            chain.x_end = x_end
+            chain.left_to_right = not chain.left_to_right
+            next_chains.append(chain)
+        # Any chains that weren't continued are complete.
+        for chain in chains:
+            yield chain
+        chains = next_chains
+        y += spacing
+    for chain in chains:
+        yield chain
+
+
+def hatch(polygons, spacing, angle=0, fill_rule=NONZERO):
+    """Return a generator of the point lists of the zig-zag strokes that hatch
+    the shape whose subpaths are the polygons, with lines spacing apart at
+    angle degrees counterclockwise from the x axis.
+    """
+    polygons = [list(polygon) for polygon in polygons]
+    outlines = [Outline(polygon) for polygon in polygons]
+    for chain in iter_chains(polygons, outlines, spacing, angle, fill_rule):
+        yield chain.points
+
+
+def fill_shape(polygons, spacing, angle=0, fill_rule=NONZERO):
+    """Return a generator of the point lists that draw the outline of the
+    shape whose subpaths are the polygons, followed by one that hatches it as
+    for hatch(), starting from the end of the outline, with each zig-zag
+    stroke linked to the nearest of the rest along the outline.
+    """
+    polygons = [list(polygon) for polygon in polygons]
+    outlines = [Outline(polygon) for polygon in polygons]
+    position = None
+    for polygon_num, polygon in enumerate(polygons):
+        if polygon:
+            yield polygon
+            # The outline ends at the start of the polygon's closing edge.
+            position = (polygon_num, (len(polygon) - 1, 0))
+    chains = list(iter_chains(polygons, outlines, spacing, angle, fill_rule))
+    if not chains:
+        return
+    point = polygons[position[0]][-1]
+    points = [point]
+    while chains:
+        # Draw the chain that starts or ends nearest to the stylus next.
+        best = None
+        for i, chain in enumerate(chains):
+            for is_reversed, end in ((False, chain.points[0]),
+                                     (True, chain.points[-1])):
+                distance = get_distance(point, end)
+                if best is None or distance < best[0]:
+                    best = (distance, i, is_reversed)
+        _, i, is_reversed = best
+        chain = chains.pop(i)
+        if is_reversed:
+            chain.reverse()
+        points.extend(get_outline_path(outlines, position, chain.start))
+        points.extend(chain.points)
+        point = chain.points[-1]
+        position = chain.end
+    yield points
@@ -0,0 +1,138 @@
+"""Plot File Format
+
+A plot file is a compact, ready-to-run encoding of a path that can be replayed
+without any parsing, e.g. from the SD card. It consists of a 6-byte header:
+
+  <magic:4s = b'SKPL'> <version:uint16>
+
+followed by one 4-byte record per point:
+
+  <x delta:int16> <y delta:int16>
+
+where each delta is relative to the previous point, and the first one to
+(0, 0). All values are little-endian.
+
+PlotReader reads the records in fixed-size chunks into a caller-supplied
+bytearray, so a file of any size is replayed in constant memory.
+
+"""
+
+from struct import (
+    calcsize,
+    pack,
+    pack_into,
+    unpack_from,
+)
+
+
+MAGIC = b'SKPL'
+VERSION = 1
+HEADER_FORMAT = '<4sH'
+HEADER_SIZE = calcsize(HEADER_FORMAT)
+RECORD_FORMAT = '<hh'
+RECORD_SIZE = calcsize(RECORD_FORMAT)
+INT16_MIN = -32768
+INT16_MAX = 32767
+
+
+class InvalidPlotFile(Exception): pass
+
+
+def encode_header():
+    return pack(HEADER_FORMAT, MAGIC, VERSION)
+
+
+def encode_points(points, buf):
+    """Return a generator of memoryviews of buf, each holding the records of as
+    many of the points as fit, where the length of buf must be a multiple of
+    RECORD_SIZE.
+    """
+    mv = memoryview(buf)
+    size = len(buf)
+    offset = 0
+    last_x = last_y = 0
+    for x, y in points:
+        x = int(x)
+        y = int(y)
+        x_delta = x - last_x
+        y_delta = y - last_y
+        if not (INT16_MIN <= x_delta <= INT16_MAX
+                and INT16_MIN <= y_delta <= INT16_MAX):
+            raise ValueError('Point delta out of int16 range: {},{}'.format(
+                x_delta, y_delta))
+        pack_into(RECORD_FORMAT, buf, offset, x_delta, y_delta)
+        offset += RECORD_SIZE
+        if offset == size:
+            yield mv
+            offset = 0
+        last_x, last_y = x, y
+    if offset:
+        yield mv[:offset]
+
+
+def write_plot_file(fh, points, buf):
+    """Write the header and point records to the open binary file and return
+    the number of points written.
+    """
+    fh.write(encode_header())
+    num_bytes = 0
+    for chunk in encode_points(points, buf):
+        fh.write(chunk)
+        num_bytes += len(chunk)
+    return num_bytes // RECORD_SIZE
+
+
+class PlotReader:
+    def __init__(self, fh, buf, size=None):
+        """fh is an open binary file, or any stream with read() and readinto()
+        methods, and buf is a bytearray into which to read it, the length of
+        which must be a multiple of RECORD_SIZE. Specify size to stop reading
+        after that many bytes, e.g. at the end of a request body, instead of at
+        the end of the stream.
+        """
+        self.fh = fh
+        self.buf = buf
+        self.mv = memoryview(buf)
+        self.num_remaining = None if size is None else size - HEADER_SIZE
+        header = fh.read(HEADER_SIZE)
+        if len(header) != HEADER_SIZE:
+            raise InvalidPlotFile('File is too short')
+        magic, version = unpack_from(HEADER_FORMAT, header)
+        if magic != MAGIC:
+            raise InvalidPlotFile('Bad magic: {}'.format(magic))
+        if version != VERSION:
+            raise InvalidPlotFile('Unsupported version: {}'.format(version))
+
+    def read_points(self):
+        """Return a generator of the absolute points in the file.
+        """
+        buf = self.buf
+        mv = self.mv
+        size = len(buf)
+        x = y = 0
+        # The number of bytes left over from a short read that didn't end on
+        # a record boundary, which are moved to the start of the buffer.
+        num_leftover = 0
+        while True:
+            end = size
+            if self.num_remaining is not None:
+                end = min(end, num_leftover + self.num_remaining)
+            if end == num_leftover:
+                break
+            num_read = self.fh.readinto(mv[num_leftover:end])
+            if not num_read:
+                break
+            if self.num_remaining is not None:
+                self.num_remaining -= num_read
+            end = num_leftover + num_read
+            num_records_bytes = end - end % RECORD_SIZE
+            for offset in range(0, num_records_bytes, RECORD_SIZE):
+                x_delta, y_delta = unpack_from(RECORD_FORMAT, buf, offset)
+                x += x_delta
+                y += y_delta
+                yield x, y
+            num_leftover = end - num_records_bytes
+            for i in range(num_leftover):
+                buf[i] = buf[num_records_bytes + i]
+        if num_leftover:
+            raise InvalidPlotFile('File ends with a partial record')
@@ -0,0 +1,340 @@
+"""Pen-Down Route Planning
+
+An Etch A Sketch can't lift its stylus, so every move between two strokes draws
+a visible extra line. plan_route() treats the segments of all of a job's
+strokes as the edges of a graph and returns a single continuous path that
+draws every edge, re-tracing already-drawn edges instead of drawing new ones
+wherever possible:
+
+  1. Connect the components of the graph with the shortest possible new
+     edges, growing out from the component nearest to the start position.
+
+  2. Pair up the odd-degree vertices, each of which would otherwise require a
+     jump to or from it, using nearest-neighbour matching improved by 2-opt
+     swaps, and duplicate the edges along the shortest path between the
+     vertices of each pair, which approximates the minimum-weight matching of
+     the Chinese Postman Problem. The pair that includes the start vertex is
+     left unmatched to serve as the two ends of the route.
+
+  3. Walk the now Eulerian graph with Hierholzer's algorithm.
+
+Connecting the components takes time proportional to the square of the number
+of vertices, and the matching keeps the distances between every pair of odd
+vertices, so jobs with more than max_vertices vertices or max_odd_vertices
+odd vertices fall back to drawing the strokes in order, as chain_strokes()
+does.
+
+"""
+
+from array import array
+from heapq import (
+    heappop,
+    heappush,
+)
+from math import sqrt
+
+
+# The max number of 2-opt passes to make over the odd-vertex matching.
+MAX_TWO_OPT_PASSES = 8
+
+# The default max numbers of vertices and odd vertices of the graph to plan a
+# route for, which bound the time and memory that planning takes on the
+# device.
+MAX_VERTICES = 1000
+MAX_ODD_VERTICES = 64
+
+
+class Graph:
+    def __init__(self):
+        self.points = []
+        self.point_vertex_map = {}
+        # Map each vertex to a list of (<neighbour vertex>, <edge>) tuples.
+        self.adjacency = []
+        # Each edge is an [<a>, <b>, <used>] list.
+        self.edges = []
+        self.edge_keys = set()
+
+    def get_vertex(self, point):
+        vertex = self.point_vertex_map.get(point)
+        if vertex is None:
+            vertex = len(self.points)
+            self.point_vertex_map[point] = vertex
+            self.points.append(point)
+            self.adjacency.append([])
+        return vertex
+
+    def add_edge(self, a, b, allow_duplicate=False):
+        """Add an edge between vertices a and b, ignoring self-loops and, unless
+        allow_duplicate is True, edges that already exist.
+        """
+        if a == b:
+            return
+        key = (a, b) if a < b else (b, a)
+        if key in self.edge_keys and not allow_duplicate:
+            return
+        self.edge_keys.add(key)
+        edge = [a, b, False]
+        self.edges.append(edge)
+        self.adjacency[a].append((b, edge))
+        self.adjacency[b].append((a, edge))
+
+    def get_distance(self, a, b):
+        ax, ay = self.points[a]
+        bx, by = self.points[b]
+        return sqrt((ax - bx) * (ax - bx) + (ay - by) * (ay - by))
+
+    def get_components(self):
+        """Return a list that maps each vertex to its component number.
+        """
+        components = [-1] * len(self.points)
+        component_num = 0
+        for vertex in range(len(self.points)):
+            if components[vertex] != -1:
+                continue
+            components[vertex] = component_num
+            stack = [vertex]
+            while stack:
+                for neighbour, _ in self.adjacency[stack.pop()]:
+                    if components[neighbour] == -1:
+                        components[neighbour] = component_num
+                        stack.append(neighbour)
+            component_num += 1
+        return components
+
+    def get_shortest_paths(self, source):
+        """Return (<distances>, <predecessors>) lists for the shortest paths
+        from the source vertex to every other vertex.
+        """
+        num_vertices = len(self.points)
+        distances = [None] * num_vertices
+        predecessors = [None] * num_vertices
+        distances[source] = 0
+        heap = [(0, source)]
+        while heap:
+            distance, vertex = heappop(heap)
+            if distance > distances[vertex]:
+                continue
+            for neighbour, _ in self.adjacency[vertex]:
+                neighbour_distance = (distance
+                                      + self.get_distance(vertex, neighbour))
+                if (distances[neighbour] is None
+                        or neighbour_distance < distances[neighbour]):
+                    distances[neighbour] = neighbour_distance
+                    predecessors[neighbour] = vertex
+                    heappush(heap, (neighbour_distance, neighbour))
+        return distances, predecessors
+
+
+def get_nearest_vertex(graph, point):
+    x, y = point
+    nearest_vertex = None
+    nearest_distance_sq = None
+    for vertex, (vx, vy) in enumerate(graph.points):
+        distance_sq = (vx - x) * (vx - x) + (vy - y) * (vy - y)
+        if nearest_distance_sq is None or distance_sq < nearest_distance_sq:
+            nearest_vertex = vertex
+            nearest_distance_sq = distance_sq
+    return nearest_vertex
+
+
+def connect_components(graph, start_vertex):
+    """Add the shortest edges that connect all of the graph's components into
+    one, Prim-style, starting from the component of start_vertex.
+    """
+    components = graph.get_components()
+    num_vertices = len(graph.points)
+    in_tree = [False] * num_vertices
+    # Map each vertex outside of the tree to the squared distance to, and the
+    # vertex of, its nearest tree vertex.
+    nearest_distance_sqs = [None] * num_vertices
+    nearest_vertices = [None] * num_vertices
+
+    def add_component(component_num):
+        new_vertices = [v for v in range(num_vertices)
+                        if components[v] == component_num]
+        for v in new_vertices:
+            in_tree[v] = True
+        for v in range(num_vertices):
+            if in_tree[v]:
+                continue
+            vx, vy = graph.points[v]
+            for new_v in new_vertices:
+                nx, ny = graph.points[new_v]
+                distance_sq = (vx - nx) * (vx - nx) + (vy - ny) * (vy - ny)
+                if (nearest_distance_sqs[v] is None
+                        or distance_sq < nearest_distance_sqs[v]):
+                    nearest_distance_sqs[v] = distance_sq
+                    nearest_vertices[v] = new_v
+
+    add_component(components[start_vertex])
+    while True:
+        next_vertex = None
+        for v in range(num_vertices):
+            if in_tree[v]:
+                continue
+            if (next_vertex is None
+                    or nearest_distance_sqs[v]
+                    < nearest_distance_sqs[next_vertex]):
+                next_vertex = v
+        if next_vertex is None:
+            break
+        graph.add_edge(nearest_vertices[next_vertex], next_vertex)
+        add_component(components[next_vertex])
+
+
+def match_odd_vertices(odd_vertices, distance_maps):
+    """Return a list of (<a>, <b>) pairs of odd_vertices that approximately
+    minimizes the total distance between the vertices of each pair, where
+    distance_maps[a][b] is the distance between vertices a and b.
+    """
+    distance = lambda a, b: distance_maps[a][b]
+
+    # Seed the matching by pairing each vertex with its nearest unmatched
+    # neighbour.
+    unmatched = list(odd_vertices)
+    pairs = []
+    while unmatched:
+        a = unmatched.pop(0)
+        b = min(unmatched, key=lambda v: distance(a, v))
+        unmatched.remove(b)
+        pairs.append((a, b))
+
+    # Improve the matching by swapping partners between any two pairs when
+    # doing so reduces the total distance.
+    num_pairs = len(pairs)
+    for _ in range(MAX_TWO_OPT_PASSES):
+        improved = False
+        for i in range(num_pairs):
+            for j in range(i + 1, num_pairs):
+                a, b = pairs[i]
+                c, d = pairs[j]
+                cost = distance(a, b) + distance(c, d)
+                if distance(a, c) + distance(b, d) < cost:
+                    pairs[i], pairs[j] = (a, c), (b, d)
+                    improved = True
+                elif distance(a, d) + distance(b, c) < cost:
+                    pairs[i], pairs[j] = (a, d), (b, c)
+                    improved = True
+        if not improved:
+            break
+    return pairs
+
+
+def get_eulerian_path(graph, start_vertex):
+    """Return the list of vertices visited by walking every edge exactly once,
+    starting at start_vertex, using Hierholzer's algorithm.
+    """
+    # Keep track of the index of the next unexamined edge of each vertex.
+    next_edge_indices = [0] * len(graph.points)
+    stack = [start_vertex]
+    path = []
+    while stack:
+        vertex = stack[-1]
+        adjacency = graph.adjacency[vertex]
+        i = next_edge_indices[vertex]
+        while i < len(adjacency) and adjacency[i][1][2]:
+            i += 1
+        next_edge_indices[vertex] = i
+        if i == len(adjacency):
+            path.append(stack.pop())
+        else:
+            neighbour, edge = adjacency[i]
+            edge[2] = True
+            stack.append(neighbour)
+    path.reverse()
+    return path
+
+
+def chain_graph_strokes(graph, vertex_strokes, strokes):
+    """Return a generator of the points of each of the vertex lists of the
+    strokes that were added to the graph, followed by those of the remaining
+    strokes, in order.
+    """
+    for vertices in vertex_strokes:
+        for vertex in vertices:
+            yield graph.points[vertex]
+    for stroke in strokes:
+        yield from stroke
+
+
+def plan_route(strokes, start_point, max_vertices=MAX_VERTICES,
+               max_odd_vertices=MAX_ODD_VERTICES):
+    """Return a list of points that draws every segment of the strokes as a
+    single continuous path, beginning as close as possible to start_point, or
+    a generator of the points of the strokes in order if the graph has more
+    than max_vertices vertices or more than max_odd_vertices odd vertices.
+    Specify None for either limit to disable it.
+    """
+    graph = Graph()
+    # Record the strokes as vertex lists in case of falling back to drawing
+    # them in order.
+    vertex_strokes = []
+    strokes = iter(strokes)
+    for stroke in strokes:
+        vertices = []
+        for point in stroke:
+            vertex = graph.get_vertex(point)
+            if vertices:
+                graph.add_edge(vertices[-1], vertex)
+            vertices.append(vertex)
+        vertex_strokes.append(vertices)
+        if max_vertices is not None and len(graph.points) > max_vertices:
+            return chain_graph_strokes(graph, vertex_strokes, strokes)
+    if not graph.edges:
+        return list(graph.points)
+
+    start_vertex = get_nearest_vertex(graph, start_point)
+    connect_components(graph, start_vertex)
+
+    odd_vertices = [v for v in range(len(graph.points))
+                    if len(graph.adjacency[v]) % 2]
+    if max_odd_vertices is not None and len(odd_vertices) > max_odd_vertices:
+        return chain_graph_strokes(graph, vertex_strokes, ())
+    vertex_strokes = None
+    if odd_vertices:
+        # The route must start at an odd vertex, so choose the one nearest
+        # to start_point.
+        start_vertex = min(
+            odd_vertices,
+            key=lambda v: (graph.points[v][0] - start_point[0]) ** 2
+                          + (graph.points[v][1] - start_point[1]) ** 2
+        )
+        # Keep only the distances between the odd vertices, which are
+        # matched by their indices, and find the shortest path between the
+        # vertices of each pair again once they're matched.
+        distance_maps = []
+        for v in odd_vertices:
+            distances = graph.get_shortest_paths(v)[0]
+            distance_maps.append(array('f', (distances[u]
+                                             for u in odd_vertices)))
+        pairs = match_odd_vertices(list(range(len(odd_vertices))),
+                                   distance_maps)
+        distance_maps = None
+        for i, j in pairs:
+            a = odd_vertices[i]
+            b = odd_vertices[j]
+            if a == start_vertex or b == start_vertex:
+                continue
+            # Duplicate the edges along the shortest path from b back to a.
+            predecessors = graph.get_shortest_paths(a)[1]
+            vertex = b
+            while vertex != a:
+                graph.add_edge(predecessors[vertex], vertex,
+                               allow_duplicate=True)
+                vertex = predecessors[vertex]
+
+    return [graph.points[v] for v in get_eulerian_path(graph, start_vertex)]
+
+
+def get_path_length(points):
+    """Return the total length of the path through the points.
+    """
+    length = 0
+    last_point = None
+    for x, y in points:
+        if last_point is not None:
+            last_x, last_y = last_point
+            length += sqrt((x - last_x) * (x - last_x)
+                           + (y - last_y) * (y - last_y))
+        last_point = (x, y)
+    return length
@@ -0,0 +1,123 @@
+"""Path Simplification
+
+A Simplifier drops the points of a path that don't change what gets drawn by
+more than a tolerance, in steps, so that they don't each cost a planner block.
+
+Points are first floored to whole steps, as check_point() does, so that runs of
+points that land on the same step collapse into one, and the remaining points
+are then passed through the Ramer-Douglas-Peucker algorithm:
+https://en.wikipedia.org/wiki/Ramer%E2%80%93Douglas%E2%80%93Peucker_algorithm
+
+Since RDP needs to see a whole path at once, it's applied to consecutive
+windows of at most <window_size> points, each of which starts at the last point
+of the previous one, so that arbitrarily long paths can be simplified in
+constant memory.
+
+"""
+
+from math import floor
+
+
+# The default max number of points to simplify at once.
+DEFAULT_WINDOW_SIZE = 64
+
+
+def get_segment_distance_sq(point, a, b):
+    """Return the squared distance from point to the line segment between
+    points a and b.
+    """
+    px, py = point
+    ax, ay = a
+    bx, by = b
+    dx = bx - ax
+    dy = by - ay
+    length_sq = dx * dx + dy * dy
+    if length_sq:
+        # Find the nearest point on the segment, which must be measured
+        # against the segment rather than the line so that a point at which
+        # the path doubles back on itself is never dropped.
+        t = ((px - ax) * dx + (py - ay) * dy) / length_sq
+        if t > 1:
+            ax, ay = bx, by
+        elif t > 0:
+            ax += t * dx
+            ay += t * dy
+    dx = px - ax
+    dy = py - ay
+    return dx * dx + dy * dy
+
+
+def get_kept_flags(points, tolerance_sq):
+    """Return a bytearray with a non-zero value for each of the points that
+    RDP keeps.
+    """
+    num_points = len(points)
+    kept = bytearray(num_points)
+    kept[0] = 1
+    kept[-1] = 1
+    # Use an explicit stack of (<first>, <last>) index ranges instead of
+    # recursion to stay well clear of the MicroPython recursion limit.
+    stack = [(0, num_points - 1)]
+    while stack:
+        first, last = stack.pop()
+        max_distance_sq = tolerance_sq
+        max_i = None
+        a = points[first]
+        b = points[last]
+        for i in range(first + 1, last):
+            distance_sq = get_segment_distance_sq(points[i], a, b)
+            if distance_sq > max_distance_sq:
+                max_distance_sq = distance_sq
+                max_i = i
+        if max_i is not None:
+            kept[max_i] = 1
+            stack.append((first, max_i))
+            stack.append((max_i, last))
+    return kept
+
+
+class Simplifier:
+    def __init__(self, tolerance, window_size=DEFAULT_WINDOW_SIZE):
+        """tolerance is the max distance, in steps, that a dropped point may
+        be from the simplified path. A tolerance of 0 only drops duplicate and
+        collinear points and so never changes the drawing.
+        """
+        self.tolerance_sq = tolerance * tolerance
+        self.window_size = window_size
+        self.num_points = 0
+        self.num_removed = 0
+
+    def simplify_window(self, window):
+        """Return a generator of the kept points of the window, excluding the
+        last one.
+        """
+        kept = get_kept_flags(window, self.tolerance_sq)
+        for i in range(len(window) - 1):
+            if kept[i]:
+                yield window[i]
+            else:
+                self.num_removed += 1
+
+    def simplify(self, points):
+        """Return a generator of the simplified points.
+        """
+        window = []
+        for x, y in points:
+            self.num_points += 1
+            point = (floor(x), floor(y))
+            if window and point == window[-1]:
+                self.num_removed += 1
+                continue
+            window.append(point)
+            if len(window) == self.window_size:
+                yield from self.simplify_window(window)
+                window = [window[-1]]
+        if window:
+            yield from self.simplify_window(window)
+            yield window[-1]
+
+    def get_summary(self):
+        return {
+            'num_input_points': self.num_points,
+            'num_points_removed': self.num_removed,
+        }
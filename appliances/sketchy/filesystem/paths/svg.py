@@ -0,0 +1,776 @@
+"""Streaming SVG Parser
+
+Reads the paths of an SVG file in fixed-size chunks into a caller-supplied
+bytearray, so that a file of any size, with path data of any length, is parsed
+in constant memory:
+
+  - A Scanner reads the file a chunk at a time and can seek back to an earlier
+    position.
+
+  - iter_elements() scans the tags. Rather than reading a path's 'd' attribute
+    into a string, it records the file position at which its value begins.
+
+  - A PathParser tokenizes the path data directly from the Scanner.
+
+  - iter_path_strokes() interprets every path command, M, L, H, V, C, S, Q, T,
+    A and Z in both their absolute and relative forms, and flattens curves and
+    arcs into as few line segments as keep them within a tolerance of the true
+    curve.
+
+  - iter_paths() maintains a stack of the cumulative transform of each open
+    element, composing each element's transform attribute with its parent's
+    into a single matrix as it's pushed, so that the points of a path are
+    transformed by one matrix regardless of how deeply it's nested.
+
+Only the structure and attributes that affect the geometry are interpreted;
+styles, text and any other elements are skipped.
+
+"""
+
+from math import (
+    acos,
+    atan2,
+    ceil,
+    cos,
+    pi,
+    radians,
+    sin,
+    sqrt,
+    tan,
+)
+
+from paths.hatch import NONZERO
+from paths.transform import (
+    IDENTITY,
+    multiply,
+)
+
+
+class InvalidSVG(Exception): pass
+
+
+LT = ord('<')
+GT = ord('>')
+SLASH = ord('/')
+EQUALS = ord('=')
+BANG = ord('!')
+QUESTION = ord('?')
+HYPHEN = ord('-')
+PLUS = ord('+')
+DOT = ord('.')
+COMMA = ord(',')
+ZERO = ord('0')
+ONE = ord('1')
+NINE = ord('9')
+LOWER_E = ord('e')
+UPPER_E = ord('E')
+QUOTES = (ord('"'), ord("'"))
+WHITESPACE = (ord(' '), ord('\t'), ord('\r'), ord('\n'))
+SEPARATORS = WHITESPACE + (COMMA,)
+
+# The max length of a tag name, attribute name or attribute value, other than
+# path data, which is never read into memory.
+MAX_TOKEN_LENGTH = 1024
+
+
+###############################################################################
+# Scanner
+###############################################################################
+
+class Scanner:
+    def __init__(self, fh, buf):
+        """fh is a file opened in binary mode and buf is the bytearray into
+        which to read it.
+        """
+        self.fh = fh
+        self.buf = buf
+        self.buf_len = 0
+        self.pos = 0
+        # The file position of the first byte in buf.
+        self.offset = 0
+
+    def fill(self):
+        self.offset += self.buf_len
+        self.buf_len = self.fh.readinto(self.buf) or 0
+        self.pos = 0
+        return self.buf_len
+
+    def peek(self):
+        """Return the next byte without consuming it, or -1 at the end of the
+        file.
+        """
+        if self.pos == self.buf_len and not self.fill():
+            return -1
+        return self.buf[self.pos]
+
+    def read(self):
+        """Consume and return the next byte, or -1 at the end of the file.
+        """
+        if self.pos == self.buf_len and not self.fill():
+            return -1
+        b = self.buf[self.pos]
+        self.pos += 1
+        return b
+
+    def tell(self):
+        return self.offset + self.pos
+
+    def seek(self, offset):
+        if self.offset <= offset <= self.offset + self.buf_len:
+            # The position is within the buffer, so don't re-read it.
+            self.pos = offset - self.offset
+            return
+        self.fh.seek(offset)
+        self.offset = offset
+        self.buf_len = 0
+        self.pos = 0
+
+    def skip_whitespace(self):
+        while self.peek() in WHITESPACE:
+            self.pos += 1
+
+    def skip_past(self, b):
+        """Consume the bytes up to and including the next b, and return
+        whether it was found.
+        """
+        while True:
+            c = self.read()
+            if c == b:
+                return True
+            if c == -1:
+                return False
+
+    def read_until(self, bs):
+        """Consume and return the bytes up to, but not including, the next one
+        that's in bs, or the end of the file.
+        """
+        token = bytearray()
+        while True:
+            c = self.peek()
+            if c == -1 or c in bs:
+                return bytes(token)
+            if len(token) == MAX_TOKEN_LENGTH:
+                raise InvalidSVG('token exceeds {} bytes at {}'.format(
+                    MAX_TOKEN_LENGTH, self.tell()))
+            token.append(c)
+            self.pos += 1
+
+
+class StringScanner(Scanner):
+    """A Scanner of a string that's already in memory, e.g. an attribute
+    value.
+    """
+    def __init__(self, s):
+        self.buf = s.encode()
+        self.buf_len = len(self.buf)
+        self.pos = 0
+        self.offset = 0
+
+    def fill(self):
+        return 0
+
+
+###############################################################################
+# Elements
+###############################################################################
+
+def skip_markup(scanner):
+    """Skip a comment, CDATA section, processing instruction or declaration
+    whose opening '<' has been consumed.
+    """
+    scanner.read()
+    if scanner.peek() == HYPHEN:
+        # Skip a comment, which may contain '>', up to its closing '-->'.
+        num_hyphens = 0
+        while True:
+            c = scanner.read()
+            if c == -1 or (c == GT and num_hyphens >= 2):
+                return
+            num_hyphens = num_hyphens + 1 if c == HYPHEN else 0
+    scanner.skip_past(GT)
+
+
+def get_local_name(name):
+    """Return the name without any namespace prefix.
+    """
+    return name.decode().split(':')[-1]
+
+
+def iter_elements(scanner):
+    """Return a generator of a (<tag>, <attrs>) tuple for each start tag and a
+    ('/<tag>', None) tuple for each end tag, or each self-closing tag, in
+    document order.
+    attrs is a dict that maps each attribute name to its value, except that
+    the value of a 'd' attribute is the file position of the first byte
+    inside its quotes, from which a PathParser can read it.
+    """
+    while scanner.skip_past(LT):
+        c = scanner.peek()
+        if c in (BANG, QUESTION):
+            skip_markup(scanner)
+            continue
+        if c == SLASH:
+            scanner.read()
+            tag = get_local_name(scanner.read_until(WHITESPACE + (GT,)))
+            scanner.skip_past(GT)
+            yield '/' + tag, None
+            continue
+        tag = get_local_name(scanner.read_until(WHITESPACE + (SLASH, GT)))
+        attrs = {}
+        is_self_closing = False
+        while True:
+            scanner.skip_whitespace()
+            c = scanner.peek()
+            if c == -1:
+                raise InvalidSVG('unterminated <{}> tag'.format(tag))
+            if c == GT:
+                scanner.read()
+                break
+            if c == SLASH:
+                scanner.skip_past(GT)
+                is_self_closing = True
+                break
+            name = get_local_name(
+                scanner.read_until(WHITESPACE + (EQUALS, SLASH, GT)))
+            scanner.skip_whitespace()
+            if scanner.peek() != EQUALS:
+                # Ignore a valueless attribute.
+                continue
+            scanner.read()
+            scanner.skip_whitespace()
+            quote = scanner.read()
+            if name == 'd':
+                attrs[name] = scanner.tell()
+                scanner.skip_past(quote)
+            else:
+                attrs[name] = scanner.read_until((quote,)).decode()
+                scanner.read()
+        yield tag, attrs
+        if is_self_closing:
+            yield '/' + tag, None
+
+
+###############################################################################
+# Path Data
+###############################################################################
+
+class PathParser:
+    def __init__(self, scanner, ends=QUOTES):
+        """Read the path data from the scanner up to the end of the file or
+        the first of the ends bytes, e.g. the closing quote of a 'd'
+        attribute.
+        """
+        self.scanner = scanner
+        self.ends = ends
+
+    def skip_separators(self):
+        scanner = self.scanner
+        while scanner.peek() in SEPARATORS:
+            scanner.pos += 1
+
+    def read_command(self):
+        """Return the next command letter, None if the next token is a number,
+        i.e. an implicit repeat of the previous command, or '' at the end of
+        the path data.
+        """
+        self.skip_separators()
+        c = self.scanner.peek()
+        if c == -1 or c in self.ends:
+            return ''
+        if ZERO <= c <= NINE or c in (HYPHEN, PLUS, DOT):
+            return None
+        self.scanner.read()
+        return chr(c)
+
+    def read_digits(self):
+        """Consume a run of digits and return a (<value>, <num digits>)
+        tuple.
+        """
+        scanner = self.scanner
+        value = 0
+        num_digits = 0
+        while True:
+            c = scanner.peek()
+            if not ZERO <= c <= NINE:
+                return value, num_digits
+            value = value * 10 + c - ZERO
+            num_digits += 1
+            scanner.pos += 1
+
+    def read_number(self):
+        self.skip_separators()
+        scanner = self.scanner
+        sign = 1
+        c = scanner.peek()
+        if c in (HYPHEN, PLUS):
+            scanner.read()
+            if c == HYPHEN:
+                sign = -1
+        value, num_int_digits = self.read_digits()
+        num_frac_digits = 0
+        if scanner.peek() == DOT:
+            scanner.read()
+            frac, num_frac_digits = self.read_digits()
+            value += frac / 10 ** num_frac_digits
+        if not num_int_digits and not num_frac_digits:
+            raise InvalidSVG('expected a number at {}'.format(scanner.tell()))
+        if scanner.peek() in (LOWER_E, UPPER_E):
+            scanner.read()
+            exp_sign = 1
+            c = scanner.peek()
+            if c in (HYPHEN, PLUS):
+                scanner.read()
+                if c == HYPHEN:
+                    exp_sign = -1
+            exp, _ = self.read_digits()
+            value *= 10 ** (exp_sign * exp)
+        return sign * value
+
+    def read_point(self):
+        return self.read_number(), self.read_number()
+
+    def read_flag(self):
+        """Read an arc flag, which needn't be separated from what follows it.
+        """
+        self.skip_separators()
+        c = self.scanner.read()
+        if c not in (ZERO, ONE):
+            raise InvalidSVG('expected a flag at {}'.format(
+                self.scanner.tell()))
+        return c == ONE
+
+
+def parse_numbers(s):
+    """Return a list of the numbers in the string, e.g. an attribute value,
+    which may be separated by whitespace and/or commas.
+    """
+    parser = PathParser(StringScanner(s))
+    numbers = []
+    while parser.read_command() is None:
+        numbers.append(parser.read_number())
+    return numbers
+
+
+###############################################################################
+# Curve Flattening
+###############################################################################
+
+def flatten_quad(x0, y0, x1, y1, x2, y2, tolerance):
+    """Return a generator of the points, excluding the start point, of the
+    line segments that approximate the quadratic Bezier curve to within
+    tolerance, which are evaluated by forward differencing.
+    """
+    ax = x0 - 2 * x1 + x2
+    ay = y0 - 2 * y1 + y2
+    # The number of segments after which the error of the chords is bounded
+    # by tolerance, per Wang's formula.
+    n = max(ceil(sqrt(sqrt(ax * ax + ay * ay) / (4 * tolerance))), 1)
+    h = 1 / n
+    dx = ax * h * h + 2 * (x1 - x0) * h
+    dy = ay * h * h + 2 * (y1 - y0) * h
+    ddx = 2 * ax * h * h
+    ddy = 2 * ay * h * h
+    x = x0
+    y = y0
+    for _ in range(n - 1):
+        x += dx
+        y += dy
+        dx += ddx
+        dy += ddy
+        yield x, y
+    yield x2, y2
+
+
+def flatten_cubic(x0, y0, x1, y1, x2, y2, x3, y3, tolerance):
+    """Return a generator of the points, excluding the start point, of the
+    line segments that approximate the cubic Bezier curve to within
+    tolerance, which are evaluated by forward differencing.
+    """
+    ddx0 = x0 - 2 * x1 + x2
+    ddy0 = y0 - 2 * y1 + y2
+    ddx1 = x1 - 2 * x2 + x3
+    ddy1 = y1 - 2 * y2 + y3
+    dd = max(sqrt(ddx0 * ddx0 + ddy0 * ddy0), sqrt(ddx1 * ddx1 + ddy1 * ddy1))
+    # The number of segments after which the error of the chords is bounded
+    # by tolerance, per Wang's formula.
+    n = max(ceil(sqrt(3 * dd / (4 * tolerance))), 1)
+    h = 1 / n
+    # The coefficients of x(t) = ax*t^3 + bx*t^2 + cx*t + x0.
+    ax = x3 - x0 + 3 * (x1 - x2)
+    ay = y3 - y0 + 3 * (y1 - y2)
+    bx = 3 * ddx0
+    by = 3 * ddy0
+    cx = 3 * (x1 - x0)
+    cy = 3 * (y1 - y0)
+    h2 = h * h
+    h3 = h2 * h
+    dx = ax * h3 + bx * h2 + cx * h
+    dy = ay * h3 + by * h2 + cy * h
+    ddx = 6 * ax * h3 + 2 * bx * h2
+    ddy = 6 * ay * h3 + 2 * by * h2
+    dddx = 6 * ax * h3
+    dddy = 6 * ay * h3
+    x = x0
+    y = y0
+    for _ in range(n - 1):
+        x += dx
+        y += dy
+        dx += ddx
+        dy += ddy
+        ddx += dddx
+        ddy += dddy
+        yield x, y
+    yield x3, y3
+
+
+def flatten_arc(x0, y0, rx, ry, rotation, large_arc, sweep, x, y, tolerance):
+    """Return a generator of the points, excluding the start point, of the
+    line segments that approximate the elliptical arc to within tolerance.
+    The arguments are those of the SVG arc command, which are converted to a
+    center parameterization per:
+    https://www.w3.org/TR/SVG11/implnote.html#ArcImplementationNotes
+    """
+    rx = abs(rx)
+    ry = abs(ry)
+    if (x0 == x and y0 == y) or rx == 0 or ry == 0:
+        yield x, y
+        return
+    phi = radians(rotation)
+    cos_phi = cos(phi)
+    sin_phi = sin(phi)
+    hx = (x0 - x) / 2
+    hy = (y0 - y) / 2
+    x1 = cos_phi * hx + sin_phi * hy
+    y1 = -sin_phi * hx + cos_phi * hy
+    # Scale up radii that are too small to span the endpoints.
+    scale = (x1 * x1) / (rx * rx) + (y1 * y1) / (ry * ry)
+    if scale > 1:
+        scale = sqrt(scale)
+        rx *= scale
+        ry *= scale
+    rx2 = rx * rx
+    ry2 = ry * ry
+    den = rx2 * y1 * y1 + ry2 * x1 * x1
+    coef = sqrt(max(rx2 * ry2 - den, 0) / den)
+    if large_arc == sweep:
+        coef = -coef
+    cx1 = coef * rx * y1 / ry
+    cy1 = -coef * ry * x1 / rx
+    cx = cos_phi * cx1 - sin_phi * cy1 + (x0 + x) / 2
+    cy = sin_phi * cx1 + cos_phi * cy1 + (y0 + y) / 2
+    theta = atan2((y1 - cy1) / ry, (x1 - cx1) / rx)
+    delta = atan2((-y1 - cy1) / ry, (-x1 - cx1) / rx) - theta
+    if sweep and delta < 0:
+        delta += 2 * pi
+    elif not sweep and delta > 0:
+        delta -= 2 * pi
+    # The max angle of a chord whose distance from the arc is within
+    # tolerance.
+    r = max(rx, ry)
+    max_angle = 2 * acos(1 - tolerance / r) if tolerance < r else pi / 2
+    n = max(ceil(abs(delta) / max_angle), 1)
+    for i in range(1, n):
+        t = theta + delta * i / n
+        ex = rx * cos(t)
+        ey = ry * sin(t)
+        yield cos_phi * ex - sin_phi * ey + cx, sin_phi * ex + cos_phi * ey + cy
+    yield x, y
+
+
+###############################################################################
+# Path Interpretation
+###############################################################################
+
+def iter_path_strokes(parser, tolerance):
+    """Return a generator of a point generator for each subpath of the path
+    data, flattening curves to within tolerance.
+    Each point generator must be consumed before the next one is requested,
+    since they all read from the same parser.
+    """
+    state = PathState(parser, tolerance)
+    command = parser.read_command()
+    while command:
+        if command in 'Mm':
+            is_relative = command == 'm'
+            state.move(is_relative)
+            command = parser.read_command()
+            if command is None:
+                # Subsequent pairs of coordinates are implicit lineto
+                # commands.
+                command = 'l' if is_relative else 'L'
+        elif command is None:
+            raise InvalidSVG('path data must begin with a moveto command')
+        stroke = state.iter_subpath(command)
+        yield stroke
+        # Discard whatever the consumer didn't read.
+        for _ in stroke:
+            pass
+        command = state.next_command
+
+
+class PathState:
+    def __init__(self, parser, tolerance):
+        self.parser = parser
+        self.tolerance = tolerance
+        self.x = 0
+        self.y = 0
+        self.start_x = 0
+        self.start_y = 0
+        # The last control point of the previous command, if it was a curve,
+        # which is reflected by the smooth curve commands.
+        self.ctrl_x = None
+        self.ctrl_y = None
+        self.last_command = None
+        self.next_command = ''
+
+    def read_point(self, is_relative):
+        x, y = self.parser.read_point()
+        if is_relative:
+            return self.x + x, self.y + y
+        return x, y
+
+    def move(self, is_relative):
+        self.x, self.y = self.read_point(is_relative)
+        self.start_x = self.x
+        self.start_y = self.y
+        self.ctrl_x = None
+        self.last_command = 'M'
+
+    def get_reflected_ctrl(self, curve_commands):
+        if self.last_command in curve_commands and self.ctrl_x is not None:
+            return 2 * self.x - self.ctrl_x, 2 * self.y - self.ctrl_y
+        return self.x, self.y
+
+    def iter_subpath(self, command):
+        """Return a generator of the points of the subpath that begins at the
+        current point and continues until the next moveto command or the end
+        of the path data, which is saved as next_command.
+        """
+        parser = self.parser
+        tolerance = self.tolerance
+        yield self.x, self.y
+        while True:
+            if command in ('', 'M', 'm'):
+                self.next_command = command
+                return
+            upper = command.upper()
+            is_relative = command != upper
+            x0 = self.x
+            y0 = self.y
+            ctrl_x = None
+            ctrl_y = None
+            if upper == 'L':
+                x, y = self.read_point(is_relative)
+                yield x, y
+            elif upper == 'H':
+                x = parser.read_number() + (x0 if is_relative else 0)
+                y = y0
+                yield x, y
+            elif upper == 'V':
+                x = x0
+                y = parser.read_number() + (y0 if is_relative else 0)
+                yield x, y
+            elif upper in 'CS':
+                if upper == 'C':
+                    x1, y1 = self.read_point(is_relative)
+                else:
+                    x1, y1 = self.get_reflected_ctrl('CS')
+                ctrl_x, ctrl_y = self.read_point(is_relative)
+                x, y = self.read_point(is_relative)
+                yield from flatten_cubic(x0, y0, x1, y1, ctrl_x, ctrl_y, x,
+                                         y, tolerance)
+            elif upper in 'QT':
+                if upper == 'Q':
+                    ctrl_x, ctrl_y = self.read_point(is_relative)
+                else:
+                    ctrl_x, ctrl_y = self.get_reflected_ctrl('QT')
+                x, y = self.read_point(is_relative)
+                yield from flatten_quad(x0, y0, ctrl_x, ctrl_y, x, y,
+                                        tolerance)
+            elif upper == 'A':
+                rx = parser.read_number()
+                ry = parser.read_number()
+                rotation = parser.read_number()
+                large_arc = parser.read_flag()
+                sweep = parser.read_flag()
+                x, y = self.read_point(is_relative)
+                yield from flatten_arc(x0, y0, rx, ry, rotation, large_arc,
+                                       sweep, x, y, tolerance)
+            elif upper == 'Z':
+                x = self.start_x
+                y = self.start_y
+                yield x, y
+            else:
+                raise InvalidSVG('unsupported path command: {}'.format(
+                    command))
+            self.x = x
+            self.y = y
+            self.ctrl_x = ctrl_x
+            self.ctrl_y = ctrl_y
+            self.last_command = upper
+
+            next_command = parser.read_command()
+            if next_command is not None:
+                command = next_command
+            elif upper == 'Z':
+                raise InvalidSVG('unexpected number after closepath')
+
+
+###############################################################################
+# Transforms
+###############################################################################
+
+def get_transform_matrix(name, args):
+    """Return the matrix of an SVG transform function.
+    """
+    num_args = len(args)
+    if name == 'matrix' and num_args == 6:
+        return tuple(args)
+    if name == 'translate' and num_args in (1, 2):
+        return (1, 0, 0, 1, args[0], args[1] if num_args == 2 else 0)
+    if name == 'scale' and num_args in (1, 2):
+        return (args[0], 0, 0, args[-1], 0, 0)
+    if name == 'rotate' and num_args in (1, 3):
+        angle = radians(args[0])
+        cos_a = cos(angle)
+        sin_a = sin(angle)
+        matrix = (cos_a, sin_a, -sin_a, cos_a, 0, 0)
+        if num_args == 3:
+            # Rotate about (cx, cy).
+            cx, cy = args[1:]
+            matrix = multiply((1, 0, 0, 1, cx, cy),
+                              multiply(matrix, (1, 0, 0, 1, -cx, -cy)))
+        return matrix
+    if name == 'skewX' and num_args == 1:
+        return (1, 0, tan(radians(args[0])), 1, 0, 0)
+    if name == 'skewY' and num_args == 1:
+        return (1, tan(radians(args[0])), 0, 1, 0, 0)
+    raise InvalidSVG('invalid transform: {}({})'.format(
+        name, ', '.join(str(arg) for arg in args)))
+
+
+def parse_transform(transform):
+    """Return the matrix of a transform attribute value, which is a list of
+    transform functions that are applied from right to left.
+    """
+    matrix = IDENTITY
+    start = 0
+    while True:
+        open_paren = transform.find('(', start)
+        if open_paren == -1:
+            return matrix
+        close_paren = transform.find(')', open_paren)
+        if close_paren == -1:
+            raise InvalidSVG('invalid transform: {}'.format(transform))
+        name = transform[start:open_paren].strip(' \t\r\n,')
+        args = parse_numbers(transform[open_paren + 1:close_paren])
+        matrix = multiply(matrix, get_transform_matrix(name, args))
+        start = close_paren + 1
+
+
+def get_align_offset(align, slack):
+    """Return the offset at which to place the viewBox along an axis for the
+    'Min', 'Mid' or 'Max' alignment value, given the difference between the
+    extents of the viewport and the scaled viewBox.
+    """
+    if align == 'Mid':
+        return slack / 2
+    if align == 'Max':
+        return slack
+    return 0
+
+
+def get_viewport_matrix(attrs, width, height):
+    """Return the matrix that maps the user coordinates of an <svg> element
+    with the specified attributes onto a width x height viewport, by fitting
+    its viewBox, or else its width and height, as specified by its
+    preserveAspectRatio, which defaults to uniformly scaling the viewBox to
+    fit and centering it.
+    If it has neither a viewBox nor a width and height, return the identity.
+    """
+    view_box = parse_numbers(attrs.get('viewBox', ''))
+    if len(view_box) == 4:
+        min_x, min_y, vb_width, vb_height = view_box
+    else:
+        # Assume that the width and height are in user units, disregarding any
+        # unit identifiers.
+        vb_width = parse_numbers(attrs.get('width', ''))
+        vb_height = parse_numbers(attrs.get('height', ''))
+        if not vb_width or not vb_height:
+            return IDENTITY
+        min_x = min_y = 0
+        vb_width = vb_width[0]
+        vb_height = vb_height[0]
+    if vb_width <= 0 or vb_height <= 0:
+        return IDENTITY
+
+    scale_x = width / vb_width
+    scale_y = height / vb_height
+    align, _, meet_or_slice = attrs.get(
+        'preserveAspectRatio', 'xMidYMid meet').strip().partition(' ')
+    offset_x = offset_y = 0
+    if align != 'none':
+        if meet_or_slice.strip() == 'slice':
+            scale_x = scale_y = max(scale_x, scale_y)
+        else:
+            scale_x = scale_y = min(scale_x, scale_y)
+        # Align the viewBox within the viewport, e.g. 'xMidYMax'.
+        offset_x = get_align_offset(align[1:4], width - vb_width * scale_x)
+        offset_y = get_align_offset(align[5:8], height - vb_height * scale_y)
+    return (scale_x, 0, 0, scale_y, offset_x - min_x * scale_x,
+            offset_y - min_y * scale_y)
+
+
+###############################################################################
+# Documents
+###############################################################################
+
+def get_presentation_attr(attrs, name):
+    """Return the value of a presentation attribute, e.g. 'fill', from either
+    the element's style attribute, which takes precedence, or the attribute of
+    the same name, or None if it's specified by neither.
+    """
+    for declaration in attrs.get('style', '').split(';'):
+        k, _, v = declaration.partition(':')
+        if k.strip() == name:
+            return v.strip()
+    return attrs.get(name)
+
+
+def iter_paths(scanner, get_root_matrix):
+    """Return a generator of a (<matrix>, <fill rule>, <PathParser>) tuple for
+    each path in the document, where matrix is the cumulative transform of the
+    path and all of its ancestors, composed with the matrix that
+    get_root_matrix returns for the attributes of the root <svg> element, fill
+    rule is the path's inherited 'fill-rule', either 'nonzero' or 'evenodd',
+    or None if its inherited 'fill' is 'none', and the parser reads the path's
+    data.
+    Each parser must be consumed before the next tuple is requested.
+    """
+    # Each entry is a (<matrix>, <fill>, <fill rule>) tuple.
+    stack = []
+    for tag, attrs in iter_elements(scanner):
+        if attrs is None:
+            if stack:
+                stack.pop()
+            continue
+        if stack:
+            matrix, fill, fill_rule = stack[-1]
+        else:
+            # SVG fills shapes with black by default.
+            matrix, fill, fill_rule = get_root_matrix(attrs), 'black', NONZERO
+        transform = attrs.get('transform')
+        if transform:
+            matrix = multiply(matrix, parse_transform(transform))
+        fill = get_presentation_attr(attrs, 'fill') or fill
+        fill_rule = get_presentation_attr(attrs, 'fill-rule') or fill_rule
+        stack.append((matrix, fill, fill_rule))
+        if tag == 'path' and 'd' in attrs:
+            # Read the path data from where it begins, then return to the end
+            # of the tag.
+            tag_end = scanner.tell()
+            scanner.seek(attrs['d'])
+            if fill == 'none':
+                fill_rule = None
+            yield matrix, fill_rule, PathParser(scanner)
+            scanner.seek(tag_end)
@@ -0,0 +1,213 @@
+"""Point Transform Pipeline
+
+A Pipeline is a chain of stages, each of which lazily maps an iterable of
+(<x>, <y>) points to a generator of new ones, so that any number of stages can
+be applied to a path with a constant amount of memory:
+
+  pipeline = (Pipeline().scale(2).translate(10, 0).flip_y(680)
+              .clip(0, 0, 880, 680).floor())
+  points = pipeline.apply(points)
+
+Affine stages, i.e. scale(), translate(), flip_y() and transform(), are fused
+into a single matrix as they're added, so that a point is only multiplied once
+regardless of how many of them there are.
+
+A matrix is a (<a>, <b>, <c>, <d>, <e>, <f>) tuple, like the arguments to the
+SVG matrix() transform, that maps (x, y) to (a*x + c*y + e, b*x + d*y + f).
+
+"""
+
+from math import (
+    floor,
+    sqrt,
+)
+
+
+IDENTITY = (1, 0, 0, 1, 0, 0)
+
+
+def multiply(m1, m2):
+    """Return the matrix that applies m2 and then m1.
+    """
+    a1, b1, c1, d1, e1, f1 = m1
+    a2, b2, c2, d2, e2, f2 = m2
+    return (
+        a1 * a2 + c1 * b2,
+        b1 * a2 + d1 * b2,
+        a1 * c2 + c1 * d2,
+        b1 * c2 + d1 * d2,
+        a1 * e2 + c1 * f2 + e1,
+        b1 * e2 + d1 * f2 + f1,
+    )
+
+
+def get_max_scale(matrix):
+    """Return the largest factor by which the matrix scales a distance, i.e.
+    its largest singular value.
+    """
+    a, b, c, d, _, _ = matrix
+    s = a * a + b * b + c * c + d * d
+    det = a * d - b * c
+    return sqrt((s + sqrt(max(s * s - 4 * det * det, 0))) / 2)
+
+
+class Affine:
+    def __init__(self, matrix):
+        self.matrix = matrix
+
+    def apply(self, points, resume=False):
+        a, b, c, d, e, f = self.matrix
+        if b == 0 and c == 0:
+            # Skip the terms that are always zero for a scale and/or
+            # translation.
+            for x, y in points:
+                yield a * x + e, d * y + f
+        else:
+            for x, y in points:
+                yield a * x + c * y + e, b * x + d * y + f
+
+
+class Floor:
+    # The amount by which a coordinate may fall short of a whole number due to
+    # floating-point error and still be rounded up to it.
+    EPSILON = 1e-6
+
+    def apply(self, points, resume=False):
+        epsilon = self.EPSILON
+        for x, y in points:
+            yield floor(x + epsilon), floor(y + epsilon)
+
+
+class Clip:
+    # The distance outside of the rectangle within which a point is deemed to
+    # be on its edge, so that floating-point error in the preceding stages
+    # doesn't clip points that are meant to be exactly on it.
+    EPSILON = 1e-6
+
+    def __init__(self, x_min, y_min, x_max, y_max):
+        """Clip the segments between consecutive points to the rectangle,
+        replacing each part of the path that leaves it with a straight line
+        between the points at which it exits and re-enters, which is also
+        within the rectangle.
+        """
+        self.bounds = (x_min, y_min, x_max, y_max)
+        epsilon = self.EPSILON
+        self.outer_bounds = (x_min - epsilon, y_min - epsilon,
+                             x_max + epsilon, y_max + epsilon)
+        self.last_point = None
+
+    def contains(self, x, y):
+        x_min, y_min, x_max, y_max = self.outer_bounds
+        return x_min <= x <= x_max and y_min <= y <= y_max
+
+    def clamp(self, x, y):
+        """Return the point moved onto the rectangle, which it's only ever
+        outside of by floating-point error.
+        """
+        x_min, y_min, x_max, y_max = self.bounds
+        return min(max(x, x_min), x_max), min(max(y, y_min), y_max)
+
+    def clip_segment(self, x0, y0, x1, y1):
+        """Return the (<t0>, <t1>) parameters of the part of the segment that's
+        within the rectangle, or None if none of it is, using the
+        Liang-Barsky algorithm.
+        """
+        x_min, y_min, x_max, y_max = self.outer_bounds
+        dx = x1 - x0
+        dy = y1 - y0
+        t0 = 0
+        t1 = 1
+        for p, q in ((-dx, x0 - x_min), (dx, x_max - x0),
+                     (-dy, y0 - y_min), (dy, y_max - y0)):
+            if p == 0:
+                if q < 0:
+                    return None
+                continue
+            t = q / p
+            if p < 0:
+                if t > t1:
+                    return None
+                if t > t0:
+                    t0 = t
+            else:
+                if t < t0:
+                    return None
+                if t < t1:
+                    t1 = t
+        return t0, t1
+
+    def apply(self, points, resume=False):
+        if not resume:
+            self.last_point = None
+        x_min, y_min, x_max, y_max = self.bounds
+        for point in points:
+            last_point = self.last_point
+            self.last_point = point
+            x1, y1 = point
+            if self.contains(x1, y1) and (last_point is None
+                                          or self.contains(*last_point)):
+                if x_min <= x1 <= x_max and y_min <= y1 <= y_max:
+                    yield point
+                else:
+                    yield self.clamp(x1, y1)
+                continue
+            if last_point is None:
+                continue
+            x0, y0 = last_point
+            ts = self.clip_segment(x0, y0, x1, y1)
+            if ts is None:
+                continue
+            t0, t1 = ts
+            dx = x1 - x0
+            dy = y1 - y0
+            if t0 > 0:
+                # Re-enter the rectangle.
+                yield self.clamp(x0 + t0 * dx, y0 + t0 * dy)
+            yield self.clamp(x0 + t1 * dx, y0 + t1 * dy)
+
+
+class Pipeline:
+    def __init__(self):
+        self.stages = []
+
+    def add(self, stage):
+        self.stages.append(stage)
+        return self
+
+    def transform(self, matrix):
+        """Add a stage that applies the matrix, fusing it with the preceding
+        stage if that's also an affine one.
+        """
+        stages = self.stages
+        if stages and isinstance(stages[-1], Affine):
+            stages[-1] = Affine(multiply(matrix, stages[-1].matrix))
+            return self
+        return self.add(Affine(matrix))
+
+    def translate(self, x, y):
+        return self.transform((1, 0, 0, 1, x, y))
+
+    def scale(self, x, y=None):
+        return self.transform((x, 0, 0, x if y is None else y, 0, 0))
+
+    def flip_y(self, height):
+        """Add a stage that inverts the y axis within the height, e.g. to
+        move the origin from the top left to the bottom left.
+        """
+        return self.transform((1, 0, 0, -1, 0, height))
+
+    def floor(self):
+        return self.add(Floor())
+
+    def clip(self, x_min, y_min, x_max, y_max):
+        return self.add(Clip(x_min, y_min, x_max, y_max))
+
+    def apply(self, points, resume=False):
+        """Return a generator of the points with each stage applied.
+        The points are treated as a new path unless resume is True, in which
+        case they continue the path of the previous call, e.g. so that points
+        that arrive one at a time are clipped as a single path.
+        """
+        for stage in self.stages:
+            points = stage.apply(points, resume)
+        return points
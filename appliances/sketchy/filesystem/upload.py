@@ -0,0 +1,47 @@
+"""Streaming File Upload
+
+receive_file() copies a request body of known length to a file a chunk at a
+time through a caller-supplied bytearray, updating a CRC-32 of the data as it
+goes, so that a file of any size is received in constant memory and can be
+verified against the checksum that the sender computed, e.g. with Python's
+zlib.crc32().
+
+"""
+
+from binascii import crc32
+
+
+class IncompleteUpload(Exception): pass
+
+
+def receive_file(stream, fh, size, buf):
+    """Read size bytes from the stream, i.e. a request connection, into buf,
+    write each chunk to the open binary file, and return the CRC-32 of the
+    data. Raise IncompleteUpload if the stream ends early.
+    """
+    mv = memoryview(buf)
+    buf_size = len(buf)
+    checksum = 0
+    num_remaining = size
+    while num_remaining:
+        chunk = mv if num_remaining >= buf_size else mv[:num_remaining]
+        num_read = stream.readinto(chunk)
+        if not num_read:
+            raise IncompleteUpload('Received {} of {} bytes'.format(
+                size - num_remaining, size))
+        if num_read < len(chunk):
+            chunk = chunk[:num_read]
+        fh.write(chunk)
+        checksum = crc32(chunk, checksum)
+        num_remaining -= num_read
+    return checksum
+
+
+def parse_checksum(s):
+    """Return the value of a hex-encoded CRC-32.
+    """
+    return int(s, 16) & 0xffffffff
+
+
+def format_checksum(checksum):
+    return '{:08x}'.format(checksum & 0xffffffff)
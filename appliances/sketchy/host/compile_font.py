@@ -0,0 +1,118 @@
+"""Compile a font module of ASCII art character definitions into a packed font
+module for fonts.glyphs.PackedGlyphStore.
+
+Parsing the character definitions in e.g. fonts/default.py on the device
+means holding all of their multi-line strings and revisit maps in the heap. The
+packed module instead holds only the resulting path coordinates, one byte per
+coordinate, in a single bytes object, plus a bytes index of where each glyph
+starts and ends, which costs next to no heap when the module is frozen into the
+firmware:
+
+  python compile_font.py default
+
+writes filesystem/fonts/default_packed.py, which must be regenerated whenever
+the font module changes.
+
+"""
+
+import argparse
+import importlib
+import os
+import struct
+import sys
+
+
+HOST_DIR = os.path.dirname(os.path.abspath(__file__))
+FILESYSTEM_DIR = os.path.join(os.path.dirname(HOST_DIR), 'filesystem')
+FONTS_DIR = os.path.join(FILESYSTEM_DIR, 'fonts')
+sys.path.insert(0, FILESYSTEM_DIR)
+
+from fonts import char_def_to_points
+
+
+# The number of bytes per line of the generated bytes literals.
+BYTES_PER_LINE = 16
+
+MODULE_TEMPLATE = '''"""Packed glyphs of fonts/{name}.py
+
+Generated by host/compile_font.py. Do not edit.
+
+"""
+
+# The chars in the order of their glyphs.
+CHARS = {chars!r}
+
+# The '<H' start offset of each glyph in DATA, followed by the end offset of
+# the last one.
+OFFSETS = {offsets}
+
+# The height, in grid units, of each glyph.
+HEIGHTS = {heights}
+
+# The flat [x0, y0, x1, y1, ...] path coordinates of each glyph.
+DATA = {data}
+'''
+
+
+def format_bytes(b):
+    """Return the source of a bytes literal, wrapped over multiple lines if
+    necessary.
+    """
+    if len(b) <= BYTES_PER_LINE:
+        return repr(b)
+    lines = [repr(b[i:i + BYTES_PER_LINE])
+             for i in range(0, len(b), BYTES_PER_LINE)]
+    return '(\n    {}\n)'.format('\n    '.join(lines))
+
+
+def compile_font(name):
+    """Return the source of the packed font module for the font module with
+    the specified name.
+    """
+    chars = importlib.import_module('fonts.{}'.format(name)).CHARS
+    offsets = bytearray()
+    heights = bytearray()
+    data = bytearray()
+    for char, char_def in chars.items():
+        coords = [coord for point in char_def_to_points(char_def)
+                  for coord in point]
+        if not coords:
+            raise ValueError('char {!r} has no path'.format(char))
+        if max(coords) > 0xff:
+            raise ValueError(
+                'char {!r} is too large to pack into bytes'.format(char))
+        offsets.extend(struct.pack('<H', len(data)))
+        heights.append(max(coords[1::2]) + 1)
+        data.extend(coords)
+    offsets.extend(struct.pack('<H', len(data)))
+    if len(data) > 0xffff:
+        raise ValueError('font is too large to index with 16-bit offsets')
+    return MODULE_TEMPLATE.format(
+        name=name,
+        chars=''.join(chars),
+        offsets=format_bytes(bytes(offsets)),
+        heights=format_bytes(bytes(heights)),
+        data=format_bytes(bytes(data)),
+    )
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description='Compile a font module into a packed font module.')
+    parser.add_argument('name',
+                        help='the name of the font module in fonts/, e.g. '
+                             'default')
+    parser.add_argument('-o', '--output',
+                        help='the module to write, by default '
+                             'fonts/<name>_packed.py')
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parse_args(sys.argv[1:])
+    source = compile_font(args.name)
+    output = args.output or os.path.join(
+        FONTS_DIR, '{}_packed.py'.format(args.name))
+    with open(output, 'w') as fh:
+        fh.write(source)
+    print('Wrote {}'.format(output))
@@ -0,0 +1,296 @@
+"""Compile text and SVG files into Sketchy plot files on the host.
+
+This does the parsing, layout, route planning and simplification that the
+firmware would otherwise do on the ESP32, and writes the result as a plot file
+(see filesystem/paths/plotfile.py) that the device can replay from the SD card
+via /plot_file or receive directly via a POST to /plot, without any parsing:
+
+  python compile_plot.py text 'SKETCHY FOR LIFE' --y-offset 300 -o out.skp
+  python compile_plot.py svg drawing.svg --fit --optimize-route -o out.skp
+  curl --data-binary @out.skp http://192.168.4.1/plot
+
+Text is laid out with the same font definitions and rules as draw_text(), and
+SVG files are parsed with the same parser as render_svg(), and, with --fill,
+their filled shapes are hatched as by /demo_svg?fill=true. The drawable area
+and the defaults are read from filesystem/config.json. Requires NumPy.
+
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+
+HOST_DIR = os.path.dirname(os.path.abspath(__file__))
+FILESYSTEM_DIR = os.path.join(os.path.dirname(HOST_DIR), 'filesystem')
+sys.path.insert(0, FILESYSTEM_DIR)
+
+from fonts.default import CHARS
+from fonts.glyphs import GlyphStore
+from fonts.layout import (
+    ALIGNMENTS,
+    ALIGN_LEFT,
+    TextLayout,
+    placements_to_strokes,
+)
+from paths import chain_strokes
+from paths.hatch import fill_shape
+from paths.plotfile import encode_header
+from paths.route import plan_route
+from paths.simplify import Simplifier
+from paths.svg import (
+    Scanner,
+    get_viewport_matrix,
+    iter_path_strokes,
+    iter_paths,
+)
+from paths.transform import (
+    IDENTITY,
+    Pipeline,
+    get_max_scale,
+)
+
+
+# Use the same drawable area and defaults as the device.
+with open(os.path.join(FILESYSTEM_DIR, 'config.json'), 'rb') as fh:
+    CONFIG = json.load(fh)
+X_AXIS_MAX = CONFIG['X_AXIS_MAX']
+Y_AXIS_MAX = CONFIG['Y_AXIS_MAX']
+PATH_SIMPLIFY_TOLERANCE = CONFIG['PATH_SIMPLIFY_TOLERANCE_STEPS']
+SVG_CURVE_TOLERANCE = CONFIG['SVG_CURVE_TOLERANCE_STEPS']
+SVG_HATCH_SPACING = CONFIG['SVG_HATCH_SPACING_STEPS']
+SVG_HATCH_ANGLE = CONFIG['SVG_HATCH_ANGLE_DEGREES']
+
+
+###############################################################################
+# Stroke Sources
+###############################################################################
+
+def text_to_strokes(text, char_height, char_spacing, word_spacing, x_offset,
+                    y_offset, width=None, align=ALIGN_LEFT, line_spacing=None):
+    """Return a list of (N, 2) arrays of the points of each glyph, laid out as
+    by main.text_to_strokes().
+    """
+    if width is None:
+        width = X_AXIS_MAX - x_offset
+    layout = TextLayout(GlyphStore.from_char_defs(CHARS), char_height,
+                        char_spacing, word_spacing, line_spacing)
+    placements = layout.layout(text, x_offset, y_offset, width, align)
+    return [np.array(stroke, dtype=float)
+            for stroke in placements_to_strokes(placements)]
+
+
+def svg_to_paths(fh, curve_tolerance, fit_viewport):
+    """Return a list of (<fill rule>, <strokes>) tuples of each path in the SVG
+    file, parsed as by main.svg_to_strokes(), where fill rule is None if the
+    path isn't filled and strokes is a list of (N, 2) arrays of the points of
+    each of its subpaths, either fit to the drawable area by its viewBox, as
+    on the device, if fit_viewport is True, or else in the user coordinates of
+    its root element.
+    """
+    if fit_viewport:
+        get_root_matrix = lambda attrs: get_viewport_matrix(
+            attrs, X_AXIS_MAX, Y_AXIS_MAX)
+    else:
+        get_root_matrix = lambda attrs: IDENTITY
+    scanner = Scanner(fh, bytearray(4096))
+    paths = []
+    for matrix, fill_rule, parser in iter_paths(scanner, get_root_matrix):
+        a, b, c, d, e, f = matrix
+        linear = np.array(((a, b), (c, d)))
+        tolerance = curve_tolerance / (get_max_scale(matrix) or 1)
+        strokes = [np.array(list(stroke), dtype=float) @ linear + (e, f)
+                   for stroke in iter_path_strokes(parser, tolerance)]
+        paths.append((fill_rule, strokes))
+    return paths
+
+
+###############################################################################
+# Point Processing
+###############################################################################
+
+def fit_scale(strokes):
+    """Return the largest scale at which the strokes fit in the drawable area.
+    """
+    points = np.concatenate(strokes)
+    extent = points.max(axis=0) - np.minimum(points.min(axis=0), 0)
+    with np.errstate(divide='ignore'):
+        scales = np.array((X_AXIS_MAX, Y_AXIS_MAX)) / extent
+    return float(np.min(scales[np.isfinite(scales)], initial=1))
+
+
+def transform(strokes, scale, offset, invert_y):
+    """Return the strokes scaled, offset and, if invert_y is True, flipped
+    from SVG's downward y axis, all in one batch.
+    """
+    lengths = [len(stroke) for stroke in strokes]
+    points = np.concatenate(strokes) * scale + offset
+    if invert_y:
+        points[:, 1] = Y_AXIS_MAX - points[:, 1]
+    return np.split(points, np.cumsum(lengths)[:-1])
+
+
+def hatch(strokes, fill_rule, spacing, angle):
+    """Return a list of (N, 2) arrays of the points that outline and hatch the
+    shape whose subpaths are strokes, as by main.svg_to_strokes().
+    """
+    polygons = [[tuple(point) for point in stroke.tolist()]
+                for stroke in strokes]
+    return [np.array(stroke, dtype=float).reshape(-1, 2)
+            for stroke in fill_shape(polygons, spacing, angle, fill_rule)]
+
+
+def clip(points):
+    """Return the points clipped to the drawable area and floored to whole
+    steps by the same pipeline stages as main.svg_to_strokes(), which clip the
+    segments between the points rather than the points themselves, along with
+    the number of points that were out of bounds.
+    """
+    pipeline = Pipeline().clip(0, 0, X_AXIS_MAX, Y_AXIS_MAX).floor()
+    clip_stage = pipeline.stages[0]
+    num_clipped = sum(1 for x, y in points.tolist()
+                      if not clip_stage.contains(x, y))
+    clipped = np.array(list(pipeline.apply(points.tolist())), dtype=np.int16)
+    return clipped.reshape(-1, 2), num_clipped
+
+
+def encode(points):
+    """Return the plot file bytes for an (N, 2) int16 array of points.
+    """
+    deltas = np.diff(points, axis=0, prepend=np.zeros((1, 2), np.int16))
+    # Records are little-endian (<x delta>, <y delta>) int16 pairs.
+    return encode_header() + deltas.astype('<i2').tobytes()
+
+
+###############################################################################
+# CLI
+###############################################################################
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description='Compile text or an SVG file into a Sketchy plot file.')
+    parser.add_argument('-o', '--output', required=True,
+                        help='the plot file to write')
+    parser.add_argument('--optimize-route', action='store_true',
+                        help='plan a route that minimizes extra lines')
+    parser.add_argument('--simplify-tolerance', type=float,
+                        default=PATH_SIMPLIFY_TOLERANCE,
+                        help='the max distance, in steps, by which '
+                             'simplification may move the path')
+    parser.add_argument('--start', type=int, nargs=2, default=(0, 0),
+                        metavar=('X', 'Y'),
+                        help='the position from which the job will start')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    text_parser = subparsers.add_parser('text', help='compile text')
+    text_parser.add_argument('text')
+    text_parser.add_argument('--char-height', type=float, default=64)
+    text_parser.add_argument('--char-spacing', type=int)
+    text_parser.add_argument('--word-spacing', type=int)
+    text_parser.add_argument('--x-offset', type=int, default=0)
+    text_parser.add_argument('--y-offset', type=int, default=0)
+    text_parser.add_argument('--width', type=int,
+                             help='the width within which to wrap and align '
+                                  'lines, by default the rest of the '
+                                  'drawable area')
+    text_parser.add_argument('--align', choices=ALIGNMENTS,
+                             default=ALIGN_LEFT)
+    text_parser.add_argument('--line-spacing', type=int)
+
+    svg_parser = subparsers.add_parser('svg', help='compile an SVG file')
+    svg_parser.add_argument('filename')
+    svg_parser.add_argument('--scale', type=float,
+                            help='scale the user coordinates of the root '
+                                 'element instead of fitting its viewBox to '
+                                 'the drawable area, as the device does')
+    svg_parser.add_argument('--fit', action='store_true',
+                            help='scale to fit the extent of the paths to the '
+                                 'drawable area, overriding --scale')
+    svg_parser.add_argument('--x-offset', type=float, default=0)
+    svg_parser.add_argument('--y-offset', type=float, default=0)
+    svg_parser.add_argument('--curve-tolerance', type=float,
+                            default=SVG_CURVE_TOLERANCE,
+                            help='the max distance by which the lines that '
+                                 'approximate curves may deviate from them, '
+                                 'in steps or, with --scale or --fit, in the '
+                                 'user units of the root element')
+    svg_parser.add_argument('--fill', action='store_true',
+                            help='hatch the filled shapes')
+    svg_parser.add_argument('--hatch-spacing', type=float,
+                            default=SVG_HATCH_SPACING,
+                            help='the distance between the hatch lines, in '
+                                 'steps')
+    svg_parser.add_argument('--hatch-angle', type=float,
+                            default=SVG_HATCH_ANGLE,
+                            help='the angle of the hatch lines, in degrees '
+                                 'counterclockwise from the x axis')
+
+    return parser.parse_args(argv)
+
+
+def compile_plot(args):
+    """Return a (<plot file bytes>, <summary dict>) tuple.
+    """
+    if args.command == 'text':
+        strokes = text_to_strokes(args.text, args.char_height,
+                                  args.char_spacing, args.word_spacing,
+                                  args.x_offset, args.y_offset, args.width,
+                                  args.align, args.line_spacing)
+    else:
+        fit_viewport = not args.fit and args.scale is None
+        with open(args.filename, 'rb') as fh:
+            paths = svg_to_paths(fh, args.curve_tolerance, fit_viewport)
+        strokes = [stroke for _, path_strokes in paths
+                   for stroke in path_strokes]
+        if args.fit:
+            scale = fit_scale(strokes)
+        else:
+            scale = 1 if fit_viewport else args.scale
+        strokes = transform(strokes, scale, (args.x_offset, args.y_offset),
+                            invert_y=True)
+        if args.fill:
+            # Regroup the transformed strokes by path to hatch the filled
+            # ones.
+            strokes = iter(strokes)
+            filled_strokes = []
+            for fill_rule, path_strokes in paths:
+                path_strokes = [next(strokes) for _ in path_strokes]
+                if fill_rule is None:
+                    filled_strokes.extend(path_strokes)
+                else:
+                    filled_strokes.extend(hatch(path_strokes, fill_rule,
+                                                args.hatch_spacing,
+                                                args.hatch_angle))
+            strokes = filled_strokes
+    num_clipped = 0
+    clipped_strokes = []
+    for stroke in strokes:
+        stroke, num_stroke_clipped = clip(stroke)
+        clipped_strokes.append(stroke)
+        num_clipped += num_stroke_clipped
+
+    # Route planning needs hashable points.
+    strokes = [[tuple(point) for point in stroke.tolist()]
+               for stroke in clipped_strokes]
+    if args.optimize_route:
+        points = plan_route(strokes, tuple(args.start), None, None)
+    else:
+        points = chain_strokes(strokes)
+
+    simplifier = Simplifier(args.simplify_tolerance)
+    points = np.array(list(simplifier.simplify(points)),
+                      dtype=np.int16).reshape(-1, 2)
+    summary = dict(simplifier.get_summary(), num_points=len(points),
+                   num_clipped_points=num_clipped)
+    return encode(points), summary
+
+
+if __name__ == '__main__':
+    args = parse_args(sys.argv[1:])
+    data, summary = compile_plot(args)
+    with open(args.output, 'wb') as fh:
+        fh.write(data)
+    print('Wrote {} bytes to {}: {}'.format(len(data), args.output, summary))
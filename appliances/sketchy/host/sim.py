@@ -0,0 +1,217 @@
+"""Run the Sketchy firmware under CPython against virtual hardware.
+
+The stand-in MicroPython modules in upy/ record a timestamped trace of the
+stepper pins and use virtual time instead of sleeping, so a job runs as fast as
+the host allows while reporting how long it would take on the device.
+
+Usage:
+
+  python sim.py text 'SKETCHY FOR LIFE' --char-height 64 --y-offset 300
+  python sim.py svg drawing.svg
+  python sim.py points points.json
+  python sim.py plot drawing.skp
+
+Each command prints a JSON summary of the simulated plot time and step counts.
+Before the command, specify --set KEY=VALUE to override a config value,
+--trace FILE to write the pin trace as CSV, and --max-seconds to exit with an
+error if the simulated plot time is exceeded, e.g. to catch performance
+regressions in CI:
+
+  python sim.py --set MOTION_STEP_EXECUTOR=timer --max-seconds 10 text HELLO
+
+The femtoweb submodule must be checked out since main.py imports it.
+
+"""
+
+import argparse
+import importlib
+import json
+import os
+import sys
+
+
+HOST_DIR = os.path.dirname(os.path.abspath(__file__))
+UPY_DIR = os.path.join(HOST_DIR, 'upy')
+FILESYSTEM_DIR = os.path.join(os.path.dirname(HOST_DIR), 'filesystem')
+
+# MicroPython modules whose CPython counterparts can stand in for them.
+U_MODULE_ALIASES = (
+    ('ubinascii', 'binascii'),
+    ('ucollections', 'collections'),
+    ('uerrno', 'errno'),
+    ('uhashlib', 'hashlib'),
+    ('uio', 'io'),
+    ('ujson', 'json'),
+    ('uos', 'os'),
+    ('ure', 're'),
+    ('uselect', 'select'),
+    ('usocket', 'socket'),
+    ('ustruct', 'struct'),
+)
+
+
+def install():
+    """Make the stand-in modules and the device filesystem importable and
+    change to the device root directory, where config.py expects to find
+    config.json.
+    """
+    for path in (FILESYSTEM_DIR, UPY_DIR):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    for u_name, name in U_MODULE_ALIASES:
+        if u_name not in sys.modules:
+            sys.modules[u_name] = importlib.import_module(name)
+    os.chdir(FILESYSTEM_DIR)
+
+
+def load_main(config_overrides=None):
+    """Install the simulation, apply any config overrides, and return the
+    imported main module.
+    """
+    install()
+    import config
+    for k, v in (config_overrides or {}).items():
+        # Let it fail if the key isn't set, just like config.get().
+        config.get(k)
+        config._config[k] = v
+    import main
+    return main
+
+
+def wait_for_motion(main):
+    """Wait for any background step executor to finish.
+    """
+    if main.step_engine is not None:
+        main.step_engine.wait()
+
+
+def get_summary(main, start_us):
+    """Return a dict that summarizes the trace since start_us.
+    """
+    import machine
+    import utime
+    pin_axis_map = {
+        main.STEPPER_X_STEP_PIN_NUM: 'x',
+        main.STEPPER_Y_STEP_PIN_NUM: 'y',
+    }
+    dir_pin_axis_map = {
+        main.STEPPER_X_DIR_PIN_NUM: 'x',
+        main.STEPPER_Y_DIR_PIN_NUM: 'y',
+    }
+    steps = {'x': 0, 'y': 0}
+    dir_changes = {'x': 0, 'y': 0}
+    for ts, pin_num, level in machine.trace:
+        if ts < start_us:
+            continue
+        if level and pin_num in pin_axis_map:
+            steps[pin_axis_map[pin_num]] += 1
+        elif pin_num in dir_pin_axis_map:
+            dir_changes[dir_pin_axis_map[pin_num]] += 1
+    return {
+        'duration_s': (utime.now_us() - start_us) / 1000000,
+        'steps': steps,
+        'dir_changes': dir_changes,
+        'final_position': {'x': main.x_pos, 'y': main.y_pos},
+    }
+
+
+def write_trace(filename):
+    import machine
+    with open(filename, 'w') as fh:
+        fh.write('time_us,pin,level\n')
+        for ts, pin_num, level in machine.trace:
+            fh.write('{},{},{}\n'.format(ts, pin_num, level))
+
+
+def parse_config_override(s):
+    k, _, v = s.partition('=')
+    try:
+        v = json.loads(v)
+    except ValueError:
+        pass
+    return k, v
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description='Simulate a Sketchy job on virtual hardware.')
+    parser.add_argument('--set', dest='config_overrides', action='append',
+                        type=parse_config_override, default=[],
+                        metavar='KEY=VALUE',
+                        help='override a config value, parsed as JSON if valid')
+    parser.add_argument('--trace', metavar='FILE',
+                        help='write the pin trace to FILE as CSV')
+    parser.add_argument('--max-seconds', type=float,
+                        help='exit with status 1 if the simulated plot time '
+                             'exceeds this value')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    text_parser = subparsers.add_parser('text', help='draw text')
+    text_parser.add_argument('text')
+    text_parser.add_argument('--char-height', type=float, default=64)
+    text_parser.add_argument('--char-spacing', type=int)
+    text_parser.add_argument('--word-spacing', type=int)
+    text_parser.add_argument('--x-offset', type=int, default=0)
+    text_parser.add_argument('--y-offset', type=int, default=0)
+    text_parser.add_argument('--optimize-route', action='store_true')
+    text_parser.add_argument('--width', type=int)
+    text_parser.add_argument('--align', choices=('left', 'center', 'right'),
+                             default='left')
+    text_parser.add_argument('--line-spacing', type=int)
+
+    svg_parser = subparsers.add_parser('svg', help='render an SVG file')
+    svg_parser.add_argument('filename')
+    svg_parser.add_argument('--optimize-route', action='store_true')
+    svg_parser.add_argument('--fill', action='store_true',
+                            help='hatch the filled shapes')
+    svg_parser.add_argument('--hatch-spacing', type=float)
+    svg_parser.add_argument('--hatch-angle', type=float)
+
+    points_parser = subparsers.add_parser(
+        'points', help='move along a JSON list of [x, y] points')
+    points_parser.add_argument('filename')
+
+    plot_parser = subparsers.add_parser('plot', help='replay a plot file')
+    plot_parser.add_argument('filename')
+
+    args = parser.parse_args(argv)
+    # Resolve file arguments before install() changes the working directory.
+    for k in ('filename', 'trace'):
+        if getattr(args, k, None):
+            setattr(args, k, os.path.abspath(getattr(args, k)))
+    return args
+
+
+def run(args):
+    main = load_main(dict(args.config_overrides))
+    import utime
+    start_us = utime.now_us()
+    if args.command == 'text':
+        main.draw_text(args.text, args.char_height, args.char_spacing,
+                       args.word_spacing, args.x_offset, args.y_offset,
+                       args.optimize_route, args.width, args.align,
+                       args.line_spacing)
+    elif args.command == 'svg':
+        with open(args.filename, 'rb') as fh:
+            main.render_svg(fh, args.optimize_route, args.fill,
+                            args.hatch_spacing, args.hatch_angle)
+    elif args.command == 'points':
+        with open(args.filename, 'r') as fh:
+            main.move_to_points(json.load(fh))
+    elif args.command == 'plot':
+        main.move_to_points(main.read_plot_file(args.filename))
+    wait_for_motion(main)
+    summary = get_summary(main, start_us)
+    if args.trace:
+        write_trace(args.trace)
+    return summary
+
+
+if __name__ == '__main__':
+    args = parse_args(sys.argv[1:])
+    summary = run(args)
+    print(json.dumps(summary, indent=2))
+    if args.max_seconds is not None \
+       and summary['duration_s'] > args.max_seconds:
+        sys.exit('Simulated plot time of {}s exceeds the max of {}s'.format(
+            summary['duration_s'], args.max_seconds))
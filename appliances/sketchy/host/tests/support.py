@@ -0,0 +1,135 @@
+"""Test Support
+
+The tests run the firmware on the simulated hardware of host/upy, via
+host/sim.py. main.py only needs the femtoweb submodule to define and serve its
+routes, so load_main() first installs a minimal stand-in for it, which lets
+the tests run from a checkout without the submodule. Its response functions
+return Response objects and its route decorators return the handlers
+unchanged, so that the tests can call the handlers directly.
+
+"""
+
+import io
+import json
+import os
+import subprocess
+import sys
+import types
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+HOST_DIR = os.path.dirname(TESTS_DIR)
+sys.path.insert(0, HOST_DIR)
+
+import sim
+from sim import install
+
+
+###############################################################################
+# femtoweb Stand-in
+###############################################################################
+
+# Map each path to its route handler.
+routes = {}
+
+
+class Response:
+    def __init__(self, status, body=None):
+        self.status = status
+        self.body = body
+
+
+class Request:
+    """A request with the specified headers whose connection reads the body.
+    """
+    def __init__(self, body=b'', headers=None):
+        self.connection = io.BytesIO(body)
+        self.headers = headers or {}
+
+
+def get_response_func(status):
+    return lambda body=None, **kwargs: Response(status, body)
+
+
+def route(path, methods=None, query_param_parser_map=None):
+    def decorator(func):
+        routes[path] = func
+        return func
+    return decorator
+
+
+def install_femtoweb():
+    """Install the stand-in modules for lib.femtoweb, in place of the
+    submodule.
+    """
+    server = types.ModuleType('lib.femtoweb.server')
+    for status in (200, 400, 404, 500, 503):
+        setattr(server, '_{}'.format(status), get_response_func(status))
+    server.GET = 'GET'
+    server.POST = 'POST'
+    server.route = route
+    server.as_json = lambda func: func
+    server.as_websocket = lambda func: func
+    server.as_type = lambda type_: type_
+    server.as_choice = lambda *choices: choices
+    server.as_maybe = lambda parser: parser
+    server.as_with_default = lambda parser, default: parser
+    server.send = lambda connection, response: None
+    server.serve = lambda *args, **kwargs: None
+
+    default_http_endpoints = types.ModuleType(
+        'lib.femtoweb.default_http_endpoints')
+    default_http_endpoints._fs_GET = lambda filename: Response(200, filename)
+
+    package = types.ModuleType('lib.femtoweb')
+    package.server = server
+    package.default_http_endpoints = default_http_endpoints
+    sys.modules['lib.femtoweb'] = package
+    sys.modules['lib.femtoweb.server'] = server
+    sys.modules['lib.femtoweb.default_http_endpoints'] = \
+        default_http_endpoints
+
+
+def load_main(config_overrides=None):
+    """Return the main module as loaded by sim.load_main(), with the femtoweb
+    stand-in.
+    """
+    install_femtoweb()
+    return sim.load_main(config_overrides)
+
+
+###############################################################################
+# Subprocesses
+###############################################################################
+
+def run_python(script, *args):
+    """Run the Python script, with the arguments as sys.argv[1:], in a new
+    process that's imported this module, and return its output.
+    """
+    prelude = (
+        'import sys\n'
+        'sys.path.insert(0, {!r})\n'
+        'import support\n'
+    ).format(TESTS_DIR)
+    return subprocess.check_output(
+        (sys.executable, '-c', prelude + script) + args).decode()
+
+
+def run_sim(*args):
+    """Run sim.py with the arguments in a new process, so that it loads
+    main.py with its own config overrides, and return its JSON summary.
+    """
+    output = run_python(
+        'import json\n'
+        'support.install_femtoweb()\n'
+        'print(json.dumps(support.sim.run(support.sim.parse_args('
+        'sys.argv[1:]))))\n',
+        *args)
+    return json.loads(output)
+
+
+def run_script(config_overrides, script):
+    """Run the Python script in a new process that's loaded main.py, with the
+    config overrides, as main, and return its output.
+    """
+    prelude = 'main = support.load_main({!r})\n'.format(config_overrides)
+    return run_python(prelude + script)
@@ -0,0 +1,159 @@
+"""Tests of the asyncio runtime mode, its routes and the motion coroutine.
+
+"""
+
+import asyncio
+import base64
+import json
+import os
+import unittest
+
+import support
+main = support.load_main()
+
+import machine
+import uasyncio
+
+
+class FakeRequest:
+    def __init__(self, query):
+        self.query = query
+
+
+async def wait_until(predicate, timeout_ms=5000):
+    for _ in range(timeout_ms):
+        if predicate():
+            return
+        await uasyncio.sleep_ms(1)
+    raise AssertionError('Timed out')
+
+
+def get_websocket_frame(message):
+    """Return a masked text frame of the message, as sent by a client.
+    """
+    payload = message.encode()
+    mask = os.urandom(4)
+    masked = bytes(b ^ mask[i & 3] for i, b in enumerate(payload))
+    return bytes((0x81, 0x80 | len(payload))) + mask + masked
+
+
+class AsyncRuntimeTestCase(unittest.TestCase):
+    def setUp(self):
+        main.move_to_point(0, 0)
+        main.motion_points.clear()
+
+    def run_with_motion(self, test):
+        """Run the coroutine function test, with the points event and the
+        task of a running motion coroutine, until it returns.
+        """
+        async def run():
+            points_event = uasyncio.Event()
+            task = uasyncio.create_task(main.motion_task(points_event))
+            try:
+                return await test(points_event, task)
+            finally:
+                task.cancel()
+                try:
+                    await task
+                except uasyncio.CancelledError:
+                    pass
+        return asyncio.run(run())
+
+    def is_at(self, x, y):
+        return (not main.is_moving_to_point
+                and main.get_start_position() == (x, y))
+
+    def test_move_to_point(self):
+        async def test(points_event, task):
+            routes = main.get_async_routes(points_event)
+            response = await routes['/move_to_point'](
+                FakeRequest({'x': '100', 'y': '50'}))
+            self.assertEqual(response[0], 200)
+            await wait_until(lambda: self.is_at(100, 50))
+            status = json.loads((await routes['/status'](None))[2])
+            self.assertEqual(status['current_position'], {'x': 100, 'y': 50})
+        self.run_with_motion(test)
+
+    def test_cancel_releases_motion(self):
+        async def test(points_event, task):
+            start = len(machine.trace)
+            main.motion_points.extend(((800, 0), (800, 600)))
+            points_event.set()
+            await wait_until(lambda: main.is_moving_to_point
+                             and len(machine.trace) > start)
+            task.cancel()
+            with self.assertRaises(uasyncio.CancelledError):
+                await task
+        self.run_with_motion(test)
+        # The move was abandoned part way and everything was released.
+        self.assertFalse(main.is_moving_to_point)
+        self.assertEqual(main.planner.blocks, [])
+        self.assertEqual(main.STEPPER_NOT_ENABLE_PIN.value(), 1)
+        self.assertTrue(main.motion_lock.acquire(False))
+        main.motion_lock.release()
+        self.assertNotEqual(main.get_start_position(), (800, 600))
+        main.move_to_point(10, 10)
+        self.assertEqual(main.get_start_position(), (10, 10))
+
+    def test_server(self):
+        from lib.aioweb import serve
+
+        async def request(port, data):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(data)
+            await writer.drain()
+            return reader, writer
+
+        async def close(reader, writer):
+            # Wait for the server to close its end too.
+            writer.write_eof()
+            await reader.read()
+            writer.close()
+            await writer.wait_closed()
+
+        async def test(points_event, task):
+            server = await serve(main.get_async_routes(points_event),
+                                 '127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            try:
+                reader, writer = await request(
+                    port, b'GET /status HTTP/1.0\r\n\r\n')
+                response = await reader.read()
+                await close(reader, writer)
+                head, _, body = response.partition(b'\r\n\r\n')
+                self.assertTrue(head.startswith(b'HTTP/1.0 200'))
+                self.assertIn('current_position', json.loads(body))
+
+                reader, writer = await request(
+                    port, b'GET /nope HTTP/1.0\r\n\r\n')
+                self.assertTrue(
+                    (await reader.read()).startswith(b'HTTP/1.0 404'))
+                await close(reader, writer)
+
+                # Draw over a WebSocket, whose messages are each a
+                # length-prefixed [x, y].
+                key = base64.b64encode(os.urandom(16))
+                reader, writer = await request(
+                    port,
+                    b'GET /draw HTTP/1.1\r\n'
+                    b'Upgrade: websocket\r\n'
+                    b'Sec-WebSocket-Key: ' + key + b'\r\n\r\n')
+                handshake = await reader.readuntil(b'\r\n\r\n')
+                self.assertTrue(handshake.startswith(b'HTTP/1.1 101'))
+                for point in ((100, 100), (200, 100), (200, 300)):
+                    message = json.dumps(point)
+                    writer.write(get_websocket_frame(
+                        '{}{}'.format(len(message), message)))
+                await writer.drain()
+                await wait_until(lambda: self.is_at(200, 300))
+                await close(reader, writer)
+            finally:
+                # Let the connection handlers finish.
+                await uasyncio.sleep_ms(10)
+                server.close()
+                await server.wait_closed()
+        self.run_with_motion(test)
+
+
+if __name__ == '__main__':
+    unittest.main()
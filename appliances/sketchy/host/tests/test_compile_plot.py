@@ -0,0 +1,98 @@
+"""Tests that host/compile_plot.py compiles the same points that the device
+would draw.
+
+"""
+
+import io
+import os
+import tempfile
+import unittest
+
+import support
+main = support.load_main()
+
+from paths.plotfile import PlotReader
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+else:
+    import compile_plot
+
+
+SVG = (
+    '<svg viewBox="0 0 680 680">'
+    '<path d="M100 100 H300 V300 H100 Z"/>'
+    '<path fill="none" d="M400 400 C 500 400 500 500 400 500"/>'
+    '</svg>'
+)
+
+
+def decode(data):
+    reader = PlotReader(io.BytesIO(data), bytearray(64))
+    return list(reader.read_points())
+
+
+@unittest.skipIf(numpy is None, 'compile_plot.py requires NumPy')
+class CompilePlotTestCase(unittest.TestCase):
+    def setUp(self):
+        main.move_to_point(0, 0)
+        fd, self.svg_filename = tempfile.mkstemp(suffix='.svg')
+        with os.fdopen(fd, 'w') as fh:
+            fh.write(SVG)
+        self.addCleanup(os.remove, self.svg_filename)
+
+    def compile(self, *argv):
+        args = compile_plot.parse_args(('-o', 'unused.skp') + argv)
+        return compile_plot.compile_plot(args)
+
+    def test_config(self):
+        self.assertEqual(compile_plot.X_AXIS_MAX, main.X_AXIS_MAX)
+        self.assertEqual(compile_plot.Y_AXIS_MAX, main.Y_AXIS_MAX)
+        self.assertEqual(compile_plot.PATH_SIMPLIFY_TOLERANCE,
+                         main.PATH_SIMPLIFY_TOLERANCE)
+        self.assertEqual(compile_plot.SVG_CURVE_TOLERANCE,
+                         main.SVG_CURVE_TOLERANCE)
+
+    def test_text(self):
+        data, summary = self.compile('text', 'HI THERE', '--y-offset', '300')
+        points = main.get_simplifier().simplify(
+            main.text_to_points('HI THERE', 64, x_offset=0, y_offset=300))
+        self.assertEqual(decode(data), list(points))
+        self.assertEqual(summary['num_clipped_points'], 0)
+
+    def test_svg(self):
+        data, _ = self.compile('svg', self.svg_filename)
+        with open(self.svg_filename, 'rb') as fh:
+            points = list(main.get_simplifier().simplify(
+                main.svg_to_points(fh)))
+        self.assertEqual(decode(data), points)
+
+    def test_optimize_route(self):
+        data, _ = self.compile('--optimize-route', 'svg', self.svg_filename)
+        with open(self.svg_filename, 'rb') as fh:
+            points = list(main.get_simplifier().simplify(
+                main.svg_to_points(fh, optimize_route=True)))
+        self.assertEqual(decode(data), points)
+
+    def test_fill(self):
+        data, _ = self.compile('svg', self.svg_filename, '--fill',
+                               '--hatch-spacing', '20')
+        with open(self.svg_filename, 'rb') as fh:
+            points = list(main.get_simplifier().simplify(
+                main.svg_to_points(fh, fill=True, hatch_spacing=20)))
+        self.assertEqual(decode(data), points)
+        # Only the first path is filled, and it's hatched.
+        self.assertGreater(len(points), 30)
+
+    def test_clip(self):
+        data, summary = self.compile('svg', self.svg_filename, '--scale', '4')
+        self.assertGreater(summary['num_clipped_points'], 0)
+        for x, y in decode(data):
+            self.assertTrue(0 <= x <= main.X_AXIS_MAX)
+            self.assertTrue(0 <= y <= main.Y_AXIS_MAX)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+"""Tests of the arc and Bezier curve motion primitives, on the simulated
+hardware.
+
+"""
+
+import math
+import unittest
+
+import support
+main = support.load_main()
+
+from motion import (
+    X_DIR_POSITIVE,
+    X_STEP,
+    Y_DIR_POSITIVE,
+    Y_STEP,
+)
+from motion.curves import (
+    get_arc_segments,
+    get_cubic_segments,
+    get_quad_segments,
+)
+
+
+def get_segment_points(segment):
+    """Return the list of lattice points that the segment's step flags visit,
+    starting with its first point.
+    """
+    x = segment.x0
+    y = segment.y0
+    points = [(x, y)]
+    for flags in segment.get_step_flags():
+        if flags & X_STEP:
+            x += 1 if flags & X_DIR_POSITIVE else -1
+        if flags & Y_STEP:
+            y += 1 if flags & Y_DIR_POSITIVE else -1
+        points.append((x, y))
+    return points
+
+
+def get_bezier_point(points, t):
+    """Return the point at parameter t of the Bezier curve with the control
+    points, by de Casteljau's algorithm.
+    """
+    while len(points) > 1:
+        points = [(x0 + (x1 - x0) * t, y0 + (y1 - y0) * t)
+                  for (x0, y0), (x1, y1) in zip(points, points[1:])]
+    return points[0]
+
+
+class CurveTestCase(unittest.TestCase):
+    def assertSegmentsFollow(self, segments, start, end, get_distance,
+                             max_distance):
+        """Assert that the segments are contiguous from start to end, that
+        each tick moves each axis at most one step, and that every visited
+        point is within max_distance of the curve.
+        """
+        x, y = start
+        for segment in segments:
+            self.assertEqual((segment.x0, segment.y0), (x, y))
+            points = get_segment_points(segment)
+            self.assertEqual(len(points) - 1,
+                             max(abs(segment.x_delta), abs(segment.y_delta)))
+            self.assertEqual(points[-1], (segment.x1, segment.y1))
+            for px, py in points:
+                self.assertLessEqual(get_distance(px, py), max_distance)
+            x, y = points[-1]
+        self.assertEqual((x, y), end)
+
+
+class ArcTestCase(CurveTestCase):
+    def test_quarter_arc(self):
+        cx, cy, r = 400, 300, 100
+        segments = get_arc_segments(cx + r, cy, cx, cy + r, cx, cy)
+        self.assertEqual(len(segments), 2)
+        self.assertSegmentsFollow(
+            segments, (cx + r, cy), (cx, cy + r),
+            lambda x, y: abs(math.hypot(x - cx, y - cy) - r), 0.5)
+
+    def test_full_circle(self):
+        cx, cy, r = 400, 300, 57
+        for clockwise in (False, True):
+            segments = get_arc_segments(cx, cy - r, cx, cy - r, cx, cy,
+                                        clockwise)
+            self.assertEqual(len(segments), 8)
+            self.assertSegmentsFollow(
+                segments, (cx, cy - r), (cx, cy - r),
+                lambda x, y: abs(math.hypot(x - cx, y - cy) - r), 0.5)
+
+    def test_end_off_circle(self):
+        with self.assertRaises(ValueError):
+            get_arc_segments(500, 300, 400, 380, 400, 300)
+
+
+class BezierTestCase(CurveTestCase):
+    def assertFollowsBezier(self, control_points, max_distance):
+        samples = [get_bezier_point(control_points, i / 1000)
+                   for i in range(1001)]
+        get_distance = lambda x, y: min(math.hypot(x - sx, y - sy)
+                                        for sx, sy in samples)
+        coords = [c for point in control_points for c in point]
+        get_segments = (get_quad_segments if len(control_points) == 3
+                        else get_cubic_segments)
+        self.assertSegmentsFollow(get_segments(*coords), control_points[0],
+                                  control_points[-1], get_distance,
+                                  max_distance)
+
+    def test_quad(self):
+        self.assertFollowsBezier(((100, 100), (500, 600), (800, 0)), 1)
+
+    def test_cubic(self):
+        self.assertFollowsBezier(
+            ((100, 100), (100, 500), (700, -200), (700, 300)), 1)
+
+    def test_cubic_loop(self):
+        self.assertFollowsBezier(
+            ((200, 200), (600, 500), (100, 500), (500, 200)), 1)
+
+
+class CurveMoveTestCase(unittest.TestCase):
+    def test_arc_to(self):
+        main.move_to_point(400, 300)
+        main.arc_to(500, 400, 400, 400)
+        self.assertEqual((main.x_pos, main.y_pos), (500, 400))
+
+    def test_quad_to(self):
+        main.move_to_point(100, 100)
+        main.quad_to(300, 500, 600, 100)
+        self.assertEqual((main.x_pos, main.y_pos), (600, 100))
+
+    def test_cubic_to(self):
+        main.move_to_point(100, 100)
+        main.cubic_to(100, 500, 700, 0, 700, 300)
+        self.assertEqual((main.x_pos, main.y_pos), (700, 300))
+
+    def test_out_of_bounds_curve_doesnt_move(self):
+        main.move_to_point(100, 100)
+        with self.assertRaises(main.OutOfBounds):
+            main.arc_to(100, 100, 100, 300)
+        self.assertEqual((main.x_pos, main.y_pos), (100, 100))
+
+
+if __name__ == '__main__':
+    unittest.main()
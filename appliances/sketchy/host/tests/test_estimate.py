@@ -0,0 +1,76 @@
+"""Tests of job estimates and the /estimate route.
+
+"""
+
+import json
+import unittest
+
+import support
+main = support.load_main()
+
+import machine
+
+
+class EstimateTestCase(unittest.TestCase):
+    def setUp(self):
+        main.move_to_point(100, 100)
+
+    def test_doesnt_move(self):
+        start = len(machine.trace)
+        axis_dirs = list(main.planner.axis_dirs)
+        estimate = main.estimate_points(((200, 100), (200, 300)))
+        self.assertEqual(len(machine.trace), start)
+        self.assertEqual(main.get_start_position(), (100, 100))
+        self.assertEqual(main.planner.axis_dirs, axis_dirs)
+        self.assertEqual(estimate['num_points'], 2)
+        self.assertEqual(estimate['steps'], {'x': 100, 'y': 200})
+        self.assertTrue(estimate['fits'])
+        self.assertGreater(estimate['duration_seconds'], 0)
+
+    def test_out_of_bounds(self):
+        estimate = main.estimate_points(
+            ((-1, 0), (main.X_AXIS_MAX + 1, 10), (5, 5)))
+        self.assertEqual(estimate['num_out_of_bounds_points'], 2)
+        self.assertFalse(estimate['fits'])
+        self.assertEqual(estimate['bounding_box'], {
+            'min': {'x': -1, 'y': 0},
+            'max': {'x': main.X_AXIS_MAX + 1, 'y': 10},
+        })
+
+    def test_polyline(self):
+        estimate = main.estimate_points(((150, 100), (200, 100), (200, 200)),
+                                        include_polyline=True)
+        # The collinear point is simplified away, and the path starts from
+        # the current position.
+        self.assertEqual(estimate['polyline'], [100, 100, 200, 100, 200, 200])
+
+    def test_empty(self):
+        estimate = main.estimate_points(())
+        self.assertEqual(estimate['num_points'], 0)
+        self.assertIsNone(estimate['bounding_box'])
+        self.assertEqual(estimate['duration_seconds'], 0)
+
+
+class EstimateRouteTestCase(unittest.TestCase):
+    def estimate(self, points, polyline='false'):
+        return main._estimate(None, points, polyline, None)
+
+    def test_estimate(self):
+        response = self.estimate('[[0, 0], [10.5, 20]]', polyline='true')
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.body['num_points'], 2)
+        self.assertIn('polyline', response.body)
+        self.assertIn('num_input_points', response.body)
+
+    def test_invalid_points(self):
+        for points in ('[[0, 0]', 'nope', '{"x": 1}', '[[0, 0], [1]]',
+                       '[[0, 0, 0]]', '[["0", 0]]', '[[true, 0]]',
+                       '[[NaN, 0]]', '[5]', '[null]'):
+            response = self.estimate(points)
+            self.assertEqual(response.status, 400, points)
+            self.assertIn('error', response.body)
+            json.dumps(response.body)
+
+
+if __name__ == '__main__':
+    unittest.main()
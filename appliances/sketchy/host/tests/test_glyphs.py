@@ -0,0 +1,76 @@
+"""Tests of the glyph stores, their scaled path cache and the packed font.
+
+"""
+
+import os
+import unittest
+
+import support
+support.install()
+
+import compile_font
+from fonts import (
+    default,
+    default_packed,
+)
+from fonts.glyphs import (
+    GlyphStore,
+    PackedGlyphStore,
+)
+
+
+class GlyphStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.store = GlyphStore.from_char_defs(default.CHARS, cache_size=2)
+
+    def test_get_path(self):
+        coords, advance = self.store.get_path('L', 2)
+        unscaled, _ = GlyphStore.from_char_defs(default.CHARS).get_path('L', 1)
+        self.assertEqual(list(coords), [c * 2 for c in unscaled])
+        # The path starts and ends at the sprue below its entry point.
+        self.assertEqual(coords[:2], coords[-2:])
+        self.assertEqual(advance, max(coords[0::2]))
+
+    def test_cache(self):
+        store = self.store
+        a = store.get_path('A', 1)
+        self.assertIs(store.get_path('A', 1), a)
+        self.assertEqual((store.num_hits, store.num_misses), (1, 1))
+        # Each scale is cached separately.
+        store.get_path('A', 2)
+        self.assertEqual((store.num_hits, store.num_misses), (1, 2))
+        # Using A at scale 1 makes A at scale 2 the least recently used,
+        # which a third path evicts.
+        store.get_path('A', 1)
+        store.get_path('B', 1)
+        self.assertEqual(list(store.cache), [('A', 1), ('B', 1)])
+        self.assertIs(store.get_path('A', 1), a)
+        self.assertEqual((store.num_hits, store.num_misses), (3, 3))
+
+
+class PackedGlyphStoreTestCase(unittest.TestCase):
+    def test_matches_char_defs(self):
+        store = GlyphStore.from_char_defs(default.CHARS)
+        packed = PackedGlyphStore(default_packed)
+        for char in default.CHARS:
+            self.assertIn(char, packed)
+            self.assertEqual(packed.get_height(char), store.get_height(char))
+            self.assertEqual(list(packed.get_coords(char)),
+                             list(store.get_coords(char)))
+            for scale in (1, 7):
+                coords, advance = packed.get_path(char, scale)
+                expected_coords, expected_advance = store.get_path(char,
+                                                                   scale)
+                self.assertEqual(list(coords), list(expected_coords))
+                self.assertEqual(advance, expected_advance)
+        self.assertNotIn('a', packed)
+        self.assertNotIn('AB', packed)
+
+    def test_compiled_font_is_current(self):
+        with open(os.path.join(compile_font.FONTS_DIR,
+                               'default_packed.py')) as fh:
+            self.assertEqual(compile_font.compile_font('default'), fh.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+"""Tests of the scanline hatch fill.
+
+"""
+
+import math
+import unittest
+
+import support
+support.install()
+
+from paths.hatch import (
+    EVENODD,
+    NONZERO,
+    fill_shape,
+    hatch,
+)
+
+
+SQUARE = [(0, 0), (100, 0), (100, 100), (0, 100), (0, 0)]
+HOLE = [(30, 30), (70, 30), (70, 70), (30, 70), (30, 30)]
+U_SHAPE = [(0, 0), (100, 0), (100, 100), (70, 100), (70, 30), (30, 30),
+           (30, 100), (0, 100)]
+
+
+def get_hatch_lines(strokes):
+    """Return the (<y>, <x start>, <x end>) of the horizontal segments of the
+    strokes, i.e. the hatch lines rather than the moves between them.
+    """
+    lines = []
+    for stroke in strokes:
+        for (x0, y0), (x1, y1) in zip(stroke, stroke[1:]):
+            if abs(y0 - y1) < 1e-9 and abs(x0 - x1) > 1e-9:
+                lines.append((round(y0, 6), min(x0, x1), max(x0, x1)))
+    return sorted(lines)
+
+
+def is_on_outline(polygon, p0, p1):
+    """Return whether the move from p0 to p1 lies along a single edge of the
+    closed polygon.
+    """
+    def is_on_edge(point, a, b):
+        (x, y), (x0, y0), (x1, y1) = point, a, b
+        return (abs((x1 - x0) * (y - y0) - (y1 - y0) * (x - x0)) < 1e-6
+                and min(x0, x1) - 1e-6 <= x <= max(x0, x1) + 1e-6
+                and min(y0, y1) - 1e-6 <= y <= max(y0, y1) + 1e-6)
+    for a, b in zip(polygon, polygon[1:] + polygon[:1]):
+        if is_on_edge(p0, a, b) and is_on_edge(p1, a, b):
+            return True
+    return False
+
+
+class HatchTestCase(unittest.TestCase):
+    def test_square(self):
+        strokes = list(hatch([SQUARE], 10))
+        # A convex shape is hatched as a single zig-zag stroke.
+        self.assertEqual(len(strokes), 1)
+        lines = get_hatch_lines(strokes)
+        self.assertEqual([y for y, _, _ in lines],
+                         [5, 15, 25, 35, 45, 55, 65, 75, 85, 95])
+        for _, x_start, x_end in lines:
+            self.assertAlmostEqual(x_start, 0)
+            self.assertAlmostEqual(x_end, 100)
+
+    def test_evenodd_hole(self):
+        lines = get_hatch_lines(hatch([SQUARE, HOLE], 10, 0, EVENODD))
+        self.assertEqual(len(lines), 14)
+        for y, x_start, x_end in lines:
+            if 30 < y < 70:
+                self.assertTrue(x_end <= 30 + 1e-6 or x_start >= 70 - 1e-6)
+
+    def test_nonzero_fills_same_direction_hole(self):
+        lines = get_hatch_lines(hatch([SQUARE, HOLE], 10, 0, NONZERO))
+        self.assertEqual(len(lines), 10)
+
+    def test_angle(self):
+        strokes = list(hatch([SQUARE], 10, 90))
+        for stroke in strokes:
+            for x, y in stroke:
+                self.assertTrue(-1e-6 <= x <= 100 + 1e-6)
+                self.assertTrue(-1e-6 <= y <= 100 + 1e-6)
+        # The hatch lines are now vertical.
+        xs = sorted(set(round(x, 6) for stroke in strokes for x, _ in stroke))
+        self.assertEqual(xs, [5, 15, 25, 35, 45, 55, 65, 75, 85, 95])
+
+    def test_moves_follow_outline(self):
+        # The spans beyond the first one on the far side of the U's gap start
+        # a second zig-zag, and both move between their lines along the
+        # outline.
+        strokes = list(hatch([U_SHAPE], 10))
+        self.assertEqual(len(strokes), 2)
+        for stroke in strokes:
+            for p0, p1 in zip(stroke, stroke[1:]):
+                if abs(p0[1] - p1[1]) > 1e-9:
+                    self.assertTrue(is_on_outline(U_SHAPE, p0, p1))
+
+    def test_empty(self):
+        self.assertEqual(list(hatch([], 10)), [])
+        self.assertEqual(list(hatch([[(0, 0), (100, 0)]], 10)), [])
+
+
+class FillShapeTestCase(unittest.TestCase):
+    def test_single_route(self):
+        strokes = list(fill_shape([U_SHAPE], 10, 30))
+        self.assertEqual(len(strokes), 2)
+        outline, hatch_stroke = strokes
+        self.assertEqual(outline, U_SHAPE)
+        # The hatch starts where the outline ends and every move is either a
+        # hatch line, at 30 degrees, or along the outline.
+        self.assertEqual(hatch_stroke[0], U_SHAPE[-1])
+        tan_a = math.tan(math.radians(30))
+        is_line = lambda p0, p1: (
+            p0[0] != p1[0]
+            and abs((p1[1] - p0[1]) - (p1[0] - p0[0]) * tan_a) < 1e-6)
+        num_lines = 0
+        for p0, p1 in zip(hatch_stroke, hatch_stroke[1:]):
+            if is_line(p0, p1):
+                num_lines += 1
+            else:
+                self.assertTrue(is_on_outline(U_SHAPE, p0, p1))
+        self.assertEqual(num_lines, sum(
+            is_line(p0, p1)
+            for stroke in hatch([U_SHAPE], 10, 30)
+            for p0, p1 in zip(stroke, stroke[1:])))
+
+    def test_hole(self):
+        strokes = list(fill_shape([SQUARE, HOLE], 10, 0, EVENODD))
+        self.assertEqual(strokes[:2], [SQUARE, HOLE])
+        self.assertEqual(len(strokes), 3)
+        self.assertEqual(strokes[2][0], HOLE[-1])
+        self.assertEqual(len(get_hatch_lines(strokes[2:])), 14)
+
+    def test_empty(self):
+        self.assertEqual(list(fill_shape([], 10)), [])
+        self.assertEqual(list(fill_shape([[(0, 0), (100, 0)]], 10)),
+                         [[(0, 0), (100, 0)]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+"""Tests of the background job queue.
+
+The job worker thread polls for jobs forever, so each test runs main.py in a
+new process, in which the worker can't advance the virtual clock under the
+other tests.
+
+"""
+
+import json
+import unittest
+
+import support
+
+
+PRELUDE = '''
+import json
+from utime import sleep_ms
+from jobs import FINISHED_STATES
+
+def wait(job, states=FINISHED_STATES):
+    while job.state not in states:
+        sleep_ms(10)
+
+main.move_to_point(0, 0)
+square = lambda: iter(((500, 0), (500, 500), (0, 500), (0, 0)))
+# A path with many more points than the planner buffers, so that it can be
+# stopped part way through.
+zigzag = lambda: iter([(i * 8, i % 2 * 100) for i in range(100)])
+'''
+
+
+def run_jobs_script(script):
+    """Run the script after PRELUDE and return the JSON that it prints.
+    """
+    return json.loads(support.run_script({}, PRELUDE + script))
+
+
+class JobQueueTestCase(unittest.TestCase):
+    def test_runs_jobs_in_order(self):
+        result = run_jobs_script('''
+first = main.job_queue.submit('first', square)
+second = main.job_queue.submit('second', lambda: iter(((300, 200),)))
+states = [first.state, second.state]
+wait(second)
+print(json.dumps({
+    'states': states,
+    'jobs': main._jobs(None).body,
+    'position': main.get_start_position(),
+}))
+''')
+        self.assertEqual(result['states'][1], 'queued')
+        first, second = result['jobs']
+        self.assertEqual((first['state'], second['state']), ('done', 'done'))
+        # The estimate counts the same steps as the move.
+        self.assertEqual(first['steps_done'], first['steps_total'])
+        self.assertGreaterEqual(first['steps_total'], 2000)
+        self.assertGreater(first['elapsed_seconds'], 0)
+        self.assertIsNone(first['eta_seconds'])
+        self.assertEqual(result['position'], [300, 200])
+
+    def test_pause_and_resume(self):
+        result = run_jobs_script('''
+job = main.job_queue.submit('zigzag', zigzag)
+wait(job, ('running',))
+while not job.steps_done:
+    sleep_ms(10)
+main._jobs_pause(None, job.id)
+wait(job, ('paused', 'done'))
+paused_position = main.get_start_position()
+paused = job.to_dict()
+sleep_ms(1000)
+still_position = main.get_start_position()
+main._jobs_resume(None, job.id)
+wait(job)
+print(json.dumps({
+    'paused': paused,
+    'paused_position': paused_position,
+    'still_position': still_position,
+    'job': job.to_dict(),
+    'position': main.get_start_position(),
+}))
+''')
+        paused = result['paused']
+        self.assertEqual(paused['state'], 'paused')
+        self.assertLess(paused['steps_done'], paused['steps_total'])
+        self.assertGreater(paused['eta_seconds'], 0)
+        self.assertEqual(result['paused_position'], result['still_position'])
+        self.assertEqual(result['job']['state'], 'done')
+        self.assertEqual(result['position'], [792, 100])
+
+    def test_cancel(self):
+        result = run_jobs_script('''
+running = main.job_queue.submit('running', zigzag)
+queued = main.job_queue.submit('queued', lambda: iter(((300, 200),)))
+main.job_queue.cancel(queued.id)
+wait(running, ('running',))
+while not running.steps_done:
+    sleep_ms(10)
+main._jobs_cancel(None, running.id)
+wait(running)
+print(json.dumps({
+    'running': running.to_dict(),
+    'queued': queued.to_dict(),
+    'unknown': main._jobs_cancel(None, 99).status,
+    'position': main.get_start_position(),
+}))
+''')
+        self.assertEqual(result['running']['state'], 'cancelled')
+        self.assertLess(result['running']['steps_done'],
+                        result['running']['steps_total'])
+        self.assertEqual(result['queued']['state'], 'cancelled')
+        self.assertEqual(result['queued']['steps_done'], 0)
+        self.assertEqual(result['unknown'], 400)
+        self.assertNotIn(result['position'], ([792, 100], [300, 200]))
+
+    def test_failure(self):
+        result = run_jobs_script('''
+def get_points():
+    yield (100, 100)
+    raise ValueError('bad point')
+failed = main.job_queue.submit('failed', get_points)
+next_job = main.job_queue.submit('next', lambda: iter(((10, 20),)))
+wait(next_job)
+print(json.dumps({
+    'failed': failed.to_dict(),
+    'next': next_job.to_dict(),
+}))
+''')
+        self.assertEqual(result['failed']['state'], 'failed')
+        self.assertEqual(result['failed']['error'], 'ValueError: bad point')
+        self.assertEqual(result['next']['state'], 'done')
+
+    def test_plot_file(self):
+        result = run_jobs_script('''
+import os, tempfile
+fd, filename = tempfile.mkstemp(suffix='.skp')
+os.close(fd)
+main.save_plot_file(filename, [(100, 100), (250, 50)])
+job = main._jobs_plot_file(None, filename).body
+wait(main.job_queue.get(job['id']))
+os.remove(filename)
+print(json.dumps({
+    'job': main.job_queue.get(job['id']).to_dict(),
+    'position': main.get_start_position(),
+}))
+''')
+        self.assertEqual(result['job']['state'], 'done')
+        self.assertEqual(result['position'], [250, 50])
+
+
+if __name__ == '__main__':
+    unittest.main()
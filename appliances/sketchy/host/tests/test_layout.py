@@ -0,0 +1,93 @@
+"""Tests of text measurement, wrapping and layout.
+
+"""
+
+import unittest
+from array import array
+
+import support
+support.install()
+
+from fonts.glyphs import GlyphStore
+from fonts.layout import (
+    ALIGN_CENTER,
+    ALIGN_RIGHT,
+    TextLayout,
+    TextTooWide,
+    get_bounds,
+)
+
+
+# A vertical bar and a box, both 5 units tall, which at a char_height of 10
+# are drawn at a scale of 2, so that 'I' advances 0 steps and 'O' 4, plus the
+# char_spacing.
+GLYPHS = {
+    'I': array('h', (0, 0, 0, 4)),
+    'O': array('h', (0, 0, 0, 4, 2, 4, 2, 0, 0, 0)),
+}
+
+
+def get_layout():
+    return TextLayout(GlyphStore(GLYPHS), 10, char_spacing=1,
+                      word_spacing=3, line_spacing=2)
+
+
+class TextLayoutTestCase(unittest.TestCase):
+    def test_measure_word(self):
+        layout = get_layout()
+        self.assertEqual(layout.measure_word('O'), 5)
+        self.assertEqual(layout.measure_word('OIO'), 11)
+
+    def test_unknown_char_advances_like_a_space(self):
+        layout = get_layout()
+        self.assertEqual(layout.measure_word('O?O'),
+                         layout.measure_word('O') * 2 + layout.word_spacing)
+        placements = layout.layout('O?O', 0, 0, 100)
+        self.assertEqual([x for x, _, _ in placements], [0, 8])
+        # It's laid out as if it were a space between two words.
+        self.assertEqual([x for x, _, _ in layout.layout('O O', 0, 0, 100)],
+                         [0, 8])
+
+    def test_wrap(self):
+        layout = get_layout()
+        # Each 'OO' is 9 steps wide, and the words are 3 steps apart.
+        self.assertEqual(layout.wrap('OO OO OO', 22),
+                         [(['OO', 'OO'], 22), (['OO'], 9)])
+        self.assertEqual(layout.wrap('OO OO OO', 21),
+                         [(['OO'], 9), (['OO'], 9), (['OO'], 9)])
+        self.assertEqual(layout.wrap('OO\nOO', 100),
+                         [(['OO'], 9), (['OO'], 9)])
+        # A word that's too long for a line of its own is broken between
+        # chars.
+        self.assertEqual(layout.wrap('OOOO', 10),
+                         [(['OO'], 9), (['OO'], 9)])
+        with self.assertRaises(TextTooWide):
+            layout.wrap('O', 3)
+
+    def test_layout(self):
+        layout = get_layout()
+        placements = layout.layout('OO OO OO', 10, 100, 22)
+        # The line pitch is the glyph height plus the line spacing, and the
+        # glyphs of the second line are reversed.
+        self.assertEqual([(x, y) for x, y, _ in placements],
+                         [(10, 100), (15, 100), (23, 100), (28, 100),
+                          (15, 88), (10, 88)])
+        self.assertEqual(get_bounds(placements), (10, 88, 32, 110))
+
+    def test_align(self):
+        layout = get_layout()
+        self.assertEqual(
+            [x for x, _, _ in layout.layout('OO', 0, 0, 22, ALIGN_RIGHT)],
+            [13, 18])
+        self.assertEqual(
+            [x for x, _, _ in layout.layout('OO', 0, 0, 22, ALIGN_CENTER)],
+            [6, 11])
+
+    def test_empty(self):
+        layout = get_layout()
+        self.assertEqual(layout.layout('', 0, 0, 100), [])
+        self.assertIsNone(get_bounds([]))
+
+
+if __name__ == '__main__':
+    unittest.main()
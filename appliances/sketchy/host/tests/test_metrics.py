@@ -0,0 +1,99 @@
+"""Tests of the metrics and the /metrics route.
+
+"""
+
+import unittest
+
+import support
+main = support.load_main()
+
+from metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    Registry,
+)
+
+
+class MetricsTestCase(unittest.TestCase):
+    def test_render(self):
+        registry = Registry()
+        counter = registry.add(Counter('c_total', 'A counter.', label='axis'))
+        gauge = registry.add(Gauge('g', 'A gauge.'))
+        histogram = registry.add(Histogram('h', 'A histogram.', (1, 10)))
+        counter.inc(2, 'x')
+        counter.inc(1, 'y')
+        counter.inc(3, 'x')
+        gauge.set(7)
+        for value in (0.5, 1, 5, 50):
+            histogram.observe(value)
+        self.assertEqual(registry.render(), '\n'.join((
+            '# HELP c_total A counter.',
+            '# TYPE c_total counter',
+            'c_total{axis="x"} 5',
+            'c_total{axis="y"} 1',
+            '# HELP g A gauge.',
+            '# TYPE g gauge',
+            'g 7',
+            '# HELP h A histogram.',
+            '# TYPE h histogram',
+            'h_bucket{le="1"} 2',
+            'h_bucket{le="10"} 3',
+            'h_bucket{le="+Inf"} 4',
+            'h_sum 56.5',
+            'h_count 4',
+            '',
+        )))
+
+        registry.reset()
+        self.assertEqual(counter.values, {})
+        self.assertEqual(gauge.values, {})
+        self.assertEqual(histogram.count, 0)
+        self.assertEqual(list(histogram.counts), [0, 0, 0])
+
+
+class MotionMetricsTestCase(unittest.TestCase):
+    def setUp(self):
+        main.move_to_point(100, 100)
+        main.move_to_point(200, 100)
+        main.reset_metrics()
+
+    def test_moves(self):
+        main.move_to_point(300, 100)
+        # Reverse the x axis, which takes up its backlash first.
+        main.move_to_point(250, 100)
+        x_backlash = main.planner.backlash_steps[0][0]
+        self.assertEqual(main.STEPS.values[main.X_AXIS], 150)
+        self.assertEqual(main.STEPS.values[main.Y_AXIS], 0)
+        self.assertEqual(main.REVERSALS.values, {main.X_AXIS: 1})
+        self.assertEqual(main.BACKLASH_STEPS.values[main.X_AXIS], x_backlash)
+        self.assertGreater(main.BACKLASH_SECONDS.values[None], 0)
+        self.assertEqual(main.MOVE_DURATION.count, 2)
+        # Step timing is off by default.
+        self.assertEqual(main.STEP_LATENESS.count, 0)
+
+    def test_route(self):
+        main.move_to_point(300, 100)
+        response = main._metrics(None, 'false')
+        self.assertEqual(response.status, 200)
+        self.assertIn('sketchy_steps_total{axis="x"} 100', response.body)
+        self.assertIn('sketchy_move_duration_seconds_count 1', response.body)
+        # The metrics are reset after they're rendered.
+        response = main._metrics(None, 'true')
+        self.assertIn('sketchy_steps_total{axis="x"} 100', response.body)
+        response = main._metrics(None, 'false')
+        self.assertNotIn('sketchy_steps_total{', response.body)
+        self.assertIn('sketchy_move_duration_seconds_count 0', response.body)
+
+    def test_step_timing(self):
+        output = support.run_script(
+            {'METRICS_STEP_TIMING_ENABLED': True},
+            'main.move_to_point(100, 50)\n'
+            'print(main.STEP_LATENESS.count)\n'
+        )
+        # Each tick is timed, including any that take up backlash.
+        self.assertGreaterEqual(int(output), 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
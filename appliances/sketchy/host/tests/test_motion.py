@@ -0,0 +1,245 @@
+"""Tests of step generation, motion planning and the step executors, on the
+simulated hardware.
+
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import support
+main = support.load_main()
+
+import config
+import machine
+from motion import (
+    X_DIR_POSITIVE,
+    X_STEP,
+    Y_DIR_POSITIVE,
+    Y_STEP,
+    line_step_flags,
+)
+
+
+def walk(flags_iter, x=0, y=0):
+    """Return the (<num ticks>, <x steps>, <y steps>, <x>, <y>) that result
+    from issuing the step flags from x,y.
+    """
+    num_ticks = x_steps = y_steps = 0
+    for flags in flags_iter:
+        num_ticks += 1
+        if flags & X_STEP:
+            x_steps += 1
+            x += 1 if flags & X_DIR_POSITIVE else -1
+        if flags & Y_STEP:
+            y_steps += 1
+            y += 1 if flags & Y_DIR_POSITIVE else -1
+    return num_ticks, x_steps, y_steps, x, y
+
+
+def count_trace_steps(start):
+    """Return the number of x and y step pulses in the trace since index
+    start.
+    """
+    pin_axis_map = {
+        main.STEPPER_X_STEP_PIN_NUM: 0,
+        main.STEPPER_Y_STEP_PIN_NUM: 1,
+    }
+    steps = [0, 0]
+    for _, pin_num, level in machine.trace[start:]:
+        if level and pin_num in pin_axis_map:
+            steps[pin_axis_map[pin_num]] += 1
+    return tuple(steps)
+
+
+class LineStepFlagsTestCase(unittest.TestCase):
+    def test_step_counts(self):
+        for x_delta, y_delta in ((0, 0), (10, 0), (0, -7), (13, 5), (-5, 13),
+                                 (100, -99), (-1, -1), (880, 1)):
+            num_ticks, x_steps, y_steps, x, y = walk(
+                line_step_flags(x_delta, y_delta))
+            self.assertEqual(num_ticks, max(abs(x_delta), abs(y_delta)))
+            self.assertEqual((x_steps, y_steps), (abs(x_delta), abs(y_delta)))
+            self.assertEqual((x, y), (x_delta, y_delta))
+
+    def test_minor_axis_stays_near_line(self):
+        x_delta, y_delta = 37, 11
+        x = y = 0
+        for flags in line_step_flags(x_delta, y_delta):
+            x += 1 if flags & X_STEP else 0
+            y += 1 if flags & Y_STEP else 0
+            self.assertLessEqual(abs(y - x * y_delta / x_delta), 1)
+
+
+class PlannerTestCase(unittest.TestCase):
+    def get_blocks(self, deltas):
+        planner = main.get_planner()
+        blocks = []
+        for x_delta, y_delta in deltas:
+            blocks.extend(planner.add(x_delta, y_delta))
+        blocks.extend(planner.flush())
+        return blocks
+
+    def test_block_step_counts(self):
+        deltas = ((100, 0), (50, 80), (-30, 10), (0, -60))
+        blocks = self.get_blocks(deltas)
+        self.assertEqual(len(blocks), len(deltas))
+        for block in blocks:
+            num_ticks, x_steps, y_steps, _, _ = walk(block.get_step_flags())
+            self.assertEqual(num_ticks, block.num_steps)
+            self.assertEqual((x_steps, y_steps),
+                             (abs(block.x_delta), abs(block.y_delta)))
+
+    def test_reversal_backlash(self):
+        # The planner assumes that the axes last moved towards the origin.
+        blocks = self.get_blocks(((20, 0), (-20, 0), (0, 20)))
+        left, right = main.get_backlash_steps()[0]
+        down, up = main.get_backlash_steps()[1]
+        self.assertEqual(blocks[0].x_backlash, right)
+        self.assertEqual(blocks[0].x_delta, 20 + right)
+        self.assertEqual(blocks[1].x_backlash, left)
+        self.assertEqual(blocks[1].x_delta, -20 - left)
+        self.assertEqual(blocks[2].y_backlash, up)
+        self.assertTrue(blocks[1].x_reversal)
+
+    def test_reversal_doesnt_fail(self):
+        # An exact reversal is a junction with an angle of 180 degrees.
+        blocks = self.get_blocks(((10, 10), (-10, -10), (10, 10)))
+        self.assertEqual(len(blocks), 3)
+
+
+class SimulatedMoveTestCase(unittest.TestCase):
+    def test_move_to_points(self):
+        main.move_to_point(10, 10)
+        start = len(machine.trace)
+        blocks = []
+        main.move_to_points(((100, 50), (150, 200), (20, 20)), blocks.append)
+        self.assertEqual((main.x_pos, main.y_pos), (20, 20))
+        self.assertEqual(count_trace_steps(start), (
+            sum(abs(block.x_delta) for block in blocks),
+            sum(abs(block.y_delta) for block in blocks),
+        ))
+
+    def test_out_of_bounds(self):
+        main.move_to_point(10, 10)
+        with self.assertRaises(main.OutOfBounds):
+            main.move_to_point(main.X_AXIS_MAX + 1, 0)
+
+    def test_multi_step_is_relative(self):
+        main.move_to_point(500, 500)
+        main.multi_step(main.X_AXIS, main.DIR_RIGHT, 100)
+        main.multi_step(main.Y_AXIS, main.DIR_DOWN, 50)
+        self.assertEqual((main.x_pos, main.y_pos), (600, 450))
+
+    def test_estimate_matches_move(self):
+        main.move_to_point(0, 0)
+        points = ((100, 100), (300, 100), (300, 400), (0, 0))
+        estimate = main.estimate_points(points)
+        start = len(machine.trace)
+        main.move_to_points(points)
+        x_steps, y_steps = count_trace_steps(start)
+        self.assertEqual(
+            x_steps + y_steps,
+            estimate['steps']['x'] + estimate['steps']['y']
+            + estimate['backlash_steps'])
+        self.assertEqual(estimate['bounding_box'], {
+            'min': {'x': 0, 'y': 0},
+            'max': {'x': 300, 'y': 400},
+        })
+
+
+class CalibrateBacklashTestCase(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.config_filename = os.path.join(self.temp_dir, 'config.json')
+        patcher = mock.patch.object(config, 'CONFIG_FILENAME',
+                                    self.config_filename)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.backlash_steps = dict(main.DIR_BACKLASH_STEPS_MAP)
+        main.move_to_point(100, 100)
+
+    def tearDown(self):
+        main.DIR_BACKLASH_STEPS_MAP.update(self.backlash_steps)
+        main.planner.backlash_steps = main.get_backlash_steps()
+        shutil.rmtree(self.temp_dir)
+
+    def calibrate(self, axis, save='false', **kwargs):
+        values = dict(up=None, down=None, left=None, right=None, length=100,
+                      spacing=10, num_strokes=8)
+        values.update(kwargs)
+        return main._calibrate_backlash(None, axis, save=save, **values)
+
+    def test_update_and_save(self):
+        response = self.calibrate(main.X_AXIS, save='true', left=20)
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.body[main.DIR_LEFT], 20)
+        self.assertEqual(main.planner.backlash_steps[0][0], 20)
+        with open(self.config_filename) as fh:
+            saved = json.load(fh)['DIR_BACKLASH_STEPS']
+        self.assertEqual(saved, main.DIR_BACKLASH_STEPS_MAP)
+        # The reference stroke starts half a length beyond the start, and the
+        # last of the even number of strokes ends num_strokes * spacing steps
+        # beside its end.
+        self.assertEqual(main.get_start_position(), (250, 180))
+
+    def test_update_without_saving(self):
+        response = self.calibrate(main.Y_AXIS, up=3)
+        self.assertEqual(response.status, 200)
+        self.assertEqual(main.DIR_BACKLASH_STEPS_MAP[main.DIR_UP], 3)
+        self.assertFalse(os.path.exists(self.config_filename))
+
+    def test_out_of_bounds_changes_nothing(self):
+        main.move_to_point(800, 100)
+        start = len(machine.trace)
+        response = self.calibrate(main.X_AXIS, save='true', left=20)
+        self.assertEqual(response.status, 400)
+        self.assertEqual(main.DIR_BACKLASH_STEPS_MAP, self.backlash_steps)
+        self.assertEqual(main.planner.backlash_steps,
+                         main.get_backlash_steps())
+        self.assertFalse(os.path.exists(self.config_filename))
+        self.assertEqual(count_trace_steps(start), (0, 0))
+
+    def test_invalid_value(self):
+        response = self.calibrate(main.X_AXIS,
+                                  right=main.MAX_BACKLASH_STEPS + 1)
+        self.assertEqual(response.status, 400)
+        self.assertEqual(main.DIR_BACKLASH_STEPS_MAP, self.backlash_steps)
+
+
+class StepExecutorTestCase(unittest.TestCase):
+    def test_executors_agree(self):
+        args = ('text', 'HELLO', '--y-offset', '300')
+        inline = support.run_sim('--set', 'MOTION_STEP_EXECUTOR=inline',
+                                 *args)
+        for executor in ('timer', 'thread'):
+            summary = support.run_sim(
+                '--set', 'MOTION_STEP_EXECUTOR=' + executor, *args)
+            self.assertEqual(summary['steps'], inline['steps'])
+            self.assertEqual(summary['final_position'],
+                             inline['final_position'])
+            self.assertAlmostEqual(summary['duration_s'],
+                                   inline['duration_s'], delta=0.05)
+
+    def test_thread_relative_move(self):
+        output = support.run_script({'MOTION_STEP_EXECUTOR': 'thread'}, (
+            'main.move_to_point(500, 500)\n'
+            'main.multi_step("x", "right", 100)\n'
+            'print(*main.get_start_position())\n'
+        ))
+        self.assertEqual(output.split(), ['600', '500'])
+
+    def test_thread_home(self):
+        output = support.run_script({'MOTION_STEP_EXECUTOR': 'thread'}, (
+            'main.move_to_point(300, 200)\n'
+            'main._home(None)\n'
+            'print(*main.get_start_position())\n'
+        ))
+        self.assertEqual(output.split(), ['0', '0'])
+
+
+if __name__ == '__main__':
+    unittest.main()
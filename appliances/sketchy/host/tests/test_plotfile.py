@@ -0,0 +1,112 @@
+"""Tests of the plot file format and its replay on the simulated hardware.
+
+"""
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import support
+main = support.load_main()
+
+from paths.plotfile import (
+    HEADER_SIZE,
+    RECORD_SIZE,
+    InvalidPlotFile,
+    PlotReader,
+    encode_header,
+    write_plot_file,
+)
+
+
+POINTS = [(0, 0), (100, 50), (880, 680), (3, 4), (3, 4), (500, 0)]
+
+
+class ShortReadStream(io.BytesIO):
+    """A stream that returns at most max_read bytes per readinto(), like a
+    socket.
+    """
+    def __init__(self, data, max_read):
+        super().__init__(data)
+        self.max_read = max_read
+
+    def readinto(self, buf):
+        return super().readinto(memoryview(buf)[:self.max_read])
+
+
+def encode(points, buf_size=RECORD_SIZE * 2):
+    fh = io.BytesIO()
+    num_points = write_plot_file(fh, points, bytearray(buf_size))
+    return num_points, fh.getvalue()
+
+
+class PlotFileTestCase(unittest.TestCase):
+    def test_round_trip(self):
+        num_points, data = encode(POINTS)
+        self.assertEqual(num_points, len(POINTS))
+        self.assertEqual(len(data), HEADER_SIZE + len(POINTS) * RECORD_SIZE)
+        for buf_size in (RECORD_SIZE, RECORD_SIZE * 3, RECORD_SIZE * 64):
+            reader = PlotReader(io.BytesIO(data), bytearray(buf_size))
+            self.assertEqual(list(reader.read_points()), POINTS)
+
+    def test_short_reads(self):
+        _, data = encode(POINTS)
+        for max_read in (1, 3, 5):
+            stream = ShortReadStream(data, max_read)
+            reader = PlotReader(stream, bytearray(RECORD_SIZE * 2))
+            self.assertEqual(list(reader.read_points()), POINTS)
+
+    def test_size_limit(self):
+        # Reading stops at size even though the stream continues, e.g. into
+        # the next request.
+        _, data = encode(POINTS)
+        size = HEADER_SIZE + 2 * RECORD_SIZE
+        reader = PlotReader(io.BytesIO(data), bytearray(RECORD_SIZE * 4),
+                            size)
+        self.assertEqual(list(reader.read_points()), POINTS[:2])
+
+    def test_empty(self):
+        num_points, data = encode([])
+        self.assertEqual(num_points, 0)
+        self.assertEqual(data, encode_header())
+        reader = PlotReader(io.BytesIO(data), bytearray(RECORD_SIZE))
+        self.assertEqual(list(reader.read_points()), [])
+
+    def test_invalid(self):
+        with self.assertRaises(InvalidPlotFile):
+            PlotReader(io.BytesIO(b'SKP'), bytearray(RECORD_SIZE))
+        with self.assertRaises(InvalidPlotFile):
+            PlotReader(io.BytesIO(b'NOPE\x01\x00'), bytearray(RECORD_SIZE))
+        with self.assertRaises(InvalidPlotFile):
+            PlotReader(io.BytesIO(b'SKPL\x02\x00'), bytearray(RECORD_SIZE))
+        _, data = encode(POINTS)
+        reader = PlotReader(io.BytesIO(data[:-1]), bytearray(RECORD_SIZE))
+        with self.assertRaises(InvalidPlotFile):
+            list(reader.read_points())
+
+    def test_delta_out_of_range(self):
+        with self.assertRaises(ValueError):
+            encode([(40000, 0)])
+
+
+class PlotFileReplayTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dirname = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dirname)
+
+    def test_save_and_replay(self):
+        filename = os.path.join(self.dirname, 'test.plot')
+        points = list(main.text_to_points('HI', 100, x_offset=100,
+                                            y_offset=100))
+        self.assertEqual(main.save_plot_file(filename, points), len(points))
+        self.assertEqual(list(main.read_plot_file(filename)),
+                         [(int(x), int(y)) for x, y in points])
+        main.move_to_points(main.read_plot_file(filename))
+        self.assertEqual((main.x_pos, main.y_pos),
+                         tuple(int(c) for c in points[-1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
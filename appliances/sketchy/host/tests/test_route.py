@@ -0,0 +1,83 @@
+"""Tests of pen-down route planning.
+
+"""
+
+import unittest
+
+import support
+support.install()
+
+from paths import chain_strokes
+from paths.route import (
+    get_path_length,
+    plan_route,
+)
+
+
+SQUARE = [(0, 0), (10, 0), (10, 10), (0, 10), (0, 0)]
+FAR_SQUARE = [(100, 0), (110, 0), (110, 10), (100, 10), (100, 0)]
+# A plus sign, whose four arm ends are odd vertices.
+PLUS = [[(0, 5), (5, 5), (10, 5)], [(5, 0), (5, 5), (5, 10)]]
+
+
+def get_segments(points):
+    return set(frozenset(segment) for segment in zip(points, points[1:])
+               if segment[0] != segment[1])
+
+
+class PlanRouteTestCase(unittest.TestCase):
+    def assertDrawsAll(self, route, strokes):
+        drawn = get_segments(route)
+        for stroke in strokes:
+            self.assertLessEqual(get_segments(stroke), drawn)
+
+    def test_closed_stroke(self):
+        route = plan_route([SQUARE], (0, 0))
+        self.assertDrawsAll(route, [SQUARE])
+        self.assertEqual(len(route), len(SQUARE))
+
+    def test_retraces_instead_of_jumping(self):
+        route = plan_route(PLUS, (0, 5))
+        self.assertDrawsAll(route, PLUS)
+        self.assertEqual(route[0], (0, 5))
+        # Rather than jump between the strokes, which would draw a new line,
+        # the route retraces the two arms between a pair of the other ends.
+        self.assertEqual(get_segments(route),
+                         get_segments(PLUS[0]) | get_segments(PLUS[1]))
+        self.assertEqual(get_path_length(route), 20 + 10)
+
+    def test_connects_components(self):
+        route = plan_route([FAR_SQUARE, SQUARE], (0, 0))
+        self.assertDrawsAll(route, [SQUARE, FAR_SQUARE])
+        # The squares are joined by the shortest possible edge, and the route
+        # starts at the nearest of its ends, which are the only odd vertices.
+        self.assertEqual(
+            get_segments(route) - get_segments(SQUARE)
+            - get_segments(FAR_SQUARE),
+            {frozenset(((10, 0), (100, 0)))})
+        self.assertEqual(route[0], (10, 0))
+        self.assertEqual(get_path_length(route), 40 + 90 + 40)
+
+    def test_fallback(self):
+        strokes = [SQUARE, FAR_SQUARE]
+        expected = list(chain_strokes(strokes))
+        self.assertEqual(list(plan_route(strokes, (0, 0), max_vertices=4)),
+                         expected)
+        self.assertEqual(list(plan_route(PLUS, (0, 5), max_odd_vertices=3)),
+                         list(chain_strokes(PLUS)))
+        # Either limit can be disabled.
+        self.assertDrawsAll(plan_route(PLUS, (0, 5), None, None), PLUS)
+
+    def test_no_edges(self):
+        self.assertEqual(plan_route([], (0, 0)), [])
+        self.assertEqual(plan_route([[(3, 4)]], (0, 0)), [(3, 4)])
+
+
+class PathLengthTestCase(unittest.TestCase):
+    def test_path_length(self):
+        self.assertEqual(get_path_length([(0, 0), (3, 4), (3, 0)]), 9)
+        self.assertEqual(get_path_length([]), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+"""Tests of path simplification.
+
+"""
+
+import unittest
+
+import support
+support.install()
+
+from paths.simplify import (
+    Simplifier,
+    get_segment_distance_sq,
+)
+
+
+class SimplifierTestCase(unittest.TestCase):
+    def simplify(self, points, tolerance=0.5, window_size=64):
+        simplifier = Simplifier(tolerance, window_size)
+        return list(simplifier.simplify(points)), simplifier.get_summary()
+
+    def test_collinear_and_duplicate_points(self):
+        points, summary = self.simplify(
+            [(0, 0), (5, 0), (5.5, 0.2), (10, 0), (10, 0), (10, 10)],
+            tolerance=0)
+        # Points are floored to whole steps first.
+        self.assertEqual(points, [(0, 0), (10, 0), (10, 10)])
+        self.assertEqual(summary, {'num_input_points': 6,
+                                   'num_points_removed': 3})
+
+    def test_tolerance(self):
+        points = [(0, 0), (50, 1), (100, 0)]
+        self.assertEqual(self.simplify(points, tolerance=0.5)[0],
+                         [(0, 0), (50, 1), (100, 0)])
+        self.assertEqual(self.simplify(points, tolerance=1)[0],
+                         [(0, 0), (100, 0)])
+
+    def test_keeps_reversals(self):
+        # The point at which the path doubles back is on the line through its
+        # neighbours, but not on the segment between them.
+        points = [(0, 0), (100, 0), (50, 0)]
+        self.assertEqual(self.simplify(points, tolerance=5)[0], points)
+
+    def test_windows(self):
+        # However the path is split into windows, which each start at the
+        # last point of the previous one, every dropped point is within the
+        # tolerance of the simplified path.
+        points = [(x, (x // 7) % 3 + (x % 5) / 10) for x in range(200)]
+        for window_size in (2, 3, 16, 64, 1000):
+            simplified, summary = self.simplify(points, 0.5, window_size)
+            self.assertEqual(simplified[0], (0, 0))
+            self.assertEqual(simplified[-1], (199, 1))
+            self.assertEqual(summary['num_points_removed'],
+                             len(points) - len(simplified))
+            segments = list(zip(simplified, simplified[1:]))
+            for x, y in points:
+                point = (x, int(y))
+                self.assertLessEqual(
+                    min(get_segment_distance_sq(point, a, b)
+                        for a, b in segments), 0.25)
+
+    def test_empty(self):
+        self.assertEqual(self.simplify([]),
+                         ([], {'num_input_points': 0,
+                               'num_points_removed': 0}))
+        self.assertEqual(self.simplify([(1.5, 2.5)])[0], [(1, 2)])
+
+
+class SegmentDistanceTestCase(unittest.TestCase):
+    def test_segment_distance(self):
+        self.assertEqual(get_segment_distance_sq((5, 3), (0, 0), (10, 0)), 9)
+        # Beyond the ends, the distance is to the nearest end.
+        self.assertEqual(get_segment_distance_sq((13, 4), (0, 0), (10, 0)),
+                         25)
+        self.assertEqual(get_segment_distance_sq((3, 4), (0, 0), (0, 0)), 25)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,210 @@
+"""Tests of SVG parsing, transforms and the viewport fit, and of rendering an
+SVG document to device points on the simulated hardware.
+
+"""
+
+import io
+import math
+import unittest
+
+import support
+main = support.load_main()
+
+from paths.svg import (
+    InvalidSVG,
+    StringScanner,
+    get_viewport_matrix,
+    iter_elements,
+    iter_path_strokes,
+    iter_paths,
+    parse_transform,
+)
+from paths.transform import (
+    IDENTITY,
+    Pipeline,
+)
+
+
+DOCUMENT = (
+    '<?xml version="1.0"?>'
+    '<!-- A comment -->'
+    '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 100 50">'
+    '<g transform="translate(10 20)" fill-rule="evenodd">'
+    '<path transform="scale(2)" d="M0 0 L10 0 L10 10 Z M20 20 h5"/>'
+    '<path fill="none" d="M0 0 C 10 0 10 10 0 10"/>'
+    '</g>'
+    '<path style="fill: none" d="M0,0 1,1"/>'
+    '</svg>'
+)
+
+
+def get_path_strokes(doc, tolerance=0.5):
+    """Return a list of the point lists of each subpath of each path in the
+    document, in user coordinates.
+    """
+    return [list(stroke)
+            for _, _, parser in iter_paths(StringScanner(doc),
+                                           lambda attrs: IDENTITY)
+            for stroke in iter_path_strokes(parser, tolerance)]
+
+
+def apply(matrix, x, y):
+    return next(Pipeline().transform(matrix).apply(((x, y),)))
+
+
+class TransformTestCase(unittest.TestCase):
+    def assertPointAlmostEqual(self, a, b):
+        self.assertAlmostEqual(a[0], b[0])
+        self.assertAlmostEqual(a[1], b[1])
+
+    def test_functions_apply_right_to_left(self):
+        matrix = parse_transform('translate(10 20) scale(2)')
+        self.assertPointAlmostEqual(apply(matrix, 1, 1), (12, 22))
+        matrix = parse_transform('scale(2), translate(10, 20)')
+        self.assertPointAlmostEqual(apply(matrix, 1, 1), (22, 42))
+
+    def test_rotate(self):
+        self.assertPointAlmostEqual(
+            apply(parse_transform('rotate(90)'), 1, 0), (0, 1))
+        self.assertPointAlmostEqual(
+            apply(parse_transform('rotate(180 10 10)'), 0, 0), (20, 20))
+
+    def test_matrix_and_skew(self):
+        self.assertEqual(parse_transform('matrix(1 2 3 4 5 6)'),
+                         (1, 2, 3, 4, 5, 6))
+        self.assertPointAlmostEqual(
+            apply(parse_transform('skewX(45)'), 0, 1), (1, 1))
+
+    def test_invalid(self):
+        with self.assertRaises(InvalidSVG):
+            parse_transform('rotate(1 2)')
+        with self.assertRaises(InvalidSVG):
+            parse_transform('scale(2')
+
+    def test_viewport_fit(self):
+        # The viewBox is scaled uniformly to fit and centered by default.
+        matrix = get_viewport_matrix({'viewBox': '0 0 100 50'}, 880, 680)
+        self.assertPointAlmostEqual(apply(matrix, 0, 0), (0, 120))
+        self.assertPointAlmostEqual(apply(matrix, 100, 50), (880, 560))
+        matrix = get_viewport_matrix(
+            {'viewBox': '0 0 100 50', 'preserveAspectRatio': 'none'}, 880,
+            680)
+        self.assertPointAlmostEqual(apply(matrix, 100, 50), (880, 680))
+        self.assertEqual(get_viewport_matrix({}, 880, 680), IDENTITY)
+
+
+class ElementTestCase(unittest.TestCase):
+    def test_iter_elements(self):
+        elements = list(iter_elements(StringScanner(DOCUMENT)))
+        self.assertEqual([tag for tag, _ in elements], [
+            'svg', 'g', 'path', '/path', 'path', '/path', '/g', 'path',
+            '/path', '/svg'])
+        self.assertEqual(elements[1][1], {'transform': 'translate(10 20)',
+                                          'fill-rule': 'evenodd'})
+        # The path data isn't read, only its position.
+        self.assertEqual(DOCUMENT[elements[2][1]['d']:].split('"')[0],
+                         'M0 0 L10 0 L10 10 Z M20 20 h5')
+
+    def test_unterminated_tag(self):
+        with self.assertRaises(InvalidSVG):
+            list(iter_elements(StringScanner('<svg><path d="M0 0"')))
+
+
+class PathTestCase(unittest.TestCase):
+    def test_iter_paths(self):
+        paths = []
+        for matrix, fill_rule, parser in iter_paths(
+                StringScanner(DOCUMENT), lambda attrs: IDENTITY):
+            paths.append((matrix, fill_rule,
+                          [list(stroke)
+                           for stroke in iter_path_strokes(parser, 0.5)]))
+        self.assertEqual(len(paths), 3)
+
+        matrix, fill_rule, strokes = paths[0]
+        self.assertEqual(matrix, (2, 0, 0, 2, 10, 20))
+        self.assertEqual(fill_rule, 'evenodd')
+        self.assertEqual(strokes, [[(0, 0), (10, 0), (10, 10), (0, 0)],
+                                   [(20, 20), (25, 20)]])
+
+        matrix, fill_rule, strokes = paths[1]
+        self.assertEqual(matrix, (1, 0, 0, 1, 10, 20))
+        self.assertIsNone(fill_rule)
+        # The curve is flattened to within the tolerance.
+        self.assertEqual(strokes[0][0], (0, 0))
+        self.assertEqual(strokes[0][-1], (0, 10))
+        self.assertGreater(len(strokes[0]), 2)
+        samples = [(30 * t * (1 - t), 10 * t * t * (3 - 2 * t))
+                   for t in (i / 1000 for i in range(1001))]
+        for x, y in strokes[0]:
+            self.assertLessEqual(
+                min(math.hypot(x - sx, y - sy) for sx, sy in samples), 0.5)
+
+        matrix, fill_rule, strokes = paths[2]
+        self.assertIsNone(fill_rule)
+        self.assertEqual(strokes, [[(0, 0), (1, 1)]])
+
+    def test_relative_and_shorthand_commands(self):
+        doc = ('<svg><path d="m10 10 h10 v10 H10 l0-10 z '
+               'M30,30 l5,0 5,0"/></svg>')
+        self.assertEqual(get_path_strokes(doc), [
+            [(10, 10), (20, 10), (20, 20), (10, 20), (10, 10), (10, 10)],
+            [(30, 30), (35, 30), (40, 30)],
+        ])
+
+    def test_arc(self):
+        stroke, = get_path_strokes(
+            '<svg><path d="M0 0 A 10 10 0 0 1 20 0"/></svg>')
+        self.assertGreater(len(stroke), 2)
+        self.assertAlmostEqual(stroke[-1][0], 20)
+        self.assertAlmostEqual(stroke[-1][1], 0)
+        for x, y in stroke:
+            self.assertAlmostEqual(math.hypot(x - 10, y), 10, places=5)
+
+
+class RenderTestCase(unittest.TestCase):
+    def get_strokes(self, doc, fill=False):
+        fh = io.BytesIO(doc.encode())
+        return [list(stroke)
+                for stroke in main.svg_to_strokes(fh, fill, 20, 0)]
+
+    def test_fit_and_flip(self):
+        strokes = self.get_strokes(
+            '<svg viewBox="0 0 100 50"><path d="M0 0 L100 50"/></svg>')
+        # The y axis is inverted and the viewBox centered vertically.
+        self.assertEqual(strokes, [[(0, 560), (880, 120)]])
+
+    def test_clip(self):
+        strokes = self.get_strokes(
+            '<svg viewBox="0 0 100 100">'
+            '<path d="M50 50 L150 50 L150 60 L50 60"/></svg>')
+        self.assertEqual(len(strokes), 1)
+        for x, y in strokes[0]:
+            self.assertTrue(0 <= x <= main.X_AXIS_MAX)
+            self.assertTrue(0 <= y <= main.Y_AXIS_MAX)
+            self.assertIsInstance(x, int)
+            self.assertIsInstance(y, int)
+
+    def test_fill(self):
+        doc = ('<svg viewBox="0 0 680 680">'
+               '<path d="M100 100 H300 V300 H100 Z"/></svg>')
+        outline, = self.get_strokes(doc.replace('<path', '<path fill="none"'))
+        strokes = self.get_strokes(doc, fill=True)
+        self.assertEqual(strokes[0], outline)
+        # The outline is followed by a single stroke that starts where it
+        # ends and draws the hatch lines, 20 steps apart, moving between them
+        # along the outline.
+        self.assertEqual(len(strokes), 2)
+        hatch = strokes[1]
+        self.assertEqual(hatch[0], outline[-1])
+        ys = set()
+        for (x0, y0), (x1, y1) in zip(hatch, hatch[1:]):
+            if y0 == y1 and x0 != x1:
+                ys.add(y0)
+            elif (x0, y0) != (x1, y1):
+                self.assertEqual(x0, x1)
+                self.assertIn(x0, (200, 400))
+        self.assertEqual(len(ys), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+"""Tests of the point transform pipeline.
+
+"""
+
+import unittest
+
+import support
+support.install()
+
+from paths.transform import (
+    Affine,
+    Clip,
+    Pipeline,
+    get_max_scale,
+    multiply,
+)
+
+
+def apply(pipeline, points, resume=False):
+    return list(pipeline.apply(points, resume))
+
+
+class AffineTestCase(unittest.TestCase):
+    def test_fused(self):
+        pipeline = Pipeline().scale(2).translate(10, 0).flip_y(680)
+        self.assertEqual(len(pipeline.stages), 1)
+        self.assertEqual(apply(pipeline, ((1, 1), (5, 10))),
+                         [(12, 678), (20, 660)])
+
+    def test_multiply(self):
+        rotate = (0, 1, -1, 0, 0, 0)
+        translate = (1, 0, 0, 1, 10, 0)
+        # Translate and then rotate.
+        point = next(Affine(multiply(rotate, translate)).apply(((1, 0),)))
+        self.assertEqual(point, (0, 11))
+        self.assertAlmostEqual(get_max_scale((3, 0, 0, 2, 5, 5)), 3)
+        self.assertAlmostEqual(get_max_scale(rotate), 1)
+
+    def test_floor(self):
+        pipeline = Pipeline().scale(0.1).floor()
+        # 0.1 * 30 falls just short of 3 in floating-point.
+        self.assertEqual(apply(pipeline, ((30, 29), (-1, 0))),
+                         [(3, 2), (-1, 0)])
+
+
+class ClipTestCase(unittest.TestCase):
+    def setUp(self):
+        self.pipeline = Pipeline().clip(0, 0, 100, 100)
+
+    def assertPointsAlmostEqual(self, points, expected):
+        # The edges are moved out by Clip.EPSILON, which shifts the points at
+        # which a segment crosses them by about as much.
+        self.assertEqual(len(points), len(expected))
+        for point, expected_point in zip(points, expected):
+            self.assertAlmostEqual(point[0], expected_point[0], places=5)
+            self.assertAlmostEqual(point[1], expected_point[1], places=5)
+
+    def test_inside(self):
+        points = [(0, 0), (50, 50), (100, 100)]
+        self.assertEqual(apply(self.pipeline, points), points)
+
+    def test_exit_and_reenter(self):
+        # The part outside is replaced by a line along the edge.
+        self.assertEqual(
+            apply(self.pipeline, ((50, 50), (150, 50), (150, 80), (50, 80))),
+            [(50, 50), (100, 50), (100, 80), (50, 80)])
+
+    def test_crossing(self):
+        # A segment with both ends outside is clipped at both edges.
+        self.assertEqual(apply(self.pipeline, ((-50, 50), (150, 50))),
+                         [(0, 50), (100, 50)])
+        self.assertEqual(apply(self.pipeline, ((-50, 150), (150, 150))), [])
+
+    def test_edge(self):
+        # Points that are outside only by floating-point error are clamped.
+        self.assertEqual(apply(self.pipeline, ((100 + 1e-9, -1e-9),)),
+                         [(100, 0)])
+        clip = Clip(0, 0, 100, 100)
+        self.assertTrue(clip.contains(-1e-9, 50))
+        self.assertFalse(clip.contains(-1e-3, 50))
+        self.assertAlmostEqual(clip.clip_segment(-10, 50, 10, 50)[0], 0.5,
+                               places=5)
+        self.assertIsNone(clip.clip_segment(-10, -1, 10, -1))
+
+    def test_resume(self):
+        pipeline = self.pipeline
+        self.assertEqual(apply(pipeline, ((50, 50),)), [(50, 50)])
+        # The next point continues the path, so the segment to it is clipped.
+        self.assertEqual(apply(pipeline, ((150, 50),), resume=True),
+                         [(100, 50)])
+        self.assertPointsAlmostEqual(
+            apply(pipeline, ((50, 80),), resume=True), [(100, 65), (50, 80)])
+        # Without resume, a point outside starts a new path and is dropped.
+        self.assertEqual(apply(pipeline, ((150, 50),)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
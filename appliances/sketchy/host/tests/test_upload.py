@@ -0,0 +1,128 @@
+"""Tests of streaming file uploads and their CRC-32 checks.
+
+"""
+
+import io
+import os
+import tempfile
+import unittest
+import zlib
+
+import support
+main = support.load_main()
+
+from upload import (
+    IncompleteUpload,
+    format_checksum,
+    parse_checksum,
+    receive_file,
+)
+
+
+DATA = bytes(range(256)) * 41 + b'tail'
+
+
+class ShortReadStream(io.BytesIO):
+    """A stream that returns at most max_read bytes per readinto(), like a
+    socket.
+    """
+    def __init__(self, data, max_read):
+        super().__init__(data)
+        self.max_read = max_read
+
+    def readinto(self, buf):
+        return super().readinto(memoryview(buf)[:self.max_read])
+
+
+class ReceiveFileTestCase(unittest.TestCase):
+    def test_checksum(self):
+        for buf_size, max_read in ((1, 1), (7, 3), (64, 100), (4096, 1500),
+                                   (len(DATA) * 2, len(DATA))):
+            fh = io.BytesIO()
+            checksum = receive_file(ShortReadStream(DATA, max_read), fh,
+                                    len(DATA), bytearray(buf_size))
+            self.assertEqual(fh.getvalue(), DATA)
+            self.assertEqual(checksum, zlib.crc32(DATA))
+
+    def test_reads_only_size_bytes(self):
+        # The rest of the stream, e.g. the next request, is left unread.
+        stream = io.BytesIO(DATA)
+        fh = io.BytesIO()
+        checksum = receive_file(stream, fh, 100, bytearray(64))
+        self.assertEqual(fh.getvalue(), DATA[:100])
+        self.assertEqual(checksum, zlib.crc32(DATA[:100]))
+        self.assertEqual(stream.tell(), 100)
+
+    def test_empty(self):
+        fh = io.BytesIO()
+        self.assertEqual(receive_file(io.BytesIO(b''), fh, 0, bytearray(8)),
+                         0)
+        self.assertEqual(fh.getvalue(), b'')
+
+    def test_incomplete(self):
+        fh = io.BytesIO()
+        with self.assertRaises(IncompleteUpload):
+            receive_file(ShortReadStream(DATA[:1000], 300), fh, len(DATA),
+                         bytearray(256))
+        self.assertEqual(fh.getvalue(), DATA[:1000])
+
+
+class ChecksumTestCase(unittest.TestCase):
+    def test_round_trip(self):
+        for checksum in (0, 1, 0xdeadbeef, 0xffffffff, zlib.crc32(DATA)):
+            s = format_checksum(checksum)
+            self.assertEqual(len(s), 8)
+            self.assertEqual(parse_checksum(s), checksum)
+
+    def test_parse(self):
+        self.assertEqual(parse_checksum('DEADBEEF'), 0xdeadbeef)
+        # A signed CRC-32, e.g. from an older zlib, is taken modulo 2**32.
+        self.assertEqual(parse_checksum('-1'), 0xffffffff)
+        with self.assertRaises(ValueError):
+            parse_checksum('xyz')
+
+
+class UploadRouteTestCase(unittest.TestCase):
+    def setUp(self):
+        # Upload to a temporary current directory, restoring the one that the
+        # simulator changed to.
+        cwd = os.getcwd()
+        temp_dir = tempfile.TemporaryDirectory()
+        os.chdir(temp_dir.name)
+        self.addCleanup(temp_dir.cleanup)
+        self.addCleanup(os.chdir, cwd)
+
+    def upload(self, filename, data, crc32=None):
+        request = support.Request(data, {'Content-Length': str(len(data))})
+        return main._upload(request, filename, crc32)
+
+    def test_relative_filename(self):
+        self.assertGreater(main.get_free_bytes('drawing.svg'), 0)
+        response = self.upload('drawing.svg', DATA, zlib.crc32(DATA))
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.body['num_bytes'], len(DATA))
+        self.assertEqual(response.body['crc32'],
+                         format_checksum(zlib.crc32(DATA)))
+        with open('drawing.svg', 'rb') as fh:
+            self.assertEqual(fh.read(), DATA)
+        self.assertEqual(os.listdir('.'), ['drawing.svg'])
+
+    def test_checksum_mismatch(self):
+        with open('drawing.svg', 'wb') as fh:
+            fh.write(b'old')
+        response = self.upload('drawing.svg', DATA, zlib.crc32(DATA) ^ 1)
+        self.assertEqual(response.status, 400)
+        # The existing file is left intact and the partial upload removed.
+        with open('drawing.svg', 'rb') as fh:
+            self.assertEqual(fh.read(), b'old')
+        self.assertEqual(os.listdir('.'), ['drawing.svg'])
+
+    def test_invalid(self):
+        response = self.upload('missing/drawing.svg', DATA)
+        self.assertEqual(response.status, 400)
+        response = main._upload(support.Request(DATA), 'drawing.svg', None)
+        self.assertEqual(response.status, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
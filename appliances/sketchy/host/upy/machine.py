@@ -0,0 +1,154 @@
+"""Host stand-in for the MicroPython machine module.
+
+GPIO levels are kept in memory and every change to an output level is recorded
+in trace as a (<virtual time in microseconds>, <pin number>, <level>) tuple.
+Levels can be changed through Pin objects or through the ESP32 GPIO output
+registers via mem32.
+
+"""
+
+import utime
+
+
+# ESP32 GPIO output registers, as used with mem32.
+GPIO_OUT_REG = 0x3ff44004
+GPIO_OUT_W1TS_REG = 0x3ff44008
+GPIO_OUT_W1TC_REG = 0x3ff4400c
+
+# Map pin numbers to their current levels.
+_levels = {}
+
+trace = []
+
+
+def _set_level(pin_num, level):
+    if _levels.get(pin_num) != level:
+        _levels[pin_num] = level
+        trace.append((utime.now_us(), pin_num, level))
+
+
+def reset_trace():
+    del trace[:]
+
+
+def reset():
+    raise SystemExit('machine.reset()')
+
+
+def unique_id():
+    return b'\x00sim\x00\x00'
+
+
+def freq(hz=None):
+    return 240000000
+
+
+def idle():
+    utime.sleep_us(1)
+
+
+def disable_irq():
+    return 0
+
+
+def enable_irq(state):
+    pass
+
+
+class Pin:
+    IN = 1
+    OUT = 3
+    OPEN_DRAIN = 7
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_RISING = 1
+    IRQ_FALLING = 2
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self.id = id
+        self.mode = mode
+        _levels.setdefault(id, 0)
+        if value is not None:
+            self.value(value)
+
+    def value(self, level=None):
+        if level is None:
+            return _levels[self.id]
+        _set_level(self.id, 1 if level else 0)
+
+    __call__ = value
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def irq(self, handler=None, trigger=None):
+        pass
+
+
+class _Mem32:
+    """Emulate the ESP32 GPIO output registers and store any other writes.
+    """
+    def __init__(self):
+        self._words = {}
+
+    def __getitem__(self, addr):
+        if addr == GPIO_OUT_REG:
+            return sum(1 << n for n, level in _levels.items()
+                       if level and n < 32)
+        return self._words.get(addr, 0)
+
+    def __setitem__(self, addr, value):
+        if addr == GPIO_OUT_W1TS_REG or addr == GPIO_OUT_W1TC_REG:
+            level = 1 if addr == GPIO_OUT_W1TS_REG else 0
+            for pin_num in range(32):
+                if value >> pin_num & 1:
+                    _set_level(pin_num, level)
+        elif addr == GPIO_OUT_REG:
+            for pin_num in range(32):
+                _set_level(pin_num, value >> pin_num & 1)
+        else:
+            self._words[addr] = value
+
+mem32 = _Mem32()
+
+
+class Timer:
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id=-1, **kwargs):
+        self.id = id
+        self._due_us = None
+        self._period_us = None
+        self._mode = self.ONE_SHOT
+        self._callback = None
+        if kwargs:
+            self.init(**kwargs)
+
+    def init(self, mode=PERIODIC, period=-1, tick_hz=1000, freq=None,
+             callback=None):
+        if freq is not None:
+            self._period_us = max(1, int(1000000 / freq))
+        else:
+            self._period_us = max(1, period * 1000000 // tick_hz)
+        self._mode = mode
+        self._callback = callback
+        self._due_us = utime.now_us() + self._period_us
+        if self not in utime._armed_timers:
+            utime._armed_timers.append(self)
+
+    def deinit(self):
+        self._due_us = None
+        if self in utime._armed_timers:
+            utime._armed_timers.remove(self)
+
+    def _fire(self):
+        if self._mode == self.PERIODIC:
+            self._due_us += self._period_us
+        else:
+            self.deinit()
+        if self._callback is not None:
+            self._callback(self)
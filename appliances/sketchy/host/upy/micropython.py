@@ -0,0 +1,16 @@
+"""Host stand-in for the MicroPython micropython module.
+"""
+
+const = lambda x: x
+
+
+def alloc_emergency_exception_buf(size):
+    pass
+
+
+def schedule(fn, arg):
+    fn(arg)
+
+
+def mem_info(*args):
+    pass
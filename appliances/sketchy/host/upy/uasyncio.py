@@ -0,0 +1,13 @@
+"""Host stand-in for the MicroPython uasyncio module, which is a subset of
+asyncio plus sleep_ms().
+
+Its sleeps take real time rather than advancing the virtual clock of utime,
+which only the firmware's own sleeps, e.g. between steps, do.
+
+"""
+
+from asyncio import *
+
+
+async def sleep_ms(ms):
+    await sleep(ms / 1000)
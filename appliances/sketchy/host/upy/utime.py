@@ -0,0 +1,156 @@
+"""Host stand-in for the MicroPython utime module.
+
+Time is virtual: sleeping advances a clock instead of blocking, and fires any
+machine.Timer callbacks that fall due along the way, so that firmware runs as
+fast as the host can execute it while still reporting device time.
+
+Threads sleep concurrently, as on the device, rather than each adding its
+sleeps to the clock: a sleeping thread blocks until every thread is asleep,
+and the clock then advances to the earliest wake time. So polling, e.g. for a
+step thread to drain, doesn't advance the clock past the thread that does the
+work. Threads started with _thread.start_new_thread() after this module is
+imported are tracked from the start.
+
+"""
+
+import _thread
+import threading
+
+# MicroPython ticks wrap around at a port-specific period, which is 2^30 on the
+# ESP32, so wrap here too in order to catch code that doesn't use ticks_add()
+# and ticks_diff().
+_TICKS_PERIOD = 1 << 30
+_TICKS_MAX = _TICKS_PERIOD - 1
+_TICKS_HALF_PERIOD = _TICKS_PERIOD >> 1
+
+# The number of virtual microseconds elapsed since start up.
+_now_us = 0
+
+# Timers that are armed, which are added and removed by machine.Timer.
+_armed_timers = []
+
+# Timer callbacks run like soft interrupts, so don't fire any timers from the
+# sleeps within a callback.
+_in_callback = False
+
+# Guards the clock and the sleepers, and is notified when the clock advances.
+_cond = threading.Condition(threading.RLock())
+
+# Map the ident of each thread to its wake time while it's asleep, or to None
+# while it's awake.
+_wake_times = {threading.main_thread().ident: None}
+
+# The number of threads that have been started but not yet added to
+# _wake_times, during which the clock mustn't advance.
+_num_starting_threads = 0
+
+# The number of real seconds that a sleeping thread waits for the others to
+# sleep before advancing the clock anyway, e.g. in case one of them is blocked
+# on a lock that the sleeping thread holds.
+_STALL_TIMEOUT_S = 0.1
+
+
+def now_us():
+    """Return the number of unwrapped virtual microseconds since start up.
+    """
+    return _now_us
+
+
+def advance_us(us):
+    """Advance the virtual clock by us microseconds, firing the callbacks of
+    any timers that come due on the way, in order.
+    """
+    with _cond:
+        _advance_to(_now_us + us)
+
+
+def _advance_to(until_us):
+    global _now_us
+    global _in_callback
+    while not _in_callback:
+        due_timers = [t for t in _armed_timers if t._due_us <= until_us]
+        if not due_timers:
+            break
+        timer = min(due_timers, key=lambda t: t._due_us)
+        _now_us = max(_now_us, timer._due_us)
+        _in_callback = True
+        try:
+            timer._fire()
+        finally:
+            _in_callback = False
+    _now_us = max(_now_us, until_us)
+    _cond.notify_all()
+
+
+# Track the threads that the firmware starts, i.e. the step and job workers,
+# from before they first run.
+_real_start_new_thread = _thread.start_new_thread
+
+def _start_new_thread(function, args, kwargs={}):
+    global _num_starting_threads
+    with _cond:
+        _num_starting_threads += 1
+
+    def run():
+        global _num_starting_threads
+        with _cond:
+            _wake_times[threading.get_ident()] = None
+            _num_starting_threads -= 1
+        function(*args, **kwargs)
+
+    return _real_start_new_thread(run, ())
+
+_thread.start_new_thread = _start_new_thread
+
+
+def ticks_us():
+    return _now_us & _TICKS_MAX
+
+
+def ticks_ms():
+    return (_now_us // 1000) & _TICKS_MAX
+
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) & _TICKS_MAX
+
+
+def ticks_diff(ticks1, ticks2):
+    return ((ticks1 - ticks2 + _TICKS_HALF_PERIOD) & _TICKS_MAX) \
+        - _TICKS_HALF_PERIOD
+
+
+def time():
+    return _now_us // 1000000
+
+
+def sleep_us(us):
+    if us <= 0:
+        return
+    with _cond:
+        if _in_callback:
+            _advance_to(_now_us + us)
+            return
+        ident = threading.get_ident()
+        wake_us = _now_us + us
+        _wake_times[ident] = wake_us
+        try:
+            while _now_us < wake_us:
+                # Advance once every thread is asleep and none of them is
+                # already due to wake.
+                if (not _num_starting_threads
+                        and None not in _wake_times.values()
+                        and min(_wake_times.values()) > _now_us):
+                    _advance_to(min(_wake_times.values()))
+                elif not _cond.wait(_STALL_TIMEOUT_S):
+                    _advance_to(wake_us)
+        finally:
+            _wake_times[ident] = None
+
+
+def sleep_ms(ms):
+    sleep_us(ms * 1000)
+
+
+def sleep(seconds):
+    sleep_us(int(seconds * 1000000))